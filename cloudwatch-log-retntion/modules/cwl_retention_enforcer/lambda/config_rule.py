@@ -0,0 +1,477 @@
+"""
+Small framework for Lambda-backed AWS Config rules.
+
+A rule declares what it evaluates and how:
+
+    rule = ConfigRule(
+        name="ebs-encryption",
+        resource_type="AWS::EC2::Volume",
+        list_resources=paginated(ec2.describe_volumes, "Volumes", "NextToken", "NextToken", MaxResults=500),
+        check=lambda vols: ((v["VolumeId"], v.get("Encrypted", False), "...") for v in vols),
+        check_item=lambda item: (item["configuration"].get("encrypted", False), "..."),
+    )
+    handler = rule.handler
+
+- list_resources(token) -> (resources, next_token) returns one API page;
+  paginated() builds it from any describe/list call.
+- check(resources) is vectorized: it gets a whole page and yields
+  (resource_id, compliant, annotation). compliant=None means NOT_APPLICABLE.
+  map_concurrent() parallelizes per-resource lookups inside it.
+- check_item(configuration_item) -> (compliant, annotation) answers change
+  notifications; without it the rule is periodic only. Deleted items are
+  NOT_APPLICABLE without calling it; on_deleted(configuration_item) lets a
+  rule drop cached state for them.
+- count_key names the per-resource counter in the sweepReport
+  (default "resources").
+
+The scheduled sweep pipelines page listing and put_evaluations (batches of
+100 flushed by a worker pool, throttles retried with jittered backoff),
+checkpoints to SSM and re-invokes itself when the time budget runs out,
+submits only changed resources when SNAPSHOT_BUCKET is set, and logs one
+sweepReport JSON line with counters and timings (listMs, checkMs, submitMs).
+A lease in the checkpoint lets only one invocation resume it at a time.
+"""
+
+import json, os, time, random, gzip, struct, hashlib, boto3, datetime, threading, uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+# Sweep tuning (overridable through the function environment)
+BATCH_SIZE      = 100   # put_evaluations hard limit
+FLUSH_WORKERS   = int(os.environ.get("FLUSH_WORKERS", "4"))
+CHECK_WORKERS   = int(os.environ.get("CHECK_WORKERS", "8"))
+MAX_QUEUED      = FLUSH_WORKERS * 2  # batches waiting for a flush worker
+MAX_RETRIES     = int(os.environ.get("PUT_EVAL_MAX_RETRIES", "6"))
+THROTTLE_CODES  = {"ThrottlingException", "Throttling", "TooManyRequestsException", "RequestLimitExceeded"}
+# nextToken rejected on resume (expired checkpoint): restart the sweep
+EXPIRED_TOKEN_CODES = {"InvalidParameterException", "InvalidNextToken", "InvalidNextTokenException",
+                       "InvalidPaginationToken", "InvalidParameterValue"}
+
+# Time budget: hand off to a continuation invocation when less than this is left
+RESERVE_MS      = int(os.environ.get("SWEEP_RESERVE_MS", "15000"))
+CHECKPOINT_MAX_AGE_S = int(os.environ.get("CHECKPOINT_MAX_AGE_SECONDS", str(6 * 3600)))
+# How long a handed-off checkpoint stays reserved for the continuation before a scheduled run may take it
+HANDOFF_LEASE_S = int(os.environ.get("HANDOFF_LEASE_SECONDS", "300"))
+ASYNC_PAYLOAD_MAX = 256 * 1024  # Lambda async invoke payload limit; caps the carried evaluations
+
+# Delta-only evaluations: compliance snapshot in S3 (disabled when no bucket is set)
+SNAPSHOT_BUCKET = os.environ.get("SNAPSHOT_BUCKET", "")
+SNAPSHOT_MAX_AGE_S = int(os.environ.get("SNAPSHOT_MAX_AGE_SECONDS", str(7 * 24 * 3600)))  # forces a full resync
+
+FUNCTION_NAME = os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "config-rule")
+
+client_cfg = Config(retries={"max_attempts": 3, "mode": "standard"},
+                    max_pool_connections=max(FLUSH_WORKERS, CHECK_WORKERS) + 2)
+config = boto3.client("config", config=client_cfg)
+ssm = boto3.client("ssm")
+s3 = boto3.client("s3")
+lambda_client = boto3.client("lambda")
+
+DELETED_STATUSES = ("ResourceDeleted", "ResourceDeletedNotRecorded")
+
+# ---------- Rule building blocks ----------
+def paginated(operation, result_key: str, token_in: str = "nextToken", token_out: str = "nextToken", **params):
+    """list_resources for a paginated API call: token -> (page items, next token)."""
+    def list_page(token):
+        resp = operation(**params, **({token_in: token} if token else {}))
+        return resp.get(result_key, []), resp.get(token_out)
+    return list_page
+
+_check_pool = None
+_check_pool_lock = threading.Lock()
+
+def map_concurrent(fn, items, workers: int = CHECK_WORKERS) -> list:
+    """fn over items on a shared pool (kept across warm invocations), in order."""
+    global _check_pool
+    items = list(items)
+    if len(items) < 2 or workers < 2:
+        return [fn(i) for i in items]
+    with _check_pool_lock:
+        if _check_pool is None:
+            _check_pool = ThreadPoolExecutor(max_workers=workers)
+    return list(_check_pool.map(fn, items))
+
+def item_configuration(item: dict, key: str = "configuration"):
+    """configurationItem[key] as a dict (Config sometimes delivers it as a JSON string)."""
+    cfg = (item or {}).get(key)
+    if isinstance(cfg, str):
+        try:
+            cfg = json.loads(cfg)
+        except ValueError:
+            cfg = None
+    return cfg if isinstance(cfg, dict) else {}
+
+# ---------- Evaluations ----------
+def evaluation(resource_type: str, res_id: str, compliant, annotation: str) -> dict:
+    """compliant: True / False, or None for NOT_APPLICABLE."""
+    if compliant is None:
+        ctype = "NOT_APPLICABLE"
+    else:
+        ctype = "COMPLIANT" if compliant else "NON_COMPLIANT"
+    return {
+        "ComplianceResourceType": resource_type,
+        "ComplianceResourceId":   res_id,
+        "ComplianceType":         ctype,
+        "Annotation":             annotation[:256],
+        "OrderingTimestamp":      datetime.datetime.now(datetime.timezone.utc)
+    }
+
+def submit_batch(batch: list, token: str, deadline: float = None):
+    """
+    Send one batch, retrying throttles and FailedEvaluations with jittered backoff.
+    Retries stop at deadline (time.monotonic()); what was not accepted by
+    then is handed back instead of counted as failed.
+    Returns (stats, ids of evaluations that were never accepted, unsent evaluations).
+    """
+    started = time.monotonic()
+    stats = {"sent": 0, "failed": 0, "retries": 0}
+    pending, unsent = batch, []
+    for attempt in range(MAX_RETRIES + 1):
+        if deadline is not None and time.monotonic() >= deadline:
+            pending, unsent = [], pending
+            break
+        try:
+            resp = config.put_evaluations(Evaluations=pending, ResultToken=token)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in THROTTLE_CODES or attempt == MAX_RETRIES:
+                print(f"put_evaluations failed for {len(pending)} evaluation(s): {e}")
+                break
+        else:
+            failed_ids = {f["ComplianceResourceId"] for f in resp.get("FailedEvaluations", [])}
+            stats["sent"] += len(pending) - len(failed_ids)
+            pending = [e for e in pending if e["ComplianceResourceId"] in failed_ids]
+            if not pending or attempt == MAX_RETRIES:
+                break
+        stats["retries"] += 1
+        pause = min(10.0, 0.2 * 2 ** attempt) * random.uniform(0.5, 1.0)
+        if deadline is not None and time.monotonic() + pause >= deadline:
+            pending, unsent = [], pending
+            break
+        time.sleep(pause)
+    stats["failed"] = len(pending)
+    stats["submitMs"] = int((time.monotonic() - started) * 1000)
+    return stats, {e["ComplianceResourceId"] for e in pending}, unsent
+
+# ---------- Compliance snapshot (S3) ----------
+# Binary layout, gzip-compressed: per resource
+#   8-byte blake2b(id) | 1 byte compliant bit | 2-byte id length | id (utf-8)
+# Diffing works on hash -> bit only; ids are kept so deleted resources can be
+# reported as NOT_APPLICABLE.
+_REC = struct.Struct(">QBH")
+
+def id_hash(res_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(res_id.encode(), digest_size=8).digest(), "big")
+
+def pack_snapshot(entries: dict) -> bytes:
+    out = bytearray()
+    for h, (bit, res_id) in entries.items():
+        raw = res_id.encode()
+        out += _REC.pack(h, bit, len(raw)) + raw
+    return gzip.compress(bytes(out))
+
+def unpack_snapshot(blob: bytes) -> dict:
+    data = gzip.decompress(blob)
+    entries, off = {}, 0
+    while off < len(data):
+        h, bit, n = _REC.unpack_from(data, off)
+        off += _REC.size
+        entries[h] = (bit, data[off:off + n].decode())
+        off += n
+    return entries
+
+def _load_snapshot(key: str, max_age_s: int = 0) -> dict:
+    if not SNAPSHOT_BUCKET:
+        return {}
+    try:
+        obj = s3.get_object(Bucket=SNAPSHOT_BUCKET, Key=key)
+    except s3.exceptions.NoSuchKey:
+        return {}
+    if max_age_s and time.time() - obj["LastModified"].timestamp() > max_age_s:
+        print("Compliance snapshot is older than SNAPSHOT_MAX_AGE_SECONDS; running a full resync")
+        return {}
+    return unpack_snapshot(obj["Body"].read())
+
+def _save_snapshot(key: str, entries: dict):
+    if SNAPSHOT_BUCKET:
+        s3.put_object(Bucket=SNAPSHOT_BUCKET, Key=key, Body=pack_snapshot(entries))
+
+def _delete_snapshot(key: str):
+    if SNAPSHOT_BUCKET:
+        s3.delete_object(Bucket=SNAPSHOT_BUCKET, Key=key)
+
+# ---------- Sweep checkpoint (SSM parameter) ----------
+# The checkpoint value carries a lease (leaseOwner, leaseUntil). SSM has no
+# conditional put, but parameter versions are strictly sequential: a writer
+# whose put_parameter returns exactly the version it read + 1 wrote first.
+def _load_checkpoint(param: str):
+    """(checkpoint, parameter version), or (None, 0) when there is none or it is stale."""
+    try:
+        p = ssm.get_parameter(Name=param)["Parameter"]
+    except ssm.exceptions.ParameterNotFound:
+        return None, 0
+    cp = json.loads(p["Value"])
+    if time.time() - cp.get("savedAt", 0) > CHECKPOINT_MAX_AGE_S:
+        print(f"Ignoring stale sweep checkpoint from {cp.get('savedAt')}")
+        return None, p.get("Version", 0)
+    return cp, p.get("Version", 0)
+
+def _put_checkpoint(param: str, cp: dict) -> int:
+    return ssm.put_parameter(Name=param, Value=json.dumps(cp), Type="String", Overwrite=True).get("Version", 0)
+
+def _acquire_lease(param: str, cp: dict, version: int, owner: str, until: float) -> bool:
+    """Claim the checkpoint read at `version`; False when another invocation wrote it in between."""
+    return _put_checkpoint(param, dict(cp, leaseOwner=owner, leaseUntil=int(until))) == version + 1
+
+def _save_checkpoint(param: str, next_token, report: dict, lease_owner: str, list_done: bool = False):
+    """Checkpoint reserved for the continuation invocation (lease_owner) for HANDOFF_LEASE_S."""
+    _put_checkpoint(param, {"nextToken": next_token, "listDone": list_done, "report": report,
+                            "savedAt": int(time.time()), "leaseOwner": lease_owner,
+                            "leaseUntil": int(time.time()) + HANDOFF_LEASE_S})
+
+def _clear_checkpoint(param: str):
+    try:
+        ssm.delete_parameter(Name=param)
+    except ssm.exceptions.ParameterNotFound:
+        pass
+
+def _hand_off(event: dict, context, hop: int, lease: str, carry: list):
+    """
+    Re-invoke this function asynchronously with the same Config event, the
+    lease the checkpoint is reserved for and the evaluations not yet accepted
+    ([id, compliant, annotation], sized by _carry to fit the payload limit).
+    """
+    payload = dict(event, sweepContinuation={"hop": hop, "lease": lease, "carry": carry})
+    lambda_client.invoke(FunctionName=context.invoked_function_arn,
+                         InvocationType="Event", Payload=json.dumps(payload).encode())
+
+def _out_of_time(context) -> bool:
+    return context is not None and context.get_remaining_time_in_millis() < RESERVE_MS
+
+def _submit_deadline(context):
+    """Stop retrying submissions halfway into the reserve, leaving time to checkpoint and hand off."""
+    if context is None:
+        return None
+    return time.monotonic() + (context.get_remaining_time_in_millis() - RESERVE_MS / 2) / 1000
+
+_COMPLIANCE = {"COMPLIANT": True, "NON_COMPLIANT": False, "NOT_APPLICABLE": None}
+
+def _carry(evaluations: list, event: dict) -> list:
+    """[id, compliant, annotation] for the leading evaluations that fit in a hand-off payload for event."""
+    budget = ASYNC_PAYLOAD_MAX - len(json.dumps(event)) - 1024
+    carry, size = [], 2
+    for e in evaluations:
+        item = [e["ComplianceResourceId"], _COMPLIANCE[e["ComplianceType"]], e["Annotation"]]
+        size += len(json.dumps(item)) + 2
+        if size > budget:
+            break
+        carry.append(item)
+    return carry
+
+# ---------- Rule ----------
+class ConfigRule:
+    def __init__(self, name: str, resource_type: str, list_resources, check, check_item=None,
+                 not_applicable: str = "Resource no longer exists.", on_deleted=None, count_key: str = "resources"):
+        """
+        name keys the default SSM checkpoint parameter
+        (/<name>/<function>/sweep-checkpoint) and S3 snapshot key
+        (<name>/<function>/compliance-snapshot.bin); CHECKPOINT_PARAMETER and
+        SNAPSHOT_KEY override them.
+        """
+        self.name = name
+        self.resource_type = resource_type
+        self.list_resources = list_resources
+        self.check = check
+        self.check_item = check_item
+        self.not_applicable = not_applicable
+        self.on_deleted = on_deleted
+        self.count_key = count_key
+        self.checkpoint_param = os.environ.get("CHECKPOINT_PARAMETER", f"/{name}/{FUNCTION_NAME}/sweep-checkpoint")
+        self.snapshot_key = os.environ.get("SNAPSHOT_KEY", f"{name}/{FUNCTION_NAME}/compliance-snapshot.bin")
+
+    def new_report(self) -> dict:
+        return {"rule": self.name, self.count_key: 0, "compliant": 0, "nonCompliant": 0, "notApplicable": 0,
+                "unchanged": 0, "deleted": 0, "deferred": 0, "pages": 0, "batches": 0, "sent": 0, "failed": 0, "retries": 0,
+                "hops": 0, "listMs": 0, "checkMs": 0, "submitMs": 0, "elapsedMs": 0}
+
+    def evaluate_item(self, item: dict):
+        """(compliant, annotation) for one configuration item; deleted resources are NOT_APPLICABLE."""
+        if item.get("configurationItemStatus") in DELETED_STATUSES:
+            if self.on_deleted is not None:
+                self.on_deleted(item)
+            return None, self.not_applicable
+        return self.check_item(item)
+
+    def sweep(self, event: dict, token: str, context) -> dict:
+        """
+        Page through every resource and pipeline evaluations to Config: the main
+        thread keeps listing and checking pages while a small pool submits full
+        batches (at most MAX_QUEUED waiting).
+
+        The sweep is time-budgeted: when less than RESERVE_MS remains, listing
+        stops, submission retries are cut off at half the reserve, the list
+        token is checkpointed to SSM and a continuation invocation resumes from
+        it, carrying the evaluations that were not accepted yet (as many as fit
+        in the async payload; the rest are counted as deferred). A scheduled run
+        that finds a recent checkpoint (broken chain) resumes from it as well,
+        unless its lease is held: the checkpoint is reserved for the
+        continuation for HANDOFF_LEASE_S, and a resuming invocation must win the
+        lease first, so a checkpoint is never resumed twice.
+
+        With SNAPSHOT_BUCKET set, only resources whose compliance changed (or
+        that are new) are submitted; resources missing since the last complete
+        sweep are submitted as NOT_APPLICABLE. Evaluations Config rejected or
+        that were not sent are recorded in the snapshot with their previous
+        state (or left out when new), so the next sweep resubmits them even
+        if a continuation is lost; a continuation records the ones it carries
+        again.
+        """
+        started = time.monotonic()
+        report = self.new_report()
+        continuation = event.get("sweepContinuation") or {}
+        hop = continuation.get("hop", 0)
+        owner = getattr(context, "aws_request_id", None) or str(uuid.uuid4())
+        cp, version = _load_checkpoint(self.checkpoint_param)
+        if cp:
+            held = cp.get("leaseUntil", 0) > time.time() and cp.get("leaseOwner") != continuation.get("lease")
+            until = time.time() + (context.get_remaining_time_in_millis() / 1000 if context else 900)
+            if held or not _acquire_lease(self.checkpoint_param, cp, version, owner, until):
+                print(f"Sweep checkpoint is leased by another invocation (hop {hop}); not resuming")
+                return {"rule": self.name, "skipped": "checkpoint leased"}
+        pending_key = self.snapshot_key + ".pending"
+        previous = _load_snapshot(self.snapshot_key, SNAPSHOT_MAX_AGE_S)
+        seen = {}
+        next_token = None
+        list_done = False
+        if cp:
+            next_token = cp["nextToken"]
+            list_done = cp.get("listDone", False)
+            report.update(cp.get("report", {}))
+            seen = _load_snapshot(pending_key)
+            print(f"Resuming sweep from checkpoint (hop {hop})")
+        elif hop:
+            print(f"Continuation hop {hop} found no checkpoint; starting a full sweep")
+
+        futures = []
+        batch = []
+        handed_off = False
+
+        def add(ev):
+            nonlocal batch
+            batch.append(ev)
+            if len(batch) == BATCH_SIZE:
+                queued = [f for f in futures if not f.done()]
+                if len(queued) >= MAX_QUEUED:
+                    wait(queued, return_when=FIRST_COMPLETED)
+                futures.append(pool.submit(submit_batch, batch, token, _submit_deadline(context)))
+                batch = []
+
+        with ThreadPoolExecutor(max_workers=FLUSH_WORKERS) as pool:
+            if cp:
+                for res_id, ok, annotation in continuation.get("carry") or []:
+                    h = id_hash(res_id)
+                    if ok is not None:
+                        seen[h] = (int(ok), res_id)
+                    else:
+                        seen.pop(h, None)
+                    add(evaluation(self.resource_type, res_id, ok, annotation))
+            while not list_done:
+                t0 = time.monotonic()
+                try:
+                    resources, page_token = self.list_resources(next_token)
+                except ClientError as e:
+                    if not next_token or e.response.get("Error", {}).get("Code") not in EXPIRED_TOKEN_CODES:
+                        raise
+                    print("Checkpointed nextToken rejected (expired?); restarting sweep from the beginning")
+                    next_token, seen, report = None, {}, self.new_report()
+                    continue
+                t1 = time.monotonic()
+                report["pages"] += 1
+                for res_id, ok, annotation in self.check(resources):
+                    report[self.count_key] += 1
+                    if ok is None:
+                        report["notApplicable"] += 1
+                        add(evaluation(self.resource_type, res_id, None, annotation))
+                        continue
+                    report["compliant" if ok else "nonCompliant"] += 1
+                    h = id_hash(res_id)
+                    seen[h] = (int(ok), res_id)
+                    prev = previous.get(h)
+                    if prev is not None and prev[0] == int(ok):
+                        report["unchanged"] += 1
+                        continue
+                    add(evaluation(self.resource_type, res_id, ok, annotation))
+                report["listMs"] += int((t1 - t0) * 1000)
+                report["checkMs"] += int((time.monotonic() - t1) * 1000)
+                next_token = page_token
+                if not next_token:
+                    list_done = True
+                    if SNAPSHOT_BUCKET:
+                        for h in previous.keys() - seen.keys():
+                            report["deleted"] += 1
+                            add(evaluation(self.resource_type, previous[h][1], None, self.not_applicable))
+                    break
+                if _out_of_time(context):
+                    handed_off = True
+                    break
+
+            if batch:
+                futures.append(pool.submit(submit_batch, batch, token, _submit_deadline(context)))
+
+            rejected, unsent = set(), []
+            for f in futures:
+                stats, failed_ids, leftover = f.result()
+                rejected |= failed_ids
+                unsent.extend(leftover)
+                for k, v in stats.items():
+                    report[k] += v
+        report["batches"] += len(futures)
+        report["elapsedMs"] += int((time.monotonic() - started) * 1000)
+
+        # Not accepted: keep the last recorded state so a later sweep resubmits them
+        for res_id in rejected | {e["ComplianceResourceId"] for e in unsent}:
+            h = id_hash(res_id)
+            if h in previous:
+                seen[h] = previous[h]
+            else:
+                seen.pop(h, None)
+
+        if handed_off or unsent:
+            lease = str(uuid.uuid4())
+            report["hops"] += 1
+            carry = _carry(unsent, event)
+            if len(carry) < len(unsent):
+                report["deferred"] += len(unsent) - len(carry)
+                print(f"{len(unsent) - len(carry)} unsent evaluation(s) exceed the hand-off payload; deferred to the next sweep")
+            _save_snapshot(pending_key, seen)
+            _save_checkpoint(self.checkpoint_param, next_token, report, lease, list_done)
+            _hand_off(event, context, hop + 1, lease, carry)
+            print(json.dumps({"sweepCheckpoint": report, "carried": len(carry)}))
+            return report
+
+        _save_snapshot(self.snapshot_key, seen)
+        if cp:
+            _delete_snapshot(pending_key)
+        _clear_checkpoint(self.checkpoint_param)
+        print(json.dumps({"sweepReport": report}))
+        return report
+
+    def handler(self, event, context):
+        inv = json.loads(event["invokingEvent"])
+        token = event["resultToken"]
+        msg   = inv["messageType"]
+
+        if msg == "ConfigurationItemChangeNotification" and self.check_item is not None:
+            item = inv["configurationItem"]
+            if item.get("resourceType") != self.resource_type:
+                config.put_evaluations(Evaluations=[], ResultToken=token)
+                return
+            compliant, annotation = self.evaluate_item(item)
+            ev = evaluation(self.resource_type, item["resourceId"], compliant, annotation)
+            config.put_evaluations(Evaluations=[ev], ResultToken=token)
+
+        elif msg == "ScheduledNotification":
+            return self.sweep(event, token, context)
+
+        else:
+            config.put_evaluations(Evaluations=[], ResultToken=token)
@@ -0,0 +1,30 @@
+# Config rule: NON_COMPLIANT when an EBS volume is not encrypted (handler: ebs_encryption_rule.handler)
+import boto3
+
+from config_rule import ConfigRule, client_cfg, item_configuration, paginated
+
+ec2 = boto3.client("ec2", config=client_cfg)
+
+def _annotation(encrypted: bool) -> str:
+    return "Volume is encrypted." if encrypted else "Volume is NOT encrypted."
+
+def _check_volumes(volumes):
+    for v in volumes:
+        ok = bool(v.get("Encrypted"))
+        yield v["VolumeId"], ok, _annotation(ok)
+
+def _check_item(item):
+    ok = bool(item_configuration(item).get("encrypted"))
+    return ok, _annotation(ok)
+
+rule = ConfigRule(
+    name="ebs-encryption",
+    resource_type="AWS::EC2::Volume",
+    list_resources=paginated(ec2.describe_volumes, "Volumes", "NextToken", "NextToken", MaxResults=500),
+    check=_check_volumes,
+    check_item=_check_item,
+    not_applicable="Volume no longer exists.",
+)
+
+def handler(event, context):
+    return rule.handler(event, context)
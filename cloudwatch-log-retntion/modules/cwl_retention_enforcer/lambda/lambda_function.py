@@ -1,59 +1,98 @@
-import json, boto3, datetime
-logs = boto3.client("logs")
-config = boto3.client("config")
+# Config rule: NON_COMPLIANT when a CloudWatch log group has no retention policy (framework: config_rule.py)
+import os, time, boto3
+from collections import OrderedDict
 
-def _has_retention(name: str) -> bool:
-    # Check a single group by prefix; safe for exact names too
+from config_rule import ConfigRule, client_cfg, item_configuration, paginated
+
+logs = boto3.client("logs", config=client_cfg)
+
+# Short-lived lookup cache shared by warm invocations: name -> (expires_at, retention or None),
+# least recently used first and bounded to RETENTION_CACHE_MAX entries
+RETENTION_CACHE_TTL_S = float(os.environ.get("RETENTION_CACHE_TTL_SECONDS", "30"))
+RETENTION_CACHE_MAX = int(os.environ.get("RETENTION_CACHE_MAX", "10000"))
+_MISSING = object()
+_retention_cache = OrderedDict()
+
+def _cache_get(name: str, now: float):
+    hit = _retention_cache.get(name)
+    if hit is None:
+        return None
+    if hit[0] <= now:
+        del _retention_cache[name]
+        return None
+    _retention_cache.move_to_end(name)
+    return hit
+
+def _cache_put(name: str, value, now: float):
+    _retention_cache[name] = (now + RETENTION_CACHE_TTL_S, value)
+    _retention_cache.move_to_end(name)
+    while len(_retention_cache) > RETENTION_CACHE_MAX:
+        _retention_cache.popitem(last=False)
+
+def _lookup_retention(name: str):
+    """
+    Exact-match lookup: log groups come back sorted, so the exact name is the
+    first result for its own prefix if it exists (a bare prefix scan would
+    return `/app-old` for a deleted `/app`). Returns retentionInDays, None when
+    unset, or _MISSING when the group does not exist.
+    """
+    now = time.monotonic()
+    hit = _cache_get(name, now)
+    if hit:
+        return hit[1]
     resp = logs.describe_log_groups(logGroupNamePrefix=name, limit=1)
     groups = resp.get("logGroups", [])
-    if not groups:          # deleted between event and evaluation
-        return True
-    return groups[0].get("retentionInDays") is not None
-
-def _put_eval(res_id: str, compliant: bool, token: str):
-    config.put_evaluations(
-        Evaluations=[{
-            "ComplianceResourceType": "AWS::Logs::LogGroup",
-            "ComplianceResourceId":   res_id,
-            "ComplianceType":         "COMPLIANT" if compliant else "NON_COMPLIANT",
-            "Annotation":             "Retention is set." if compliant else "Retention is NOT set.",
-            "OrderingTimestamp":      datetime.datetime.now(datetime.timezone.utc)
-        }],
-        ResultToken=token
-    )
+    if groups and groups[0].get("logGroupName") == name:
+        value = groups[0].get("retentionInDays")
+    else:
+        value = _MISSING
+    _cache_put(name, value, now)
+    return value
 
-def handler(event, context):
-    inv = json.loads(event["invokingEvent"])
-    token = event["resultToken"]
-    msg   = inv["messageType"]
-
-    if msg == "ConfigurationItemChangeNotification":
-        item = inv["configurationItem"]
-        if item.get("resourceType") != "AWS::Logs::LogGroup":
-            config.put_evaluations(Evaluations=[], ResultToken=token)
-            return
-        name = item["resourceId"]
-        _put_eval(name, _has_retention(name), token)
-
-    elif msg == "ScheduledNotification":
-        paginator = logs.get_paginator("describe_log_groups")
-        batch = []
-        for page in paginator.paginate():
-            for g in page.get("logGroups", []):
-                name = g["logGroupName"]
-                ok   = g.get("retentionInDays") is not None
-                batch.append({
-                    "ComplianceResourceType": "AWS::Logs::LogGroup",
-                    "ComplianceResourceId":   name,
-                    "ComplianceType":         "COMPLIANT" if ok else "NON_COMPLIANT",
-                    "Annotation":             "Retention is set." if ok else "Retention is NOT set.",
-                    "OrderingTimestamp":      datetime.datetime.now(datetime.timezone.utc)
-                })
-                if len(batch) == 100:
-                    config.put_evaluations(Evaluations=batch, ResultToken=token)
-                    batch = []
-        if batch:
-            config.put_evaluations(Evaluations=batch, ResultToken=token)
+def _has_retention(name: str, item: dict = None):
+    """
+    True/False for an existing group, None when it no longer exists. Reads the
+    configurationItem payload when it carries the group's configuration and
+    only falls back to the API otherwise.
+    """
+    cfg = item_configuration(item)
+    if cfg:
+        value = cfg.get("retentionInDays")
+        _cache_put(name, value, time.monotonic())
+        return value is not None
+    value = _lookup_retention(name)
+    if value is _MISSING:
+        return None
+    return value is not None
 
-    else:
-        config.put_evaluations(Evaluations=[], ResultToken=token)
+def _annotation(compliant) -> str:
+    if compliant is None:
+        return "Log group no longer exists."
+    return "Retention is set." if compliant else "Retention is NOT set."
+
+def _check_groups(groups):
+    for g in groups:
+        ok = g.get("retentionInDays") is not None
+        yield g["logGroupName"], ok, _annotation(ok)
+
+def _forget(item):
+    # a deleted group must not be answered from the cache if it is recreated
+    _retention_cache.pop(item["resourceId"], None)
+
+def _check_item(item):
+    compliant = _has_retention(item["resourceId"], item)
+    return compliant, _annotation(compliant)
+
+rule = ConfigRule(
+    name="cwl-retention",
+    resource_type="AWS::Logs::LogGroup",
+    list_resources=paginated(logs.describe_log_groups, "logGroups"),
+    check=_check_groups,
+    check_item=_check_item,
+    not_applicable=_annotation(None),
+    on_deleted=_forget,
+    count_key="logGroups",  # sweepReport key kept from before the framework
+)
+
+def handler(event, context):
+    return rule.handler(event, context)
@@ -0,0 +1,69 @@
+# Config rule: NON_COMPLIANT when an S3 bucket has no enabled lifecycle rule that expires objects
+# (see ControlTowerDocs/cloudformation/s3-*-lifecycle.yaml; handler: s3_lifecycle_rule.handler)
+import os, boto3
+
+from botocore.exceptions import ClientError
+from config_rule import ConfigRule, client_cfg, item_configuration, map_concurrent, paginated
+
+s3 = boto3.client("s3", config=client_cfg)
+REGION = os.environ.get("AWS_REGION", "us-east-1")
+
+def _positive(value) -> bool:
+    try:
+        return int(value) > 0
+    except (TypeError, ValueError):
+        return False
+
+def _expires(rule: dict) -> bool:
+    # API shape (Expiration / NoncurrentVersionExpiration) and Config item shape, where unset
+    # values are present as expirationInDays=-1 / expirationDate=null
+    status = rule.get("Status") or rule.get("status") or ""
+    if status.lower() != "enabled":
+        return False
+    expiration = rule.get("Expiration") or {}
+    noncurrent = rule.get("NoncurrentVersionExpiration") or {}
+    item_noncurrent = rule.get("noncurrentVersionExpiration") or {}
+    return (_positive(expiration.get("Days")) or bool(expiration.get("Date"))
+            or _positive(noncurrent.get("NoncurrentDays"))
+            or _positive(rule.get("expirationInDays")) or bool(rule.get("expirationDate"))
+            or _positive(rule.get("noncurrentVersionExpirationInDays"))
+            or _positive(item_noncurrent.get("noncurrentDays")))
+
+def _annotation(compliant) -> str:
+    if compliant is None:
+        return "Bucket no longer exists."
+    return "Lifecycle expiration is set." if compliant else "No enabled lifecycle rule expires objects."
+
+def _check_bucket(name: str):
+    try:
+        rules = s3.get_bucket_lifecycle_configuration(Bucket=name).get("Rules", [])
+    except ClientError as e:
+        code = e.response.get("Error", {}).get("Code")
+        if code == "NoSuchBucket":
+            return name, None, _annotation(None)
+        if code != "NoSuchLifecycleConfiguration":
+            # e.g. AccessDenied on one bucket: report it instead of failing the whole sweep
+            return name, False, f"Lifecycle configuration could not be read: {code}"
+        rules = []
+    ok = any(_expires(r) for r in rules)
+    return name, ok, _annotation(ok)
+
+def _check_item(item):
+    lifecycle = item_configuration(item.get("supplementaryConfiguration") or {}, "BucketLifecycleConfiguration")
+    ok = any(_expires(r) for r in lifecycle.get("rules", []))
+    return ok, _annotation(ok)
+
+rule = ConfigRule(
+    name="s3-lifecycle",
+    resource_type="AWS::S3::Bucket",
+    # Config is regional: only this region's buckets
+    list_resources=paginated(s3.list_buckets, "Buckets", "ContinuationToken", "ContinuationToken",
+                             BucketRegion=REGION, MaxBuckets=1000),
+    # one lifecycle lookup per bucket, run concurrently for the page
+    check=lambda buckets: map_concurrent(_check_bucket, [b["Name"] for b in buckets]),
+    check_item=_check_item,
+    not_applicable=_annotation(None),
+)
+
+def handler(event, context):
+    return rule.handler(event, context)
@@ -1,9 +1,19 @@
-import os, json, boto3, datetime
+import os, sys, json, time, boto3, datetime
+from collections import Counter, defaultdict
 
-sns = boto3.client("sns")
-TOPIC_ARN = os.environ["TOPIC_ARN"]
+TOPIC_ARN = os.environ.get("TOPIC_ARN", "")
 SUBJECT_PREFIX = os.environ.get("SUBJECT_PREFIX", "[CWL Retention]")
 
+# Digest mode: "off" publishes one message per event (original behaviour),
+# "window" buffers events and publishes one summary per flush.
+DIGEST_MODE       = os.environ.get("DIGEST_MODE", "off").lower()
+DIGEST_QUEUE_URL  = os.environ.get("DIGEST_QUEUE_URL", "")
+DIGEST_TOP_N      = int(os.environ.get("DIGEST_TOP_N", "10"))
+DIGEST_MAX_DRAIN  = int(os.environ.get("DIGEST_MAX_DRAIN", "3000"))
+DRAIN_RESERVE_MS  = int(os.environ.get("DRAIN_RESERVE_MS", "10000"))     # left for digest, publish and ack
+MAX_MESSAGE_BYTES = int(os.environ.get("MAX_MESSAGE_BYTES", "200000"))  # SNS hard limit is 256 KB
+MAX_SUBJECT_CHARS = 100                                                  # SNS hard limit
+
 def _extract(e):
     detail  = e.get("detail", {}) or {}
     account = e.get("account", "unknown")
@@ -23,7 +33,166 @@ def _extract(e):
     annotation = detail.get("annotation") or ""
     return account, region, rule, status, resource, annotation
 
-def handler(event, context):
+# ---------- Publishers ----------
+class SnsPublisher:
+    def __init__(self, topic_arn, client=None):
+        self.topic_arn = topic_arn
+        self.client = client or boto3.client("sns")
+
+    def publish(self, subject, message):
+        self.client.publish(TopicArn=self.topic_arn, Subject=subject, Message=message)
+
+class StubPublisher:
+    """Local stand-in for SNS: keeps every published message in memory."""
+    def __init__(self):
+        self.messages = []
+
+    def publish(self, subject, message):
+        self.messages.append({"Subject": subject, "Message": message})
+
+# ---------- Buffer stores ----------
+class SqsBuffer:
+    """Event buffer backed by an SQS queue; messages are deleted only after the digest is published."""
+    def __init__(self, queue_url, client=None):
+        self.queue_url = queue_url
+        self.client = client or boto3.client("sqs")
+
+    def append(self, record):
+        self.client.send_message(QueueUrl=self.queue_url, MessageBody=json.dumps(record))
+
+    def drain(self, limit=DIGEST_MAX_DRAIN, context=None):
+        """
+        Receive up to limit messages, stopping early when less than
+        DRAIN_RESERVE_MS of the invocation is left; the rest stay queued for
+        the next flush. A short poll can come back empty while messages are
+        still in flight, so the first empty receive is retried with a 1s wait.
+        """
+        records, handles = [], []
+        waited = False
+        while len(records) < limit:
+            if context is not None and context.get_remaining_time_in_millis() < DRAIN_RESERVE_MS:
+                break
+            resp = self.client.receive_message(QueueUrl=self.queue_url, MaxNumberOfMessages=10,
+                                               WaitTimeSeconds=1 if waited else 0, VisibilityTimeout=300)
+            msgs = resp.get("Messages", [])
+            if not msgs:
+                if waited:
+                    break
+                waited = True
+                continue
+            for m in msgs:
+                records.append(json.loads(m["Body"]))
+                handles.append(m["ReceiptHandle"])
+
+        def ack():
+            for i in range(0, len(handles), 10):
+                self.client.delete_message_batch(
+                    QueueUrl=self.queue_url,
+                    Entries=[{"Id": str(j), "ReceiptHandle": h} for j, h in enumerate(handles[i:i + 10])])
+        return records, ack
+
+class MemoryBuffer:
+    """Local stand-in for the buffer store."""
+    def __init__(self):
+        self.records = []
+
+    def append(self, record):
+        self.records.append(record)
+
+    def drain(self, limit=DIGEST_MAX_DRAIN, context=None):
+        taken, self.records = self.records[:limit], self.records[limit:]
+        return taken, lambda: None
+
+_buffer = None
+_publisher = None
+
+def _default_buffer():
+    global _buffer
+    if _buffer is None:
+        _buffer = SqsBuffer(DIGEST_QUEUE_URL)
+    return _buffer
+
+def _default_publisher():
+    global _publisher
+    if _publisher is None:
+        _publisher = SnsPublisher(TOPIC_ARN)
+    return _publisher
+
+# ---------- Digest ----------
+def _is_flush(event):
+    return event.get("digest") == "flush" or (
+        event.get("source") == "aws.events" and event.get("detail-type") == "Scheduled Event")
+
+def _record(event):
+    account, region, rule, status, resource, annotation = _extract(event)
+    return {"account": account, "region": region, "rule": rule, "status": status,
+            "resource": resource, "time": event.get("time") or datetime.datetime.now(datetime.timezone.utc).isoformat()}
+
+def build_digest(records, top_n=DIGEST_TOP_N, max_bytes=MAX_MESSAGE_BYTES):
+    """
+    Group buffered records by account/region/status and return (subject, message)
+    with counts and the top-N resources per group. top_n is halved until the
+    JSON fits max_bytes; groups are dropped (smallest first) as a last resort.
+    """
+    groups = defaultdict(lambda: {"count": 0, "rules": Counter(), "resources": Counter()})
+    times = []
+    for r in records:
+        g = groups[(r["account"], r["region"], r["status"])]
+        g["count"] += 1
+        g["rules"][r["rule"]] += 1
+        g["resources"][r["resource"]] += 1
+        times.append(r.get("time") or "")
+    ordered = sorted(groups.items(), key=lambda kv: (-kv[1]["count"], kv[0]))
+    window = {"from": min(times) if times else "", "to": max(times) if times else ""}
+
+    def render(n, keep):
+        body = {"events": len(records), "window": window, "groups": []}
+        for (account, region, status), g in ordered[:keep]:
+            top = g["resources"].most_common(n) if n else []
+            body["groups"].append({
+                "account": account, "region": region, "status": status, "count": g["count"],
+                "distinctResources": len(g["resources"]), "rules": dict(g["rules"]),
+                "topResources": [{"resource": res, "events": c} for res, c in top],
+            })
+        if keep < len(ordered):
+            body["truncatedGroups"] = len(ordered) - keep
+        return json.dumps(body, indent=1)
+
+    n, keep = top_n, len(ordered)
+    message = render(n, keep)
+    while len(message.encode()) > max_bytes and n > 0:
+        n //= 2
+        message = render(n, keep)
+    while len(message.encode()) > max_bytes and keep > 0:
+        keep //= 2
+        message = render(n, keep)
+
+    statuses = Counter()
+    for (_, _, status), g in ordered:
+        statuses[status] += g["count"]
+    summary = ", ".join(f"{c} {s}" for s, c in statuses.most_common())
+    subject = f"{SUBJECT_PREFIX} Digest: {summary or 'no changes'}"[:MAX_SUBJECT_CHARS]
+    return subject, message
+
+def flush(buffer=None, publisher=None, context=None):
+    buffer = buffer or _default_buffer()
+    publisher = publisher or _default_publisher()
+    records, ack = buffer.drain(context=context)
+    if not records:
+        return {"ok": True, "events": 0}
+    subject, message = build_digest(records)
+    publisher.publish(subject, message)
+    ack()
+    return {"ok": True, "events": len(records), "subject": subject, "bytes": len(message.encode())}
+
+def handler(event, context, buffer=None, publisher=None):
+    if _is_flush(event):
+        return flush(buffer, publisher, context)
+
+    if DIGEST_MODE == "window":
+        (buffer or _default_buffer()).append(_record(event))
+        return {"ok": True, "buffered": True}
+
     account, region, rule, status, resource, annotation = _extract(event)
     subject = f"{SUBJECT_PREFIX} [{account}/{region}] {status} - {resource}"
     body = {
@@ -34,11 +203,20 @@ def handler(event, context):
         "resource": resource,
         "annotation": annotation,
         "time": datetime.datetime.now(datetime.timezone.utc).isoformat(),
-        "raw": event,  # useful for debugging; 
+        "raw": event,  # useful for debugging;
     }
-    sns.publish(
-        TopicArn=TOPIC_ARN,
-        Subject=subject,
-        Message=json.dumps(body, indent=2, default=str),
-    )
+    (publisher or _default_publisher()).publish(subject, json.dumps(body, indent=2, default=str))
     return {"ok": True, "subject": subject}
+
+if __name__ == "__main__":
+    # Local dry run: python lambda_function.py events.json  (a JSON list of Config compliance events)
+    events = json.load(open(sys.argv[1]))
+    buf, pub = MemoryBuffer(), StubPublisher()
+    started = time.perf_counter()
+    for ev in events:
+        buf.append(_record(ev))
+    print(json.dumps(flush(buf, pub), indent=2))
+    print(f"{len(events)} event(s) -> {len(pub.messages)} message(s) in {time.perf_counter() - started:.3f}s")
+    for m in pub.messages:
+        print(m["Subject"])
+        print(m["Message"])
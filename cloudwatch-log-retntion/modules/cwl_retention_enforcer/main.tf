@@ -12,6 +12,13 @@ module "rule_lambda" {
   # The module zips this directory for you
   source_path = var.lambda_source_dir # default = "${path.module}/lambda"
 
+  # Scheduled sweep time budget: checkpoint + continuation instead of a longer timeout
+  environment_variables = {
+    CHECKPOINT_PARAMETER = var.sweep_checkpoint_parameter
+    SWEEP_RESERVE_MS     = tostring(var.sweep_time_reserve_ms)
+    SNAPSHOT_BUCKET      = var.sweep_snapshot_bucket
+  }
+
   # Create role and attach policies
   create_role = false
   lambda_role = var.lambda_execution_role_arn
@@ -294,8 +301,11 @@ module "email_lambda" {
 
   # Variables the function reads
   environment_variables = {
-    TOPIC_ARN      = module.cwl_retention_notifications.topic_arn
-    SUBJECT_PREFIX = "[CWL Retention]"
+    TOPIC_ARN        = module.cwl_retention_notifications.topic_arn
+    SUBJECT_PREFIX   = "[CWL Retention]"
+    DIGEST_MODE      = var.digest_mode
+    DIGEST_QUEUE_URL = var.digest_mode == "window" ? aws_sqs_queue.digest_buffer[0].url : ""
+    DIGEST_TOP_N     = tostring(var.digest_top_n)
   }
 
   # Allow EventBridge rule to invoke this Lambda
@@ -308,6 +318,31 @@ module "email_lambda" {
   }
 }
 
+# ---------- Digest mode: buffer queue + periodic flush ----------
+resource "aws_sqs_queue" "digest_buffer" {
+  count = var.digest_mode == "window" ? 1 : 0
+
+  name                       = "cwl-retention-notifications-digest-buffer"
+  visibility_timeout_seconds = 300
+  message_retention_seconds  = 345600
+}
+
+resource "aws_cloudwatch_event_rule" "digest_flush" {
+  count = var.digest_mode == "window" ? 1 : 0
+
+  name                = "cwl-retention-notifications-digest-flush"
+  description         = "Flush buffered CWL retention compliance events as one digest"
+  schedule_expression = "rate(${var.digest_window_minutes} ${var.digest_window_minutes == 1 ? "minute" : "minutes"})"
+}
+
+resource "aws_cloudwatch_event_target" "digest_flush_target" {
+  count = var.digest_mode == "window" ? 1 : 0
+
+  rule      = aws_cloudwatch_event_rule.digest_flush[0].name
+  target_id = "FlushDigest"
+  arn       = module.email_lambda.lambda_function_arn
+}
+
 # Then change eventbridge to invoke lambda
 # resource "aws_cloudwatch_event_target" "sns_target" {
 #   rule      = aws_cloudwatch_event_rule.config_compliance_change.name
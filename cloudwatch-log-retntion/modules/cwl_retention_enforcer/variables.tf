@@ -35,6 +35,25 @@ variable "remediation_role_name" {
   default     = "cw-retention-remediator"
 }
 
+# ---- Scheduled sweep ----
+variable "sweep_checkpoint_parameter" {
+  description = "SSM parameter where the scheduled sweep checkpoints its describe_log_groups nextToken before handing off."
+  type        = string
+  default     = "/cwl-retention/config-cwl-retention-missing/sweep-checkpoint"
+}
+
+variable "sweep_time_reserve_ms" {
+  description = "Remaining-time threshold (ms) at which the sweep checkpoints and re-invokes itself."
+  type        = number
+  default     = 15000
+}
+
+variable "sweep_snapshot_bucket" {
+  description = "S3 bucket holding the compliance snapshot used to submit only changed log groups. Empty disables delta mode."
+  type        = string
+  default     = ""
+}
+
 # ---- Code packaging ----
 variable "lambda_source_dir" {
   description = "Directory containing lambda_function.py (and optional deps)."
@@ -46,3 +65,27 @@ variable "lambda_source_dir" {
 variable "notification_emails" {
   type = any
 }
+
+# ---- Notifications ----
+variable "digest_mode" {
+  description = "off = one SNS message per compliance change; window = buffer events in SQS and publish one digest per window."
+  type        = string
+  default     = "off"
+}
+
+variable "digest_window_minutes" {
+  description = "Digest window (flush schedule) in minutes when digest_mode = window."
+  type        = number
+  default     = 15
+
+  validation {
+    condition     = var.digest_window_minutes >= 1 && floor(var.digest_window_minutes) == var.digest_window_minutes
+    error_message = "digest_window_minutes must be a whole number of minutes, at least 1."
+  }
+}
+
+variable "digest_top_n" {
+  description = "Resources listed per account/region/status group in a digest."
+  type        = number
+  default     = 10
+}
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Record/replay layer for the botocore clients created by aws_sessions.get_client().
+
+  AWS_REPLAY_MODE=record AWS_REPLAY_DIR=cassettes/run1 python inspector_ec2_report.py --all
+  AWS_REPLAY_MODE=replay AWS_REPLAY_DIR=cassettes/run1 AWS_REPLAY_LATENCY=recorded python inspector_ec2_report.py --all
+
+Every API call (each page of a paginator is a call) is keyed by
+(profile or assumed role, region, service, operation, canonical request
+params). In record mode the parsed response is appended to a gzip JSON Lines
+cassette, <dir>/<profile>/<region>/<service>.jsonl.gz. Cassettes are
+rewritten per run. Each record includes the HTTP status, so errors replay as
+the same ClientError, and the call's latency. Repeated identical calls are
+replayed in recorded order, and the last response repeats after that.
+
+Replay answers from the before-call hook, so nothing is sent or signed and
+no credentials or network are needed. Profiles missing from ~/.aws/config
+fall back to an anonymous session. A call missing from the cassette raises
+ReplayMiss. AWS_REPLAY_LATENCY adds artificial latency per call:
+  0 (default) | 50 (ms) | 20-80 (uniform ms) | recorded | recorded*0.5
+
+STS credentials are redacted when recorded (the AccessKeyId is kept). While
+recording or replaying, aws_sessions skips its identity and assumed-role
+disk caches, so the cassettes hold every call a run needs.
+
+  python aws_replay.py stats cassettes/run1       per-cassette call counts and recorded latency
+"""
+
+import argparse
+import base64
+import gzip
+import io
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+MODES = ("record", "replay")
+REDACT = {"SecretAccessKey", "SessionToken"}
+_SAFE = re.compile(r"[^A-Za-z0-9_.@-]+")
+
+
+class ReplayMiss(LookupError):
+    """A call that is not in the cassette (replay mode)."""
+
+
+def mode() -> str:
+    value = os.getenv("AWS_REPLAY_MODE", "").strip().lower()
+    return value if value in MODES else ""
+
+
+def replay_dir() -> str:
+    return os.getenv("AWS_REPLAY_DIR", "cassettes")
+
+
+# ---------- Encoding ----------
+
+def _encode(obj):
+    """JSON-safe copy of a parsed response: datetimes, bytes and streaming bodies are tagged."""
+    if isinstance(obj, dict):
+        return {k: ("REDACTED" if k in REDACT else _encode(v)) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_encode(v) for v in obj]
+    if isinstance(obj, datetime):
+        return {"__dt__": obj.isoformat()}
+    if isinstance(obj, (bytes, bytearray)):
+        return {"__b64__": base64.b64encode(bytes(obj)).decode()}
+    return obj
+
+
+def _decode(obj):
+    if isinstance(obj, dict):
+        if "__dt__" in obj:
+            return datetime.fromisoformat(obj["__dt__"])
+        if "__b64__" in obj:
+            return base64.b64decode(obj["__b64__"])
+        if "__body__" in obj:
+            from botocore.response import StreamingBody
+            data = base64.b64decode(obj["__body__"])
+            return StreamingBody(io.BytesIO(data), len(data))
+        return {k: _decode(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_decode(v) for v in obj]
+    return obj
+
+
+def request_key(operation: str, params: Dict) -> str:
+    return operation + " " + json.dumps(params, sort_keys=True, default=str, separators=(",", ":"))
+
+
+def parse_latency(spec: str):
+    """-> callable(recorded_ms) -> seconds to sleep."""
+    spec = (spec or "0").strip().lower()
+    if spec.startswith("recorded"):
+        scale = float(spec.partition("*")[2] or 1)
+        return lambda recorded_ms: max(0.0, recorded_ms * scale / 1000)
+    if "-" in spec:
+        lo, hi = (float(x) for x in spec.split("-", 1))
+        return lambda _: random.uniform(lo, hi) / 1000
+    fixed = float(spec) / 1000
+    return lambda _: fixed
+
+
+# ---------- Cassettes ----------
+
+class Cassette:
+    """One gzip JSON Lines file per (label, region, service)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._fh = None
+        self._calls: Optional[Dict[str, List[Dict]]] = None
+        self._next: Dict[str, int] = defaultdict(int)
+
+    def append(self, record: Dict):
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._fh is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._fh = gzip.open(self.path, "wt", encoding="utf-8")
+            self._fh.write(line)
+
+    def close(self):
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+    def lookup(self, key: str) -> Dict:
+        with self._lock:
+            if self._calls is None:
+                self._calls = defaultdict(list)
+                try:
+                    with gzip.open(self.path, "rt", encoding="utf-8") as fh:
+                        for line in fh:
+                            rec = json.loads(line)
+                            self._calls[rec["key"]].append(rec)
+                except FileNotFoundError:
+                    pass
+            recorded = self._calls.get(key)
+            if not recorded:
+                raise ReplayMiss(f"{key[:300]} not recorded in {self.path}")
+            i = self._next[key]
+            self._next[key] = i + 1
+            return recorded[min(i, len(recorded) - 1)]
+
+
+_cassettes: Dict[str, Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+
+def cassette(label: str, region: Optional[str], service: str) -> Cassette:
+    path = os.path.join(replay_dir(), _SAFE.sub("_", label), _SAFE.sub("_", region or "global"),
+                        f"{_SAFE.sub('_', service)}.jsonl.gz")
+    with _cassettes_lock:
+        c = _cassettes.get(path)
+        if c is None:
+            c = _cassettes[path] = Cassette(path)
+            if len(_cassettes) == 1:
+                import atexit
+                atexit.register(close_all)
+        return c
+
+
+def close_all():
+    with _cassettes_lock:
+        for c in _cassettes.values():
+            c.close()
+
+
+# ---------- botocore hooks ----------
+
+class _ReplayedHttp:
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+        self.headers: Dict[str, str] = {}
+        self.content = b""
+
+
+def attach(client, label: Optional[str]):
+    """Registers the record or replay hooks on one client; no-op when AWS_REPLAY_MODE is unset."""
+    active = mode()
+    if not active:
+        return client
+    events = client.meta.events
+    tape = cassette(label or "default", client.meta.region_name, client.meta.service_model.service_name)
+
+    def remember(params, model, context, **_):
+        context["aws_replay_key"] = request_key(model.name, params)
+        context["aws_replay_t0"] = time.perf_counter()
+
+    events.register("provide-client-params", remember)
+
+    if active == "record":
+        def record(http_response, parsed, model, context, **_):
+            if "aws_replay_key" not in context:
+                return
+            parsed = dict(parsed)
+            parsed.pop("ResponseMetadata", None)
+            for k, v in list(parsed.items()):
+                if hasattr(v, "read") and hasattr(v, "close"):  # StreamingBody: buffer it for the caller too
+                    from botocore.response import StreamingBody
+                    data = v.read()
+                    parsed[k] = {"__body__": base64.b64encode(data).decode()}
+                    context.setdefault("aws_replay_bodies", {})[k] = StreamingBody(io.BytesIO(data), len(data))
+            tape.append({"key": context["aws_replay_key"], "status": http_response.status_code,
+                         "ms": round((time.perf_counter() - context["aws_replay_t0"]) * 1000, 1),
+                         "response": _encode(parsed)})
+
+        def restore_bodies(parsed, context, **_):
+            parsed.update(context.pop("aws_replay_bodies", {}))
+
+        events.register("after-call", record)
+        events.register_last("after-call", restore_bodies)
+    else:
+        delay = parse_latency(os.getenv("AWS_REPLAY_LATENCY", "0"))
+
+        def replay(model, context, **_):
+            rec = tape.lookup(context.get("aws_replay_key") or request_key(model.name, {}))
+            pause = delay(rec.get("ms", 0))
+            if pause:
+                time.sleep(pause)
+            parsed = _decode(rec["response"])
+            parsed["ResponseMetadata"] = {"HTTPStatusCode": rec["status"], "HTTPHeaders": {}, "RetryAttempts": 0}
+            return _ReplayedHttp(rec["status"]), parsed
+
+        events.register("before-call", replay)
+    return client
+
+
+# ---------- CLI ----------
+
+def iter_cassettes(root: str):
+    for d, _, files in os.walk(root):
+        for f in sorted(files):
+            if f.endswith(".jsonl.gz"):
+                yield os.path.join(d, f)
+
+
+def cassette_stats(path: str) -> Tuple[int, Dict[str, int], float]:
+    calls, ops, ms = 0, defaultdict(int), 0.0
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        for line in fh:
+            rec = json.loads(line)
+            calls += 1
+            ops[rec["key"].split(" ", 1)[0]] += 1
+            ms += rec.get("ms", 0)
+    return calls, ops, ms
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect recorded AWS API cassettes (see AWS_REPLAY_MODE).")
+    sub = parser.add_subparsers(dest="command", required=True)
+    stats = sub.add_parser("stats", help="Calls, operations and recorded latency per cassette")
+    stats.add_argument("dir", nargs="?", default=None, help="Cassette directory (default: $AWS_REPLAY_DIR or ./cassettes)")
+    args = parser.parse_args(argv)
+
+    root = args.dir or replay_dir()
+    total_calls, total_ms = 0, 0.0
+    for path in iter_cassettes(root):
+        calls, ops, ms = cassette_stats(path)
+        total_calls += calls
+        total_ms += ms
+        top = ", ".join(f"{op}={n}" for op, n in sorted(ops.items(), key=lambda kv: -kv[1])[:4])
+        print(f"  {os.path.relpath(path, root):<55} {calls:>7} calls {ms / 1000:>8.1f}s  {top}")
+    print(f"Total: {total_calls} calls, {total_ms / 1000:.1f}s of recorded API time")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Shared boto3 session/client layer for the python-scripts toolkit.
+
+- Sessions are cached per profile (or assumed role) and clients per
+  (profile, region, service), so a script that loops over profiles/regions
+  loads botocore's models and credential chain once per profile and builds
+  each client once. Creation is serialized with a lock (boto3 sessions are not
+  thread-safe); the returned clients are safe to share between threads.
+- get_caller_identity() results are kept in memory and on disk for
+  IDENTITY_TTL seconds.
+- Assumed-role credentials are cached in memory and on disk until
+  STS_EXPIRY_MARGIN seconds before they expire, so reruns skip sts:AssumeRole.
+
+The disk cache lives in $AWS_SCRIPTS_CACHE_DIR (default ~/.cache/aws-scripts).
+boto3 is imported on first use only.
+
+With AWS_REPLAY_MODE=record|replay every client is hooked into aws_replay.py
+(cassettes in $AWS_REPLAY_DIR), and the disk cache is bypassed so a run
+records, and can replay, all of its calls.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+CACHE_DIR = os.path.expanduser(os.getenv("AWS_SCRIPTS_CACHE_DIR", "~/.cache/aws-scripts"))
+IDENTITY_TTL = int(os.getenv("AWS_SCRIPTS_IDENTITY_TTL", "900"))
+STS_EXPIRY_MARGIN = 300
+
+_lock = threading.RLock()
+_sessions: Dict[Tuple, object] = {}
+_clients: Dict[Tuple, object] = {}
+_identities: Dict[str, Tuple[float, Dict]] = {}
+_role_creds: Dict[Tuple, Dict] = {}
+
+
+def default_config():
+    from botocore.config import Config
+    return Config(retries={"max_attempts": 10, "mode": "standard"})
+
+
+# ---------- Disk cache ----------
+
+def _cache_path(kind: str, key: str) -> str:
+    return os.path.join(CACHE_DIR, kind, hashlib.sha256(key.encode()).hexdigest() + ".json")
+
+
+def _replaying() -> bool:
+    return os.getenv("AWS_REPLAY_MODE", "").strip().lower() in ("record", "replay")
+
+
+def _read_cache(kind: str, key: str) -> Optional[Dict]:
+    if _replaying():
+        return None
+    try:
+        with open(_cache_path(kind, key), encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(kind: str, key: str, value: Dict):
+    if _replaying():
+        return
+    path = _cache_path(kind, key)
+    try:
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        fd = os.open(path + ".tmp", os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(value, fh)
+        os.replace(path + ".tmp", path)
+    except OSError:
+        pass  # cache is best effort
+
+
+# ---------- Sessions & clients ----------
+
+def get_session(profile: Optional[str] = None):
+    """One session per profile; the region is chosen per client (get_client / session.client(region_name=...))."""
+    key = profile
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            import boto3
+            from botocore.exceptions import ProfileNotFound
+            try:
+                session = boto3.Session(profile_name=profile)
+            except ProfileNotFound:
+                # replay needs no credentials: run offline without the profile
+                if os.getenv("AWS_REPLAY_MODE", "").strip().lower() != "replay":
+                    raise
+                session = boto3.Session()
+            _sessions[key] = session
+        return session
+
+
+def get_client(service: str, profile: Optional[str] = None, region: Optional[str] = None, config=None,
+               session=None):
+    """
+    Cached client for (profile, region, service). Pass `session` for sessions
+    not created by get_session() (e.g. assume_role()); they are keyed by id.
+    The config only applies when the client is first created.
+    """
+    owner = ("session", id(session)) if session is not None else profile
+    key = (owner, region, service)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            label = getattr(session, "replay_label", None) if session is not None else profile
+            session = session or get_session(profile)
+            client = session.client(service, region_name=region, config=config or default_config())
+            if _replaying():
+                import aws_replay
+                aws_replay.attach(client, label)
+            _clients[key] = client
+        return client
+
+
+def caller_identity(profile: Optional[str] = None, fresh: bool = False) -> Dict:
+    """
+    sts:GetCallerIdentity for a profile, cached in memory and on disk for
+    IDENTITY_TTL seconds. fresh=True always calls STS (and refreshes the
+    cache), so expired or revoked credentials raise here.
+    """
+    cache_key = profile or "<default>"
+    now = time.time()
+    with _lock:
+        hit = _identities.get(cache_key)
+    if hit and hit[0] > now and not fresh:
+        return hit[1]
+
+    cached = None if fresh else _read_cache("identity", cache_key)
+    if cached and cached.get("expires", 0) > now:
+        ident = cached["identity"]
+    else:
+        resp = get_client("sts", profile=profile).get_caller_identity()
+        ident = {k: resp.get(k) for k in ("Account", "Arn", "UserId")}
+        _write_cache("identity", cache_key, {"identity": ident, "expires": now + IDENTITY_TTL})
+    with _lock:
+        _identities[cache_key] = (now + IDENTITY_TTL, ident)
+    return ident
+
+
+# ---------- Assumed roles ----------
+
+def _creds_valid(creds: Optional[Dict]) -> bool:
+    return bool(creds) and creds.get("Expiration", 0) - STS_EXPIRY_MARGIN > time.time()
+
+
+def assume_role(role_arn: str, session_name: str = "aws-scripts", profile: Optional[str] = None,
+                duration: int = 3600):
+    """
+    boto3.Session for an assumed role. Credentials are reused from memory or
+    disk until shortly before they expire; sessions are cached per role and,
+    like get_session(), take the region per client.
+    """
+    key = (role_arn, session_name, profile)
+    cache_key = "|".join(str(k) for k in key)
+    with _lock:
+        creds = _role_creds.get(key)
+    if not _creds_valid(creds):
+        creds = _read_cache("sts", cache_key)
+        if not _creds_valid(creds):
+            resp = get_client("sts", profile=profile).assume_role(
+                RoleArn=role_arn, RoleSessionName=session_name, DurationSeconds=duration)["Credentials"]
+            expiration = resp["Expiration"]
+            if isinstance(expiration, datetime):
+                expiration = expiration.astimezone(timezone.utc).timestamp()
+            creds = {
+                "AccessKeyId": resp["AccessKeyId"],
+                "SecretAccessKey": resp["SecretAccessKey"],
+                "SessionToken": resp["SessionToken"],
+                "Expiration": expiration,
+            }
+            _write_cache("sts", cache_key, creds)
+
+    with _lock:
+        old = _role_creds.get(key)
+        session_key = ("role",) + key
+        if old is not creds and old != creds:
+            # New credentials: drop the stale session and its clients.
+            stale = _sessions.pop(session_key, None)
+            if stale is not None:
+                for ck in [ck for ck in _clients if ck[0] == ("session", id(stale))]:
+                    del _clients[ck]
+        _role_creds[key] = creds
+        session = _sessions.get(session_key)
+        if session is None:
+            import boto3
+            session = boto3.Session(
+                aws_access_key_id=creds["AccessKeyId"],
+                aws_secret_access_key=creds["SecretAccessKey"],
+                aws_session_token=creds["SessionToken"],
+            )
+            session.replay_label = role_arn  # stable cassette name for this role (aws_replay)
+            _sessions[session_key] = session
+        return session
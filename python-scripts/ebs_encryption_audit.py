@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Verify EBS encryption across all local AWS profiles (see
+ebs-encryption/strategy.md: account-level encryption by default).
+
+Per profile/region, concurrently:
+- get_ebs_encryption_by_default (and the default KMS key when enabled)
+- describe_volumes / describe_snapshots (own snapshots) filtered server-side
+  with encrypted=false, so only unencrypted resources come back
+- attached volumes are mapped to their instance through an instance index
+  built once per region (instance id -> name, state)
+
+Rows are streamed to the CSV as each page arrives, so memory is bounded by
+the instance index and one API page, not by the estate size.
+
+Usage examples:
+  python ebs_encryption_audit.py
+  python ebs_encryption_audit.py --regions us-east-1,eu-west-1 --profiles prod,staging --no-snapshots
+"""
+
+import argparse
+import csv
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Tuple
+
+from aws_sessions import get_client
+from list_public_ec2_by_profiles import OUTDIR, list_profiles, valid_session
+
+OUTFILE = f"ebs_encryption_audit_{datetime.today().strftime('%Y-%m-%d')}.csv"
+FIELDS = ["Profile", "AccountId", "Region", "ResourceType", "ResourceId", "State", "SizeGiB",
+          "InstanceId", "InstanceName", "InstanceState", "Device", "CreateTime", "Detail"]
+UNENCRYPTED = [{"Name": "encrypted", "Values": ["false"]}]
+
+
+class StreamingCsv:
+    """Thread-safe CSV writer shared by all region scans."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._fh = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._fh, fieldnames=FIELDS)
+        self._writer.writeheader()
+        self.rows = 0
+
+    def write(self, rows):
+        if not rows:
+            return
+        with self._lock:
+            self._writer.writerows({k: r.get(k, "") for k in FIELDS} for r in rows)
+            self.rows += len(rows)
+
+    def close(self):
+        self._fh.close()
+
+
+def build_instance_index(ec2) -> Dict[str, Tuple[str, str]]:
+    index = {}
+    for page in ec2.get_paginator("describe_instances").paginate():
+        for res in page.get("Reservations", []):
+            for inst in res.get("Instances", []):
+                name = next((t.get("Value", "") for t in inst.get("Tags", []) or [] if t.get("Key") == "Name"), "")
+                index[inst["InstanceId"]] = (name, (inst.get("State") or {}).get("Name", ""))
+    return index
+
+
+def audit_region(profile, account_id, region, out: StreamingCsv, include_snapshots=True):
+    """Returns (region, profile, default_enabled, unencrypted volumes, unencrypted snapshots, seconds, error)."""
+    started = time.perf_counter()
+    base = {"Profile": profile, "AccountId": account_id, "Region": region}
+    try:
+        ec2 = get_client("ec2", profile=profile, region=region)
+        enabled = bool(ec2.get_ebs_encryption_by_default().get("EbsEncryptionByDefault"))
+        if enabled:
+            kms = ec2.get_ebs_default_kms_key_id().get("KmsKeyId", "")
+            detail = f"default KMS key: {kms}"
+        else:
+            detail = "new volumes are NOT encrypted by default"
+        out.write([dict(base, ResourceType="EncryptionByDefault", ResourceId=region,
+                        State="enabled" if enabled else "disabled", Detail=detail)])
+
+        instances = build_instance_index(ec2)
+        volumes = 0
+        for page in ec2.get_paginator("describe_volumes").paginate(Filters=UNENCRYPTED, PaginationConfig={"PageSize": 500}):
+            rows = []
+            for vol in page.get("Volumes", []):
+                att = (vol.get("Attachments") or [{}])[0]
+                name, inst_state = instances.get(att.get("InstanceId", ""), ("", ""))
+                rows.append(dict(base, ResourceType="Volume", ResourceId=vol["VolumeId"], State=vol.get("State", ""),
+                                 SizeGiB=vol.get("Size", ""), InstanceId=att.get("InstanceId", ""), InstanceName=name,
+                                 InstanceState=inst_state, Device=att.get("Device", ""),
+                                 CreateTime=str(vol.get("CreateTime", "")), Detail=f"type={vol.get('VolumeType', '')}"))
+            out.write(rows)
+            volumes += len(rows)
+
+        snapshots = 0
+        if include_snapshots:
+            paginator = ec2.get_paginator("describe_snapshots")
+            for page in paginator.paginate(OwnerIds=["self"], Filters=UNENCRYPTED, PaginationConfig={"PageSize": 1000}):
+                rows = [dict(base, ResourceType="Snapshot", ResourceId=s["SnapshotId"], State=s.get("State", ""),
+                             SizeGiB=s.get("VolumeSize", ""), CreateTime=str(s.get("StartTime", "")),
+                             Detail=f"volume={s.get('VolumeId', '')}")
+                        for s in page.get("Snapshots", [])]
+                out.write(rows)
+                snapshots += len(rows)
+        return region, profile, enabled, volumes, snapshots, time.perf_counter() - started, ""
+    except Exception as e:  # one failing region must not sink the scan
+        return region, profile, None, 0, 0, time.perf_counter() - started, str(e)
+
+
+def print_summary(results):
+    print("\n== EBS encryption summary ==")
+    print(f"  {'profile':<20} {'region':<15} {'default':<9} {'volumes':>8} {'snapshots':>9} {'secs':>6}")
+    for region, profile, enabled, volumes, snapshots, elapsed, error in sorted(results, key=lambda r: (r[1], r[0])):
+        if error:
+            print(f"  {profile:<20} {region:<15} ERROR: {error}")
+            continue
+        print(f"  {profile:<20} {region:<15} {'on' if enabled else 'OFF':<9} {volumes:>8} {snapshots:>9} {elapsed:>6.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Audit EBS encryption-by-default and unencrypted volumes/snapshots across local AWS profiles.")
+    parser.add_argument("--regions", default="us-east-1", help="Comma-separated regions (default: us-east-1)")
+    parser.add_argument("--profiles", default=None, help="Comma-separated profiles (default: all in ~/.aws/config)")
+    parser.add_argument("--max-workers", type=int, default=16, help="Concurrent profile/region scans (default: 16)")
+    parser.add_argument("--no-snapshots", action="store_true", help="Skip the describe_snapshots pass")
+    args = parser.parse_args(argv)
+
+    regions = [r.strip() for r in args.regions.split(",") if r.strip()]
+    profiles = [p.strip() for p in args.profiles.split(",")] if args.profiles else list_profiles()
+    if not profiles:
+        print("[!] No profiles found in ~/.aws/config")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    accounts = {}
+    for profile in profiles:
+        session, account_id, arn = valid_session(profile)
+        if not session:
+            print(f"[!] Skipping profile {profile}")
+            continue
+        print(f"[+] {profile}: authenticated as {arn} (Account {account_id})")
+        accounts[profile] = account_id
+
+    os.makedirs(OUTDIR, exist_ok=True)
+    out = StreamingCsv(os.path.join(OUTDIR, OUTFILE))
+    results = []
+    try:
+        with ThreadPoolExecutor(max_workers=args.max_workers) as pool:
+            futures = [pool.submit(audit_region, p, a, r, out, not args.no_snapshots)
+                       for p, a in accounts.items() for r in regions]
+            for fut in as_completed(futures):
+                res = fut.result()
+                results.append(res)
+                region, profile, enabled, volumes, snapshots, _, error = res
+                if error:
+                    print(f"    [!] {profile}/{region}: {error}")
+                elif not enabled or volumes or snapshots:
+                    print(f"    [+] {profile}/{region}: default={'on' if enabled else 'OFF'}, "
+                          f"{volumes} unencrypted volume(s), {snapshots} unencrypted snapshot(s)")
+    finally:
+        out.close()
+
+    print_summary(results)
+    print(f"\n[+] Wrote {out.rows} rows → {out.path}")
+    print(f"[*] Done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
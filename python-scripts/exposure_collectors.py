@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Pluggable collectors for internet-exposed resources.
+
+A collector is a function registered with @collector("name") that takes a
+RegionContext and returns exposure rows. Every collector for an
+account/region shares one subnet/route-table index (build_rtb_maps()), built
+once per region, so "is this subnet public" is a dict lookup everywhere.
+
+Row fields: ResourceType, ResourceId, Name, Endpoint, Ports, Detail
+(Profile/AccountId/Region are added by the scanner).
+"""
+
+from typing import Callable, Dict, List, Tuple
+
+from aws_sessions import get_client
+from list_public_ec2_by_profiles import build_rtb_maps, gather_public_instances_for_region, rtb_has_public_default_route
+
+COLLECTORS: Dict[str, Callable[["RegionContext"], List[Dict]]] = {}
+
+
+def collector(name: str):
+    def register(fn):
+        COLLECTORS[name] = fn
+        return fn
+    return register
+
+
+class RegionContext:
+    """One profile/region: client factory plus the shared route-table index."""
+
+    def __init__(self, profile: str, region: str):
+        self.profile = profile
+        self.region = region
+        self.rtb_maps: Tuple[Dict, Dict] = ({}, {})
+        self.subnet_vpc: Dict[str, str] = {}
+
+    def client(self, service: str):
+        return get_client(service, profile=self.profile, region=self.region)
+
+    def build_index(self):
+        ec2 = self.client("ec2")
+        self.rtb_maps = build_rtb_maps(ec2)
+        for page in ec2.get_paginator("describe_subnets").paginate():
+            for sn in page.get("Subnets", []):
+                self.subnet_vpc[sn["SubnetId"]] = sn.get("VpcId", "")
+        return self
+
+    def subnet_is_public(self, subnet_id: str) -> bool:
+        subnet_to_rtb, vpc_to_main_rtb = self.rtb_maps
+        rtb = subnet_to_rtb.get(subnet_id) or vpc_to_main_rtb.get(self.subnet_vpc.get(subnet_id, ""))
+        return rtb_has_public_default_route(rtb)
+
+    def any_public(self, subnet_ids) -> bool:
+        return any(self.subnet_is_public(s) for s in subnet_ids if s)
+
+
+def _row(rtype: str, rid: str, name: str = "", endpoint: str = "", ports: str = "", detail: str = "") -> Dict:
+    return {"ResourceType": rtype, "ResourceId": rid, "Name": name, "Endpoint": endpoint, "Ports": ports, "Detail": detail}
+
+
+# ---------- Collectors ----------
+
+@collector("ec2")
+def collect_ec2(ctx: RegionContext) -> List[Dict]:
+    rows = []
+    for r in gather_public_instances_for_region(ctx.client("ec2"), ctx.region, rtb_maps=ctx.rtb_maps):
+        rows.append(_row("AWS::EC2::Instance", r["InstanceId"], r["Name"], r["PublicIps"] or r["PublicIp"],
+                         r["OpenPorts"], f"state={r['State']}"))
+    return rows
+
+
+@collector("elbv2")
+def collect_elbv2(ctx: RegionContext) -> List[Dict]:
+    rows = []
+    for page in ctx.client("elbv2").get_paginator("describe_load_balancers").paginate():
+        for lb in page.get("LoadBalancers", []):
+            if lb.get("Scheme") != "internet-facing":
+                continue
+            subnets = [az.get("SubnetId") for az in lb.get("AvailabilityZones", [])]
+            if not ctx.any_public(subnets):
+                continue
+            rows.append(_row(f"AWS::ElasticLoadBalancingV2::LoadBalancer/{lb.get('Type', '')}",
+                             lb["LoadBalancerArn"], lb.get("LoadBalancerName", ""), lb.get("DNSName", ""),
+                             detail=f"sgs={','.join(lb.get('SecurityGroups', []))}"))
+    return rows
+
+
+@collector("elb")
+def collect_classic_elb(ctx: RegionContext) -> List[Dict]:
+    rows = []
+    for page in ctx.client("elb").get_paginator("describe_load_balancers").paginate():
+        for lb in page.get("LoadBalancerDescriptions", []):
+            if lb.get("Scheme") != "internet-facing":
+                continue
+            if lb.get("Subnets") and not ctx.any_public(lb["Subnets"]):
+                continue
+            ports = ",".join(str(l["Listener"]["LoadBalancerPort"]) for l in lb.get("ListenerDescriptions", []))
+            rows.append(_row("AWS::ElasticLoadBalancing::LoadBalancer", lb["LoadBalancerName"],
+                             lb["LoadBalancerName"], lb.get("DNSName", ""), ports))
+    return rows
+
+
+@collector("rds")
+def collect_rds(ctx: RegionContext) -> List[Dict]:
+    rows = []
+    for page in ctx.client("rds").get_paginator("describe_db_instances").paginate():
+        for db in page.get("DBInstances", []):
+            if not db.get("PubliclyAccessible"):
+                continue
+            subnets = [s.get("SubnetIdentifier") for s in (db.get("DBSubnetGroup") or {}).get("Subnets", [])]
+            if subnets and not ctx.any_public(subnets):
+                continue
+            ep = db.get("Endpoint") or {}
+            rows.append(_row("AWS::RDS::DBInstance", db.get("DBInstanceArn", db["DBInstanceIdentifier"]),
+                             db["DBInstanceIdentifier"], ep.get("Address", ""), str(ep.get("Port", "")),
+                             f"engine={db.get('Engine', '')}"))
+    return rows
+
+
+@collector("redshift")
+def collect_redshift(ctx: RegionContext) -> List[Dict]:
+    rows = []
+    for page in ctx.client("redshift").get_paginator("describe_clusters").paginate():
+        for cl in page.get("Clusters", []):
+            if not cl.get("PubliclyAccessible"):
+                continue
+            ep = cl.get("Endpoint") or {}
+            rows.append(_row("AWS::Redshift::Cluster", cl["ClusterIdentifier"], cl["ClusterIdentifier"],
+                             ep.get("Address", ""), str(ep.get("Port", ""))))
+    return rows
+
+
+@collector("opensearch")
+def collect_opensearch(ctx: RegionContext) -> List[Dict]:
+    client = ctx.client("opensearch")
+    names = [d["DomainName"] for d in client.list_domain_names().get("DomainNames", [])]
+    rows = []
+    for i in range(0, len(names), 5):  # describe_domains accepts up to 5 names
+        for d in client.describe_domains(DomainNames=names[i:i + 5]).get("DomainStatusList", []):
+            if d.get("VPCOptions", {}).get("VPCId"):
+                continue  # VPC domains are not internet-facing
+            rows.append(_row("AWS::OpenSearchService::Domain", d.get("ARN", d["DomainName"]), d["DomainName"],
+                             d.get("Endpoint", ""), "443"))
+    return rows
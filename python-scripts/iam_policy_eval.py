@@ -0,0 +1,598 @@
+#!/usr/bin/env python3
+"""
+Offline IAM policy evaluator: no AWS calls.
+
+Policies are loaded once and compiled into an indexed form:
+- Action / NotAction: exact actions in a set, wildcards in one
+  case-insensitive regex per statement. To list effective actions, the
+  patterns are expanded over a character trie of the known action catalog.
+  The patterns themselves are always listed too; expansions are marked as
+  catalog-derived, since the catalog is incomplete.
+- Resource / NotResource: ARN globs where `*` and `?` stay inside their
+  colon-separated segment, except in the final resource part. Policy
+  variables (${aws:username}) come from --context; without a value the
+  statement is conditional.
+- Condition: operator -> lower-cased key -> values, evaluated against
+  --context key=value pairs. When a key is missing from an empty context,
+  the outcome is "Conditional" instead of a guess.
+
+Decision: an explicit Deny in any policy of the principal wins, then any
+Allow, otherwise ImplicitDeny. Only identity policies are considered: no
+SCPs, permission boundaries or resource policies. Identical documents
+(same canonical JSON) are compiled and evaluated once, and results are
+cached by document hash. This keeps thousands of permission sets or roles
+that share policies cheap.
+
+Inputs (files or directories, mixed):
+  policy.json                                one policy; the principal is the file name
+  aws iam get-account-authorization-details  roles and users with inline, managed and group policies
+  *.jsonl                                    {"principal": ..., "policy": {...} or "<json string>"} per line
+                                             (ps-checker.py/permission_sets_checker.py --policies-out)
+
+Usage examples:
+  python iam_policy_eval.py check ../iam-task/policies --action s3:GetObject --resource "arn:aws:s3:::com.hoopladigital.ml.x/k"
+  python iam_policy_eval.py check auth-details.json --queries queries.csv --csv-out decisions.csv
+  python iam_policy_eval.py actions permission_sets.jsonl --principal AdminAccess --service iam
+"""
+
+import argparse
+import csv
+import hashlib
+import ipaddress
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+DECISIONS = ("Allow", "ExplicitDeny", "Conditional", "ImplicitDeny")
+_VARIABLE = re.compile(r"\$\{([^}]+)\}")
+_LITERAL_VARS = {"*": "*", "?": "?", "$": "$"}
+
+
+def to_list(x) -> List:
+    if x is None:
+        return []
+    return x if isinstance(x, list) else [x]
+
+
+def doc_hash(doc: Dict) -> str:
+    return hashlib.sha256(json.dumps(doc, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+# ---------- Matchers ----------
+
+def _glob(pattern: str, star: str = ".*") -> str:
+    return "".join(star if c == "*" else "." if c == "?" else re.escape(c) for c in pattern)
+
+
+def _arn_glob(pattern: str) -> str:
+    # arn:partition:service:region:account:resource -- wildcards stay inside the first five segments
+    parts = pattern.split(":", 5)
+    if len(parts) < 6 or parts[0] != "arn":
+        return _glob(pattern)
+    return ":".join([_glob(p, "[^:]*") for p in parts[:5]] + [_glob(parts[5])])
+
+
+class GlobSet:
+    """Exact values in a set, wildcard patterns in one alternation regex."""
+    __slots__ = ("match_all", "exact", "regex")
+
+    def __init__(self, patterns: Iterable[str], ignore_case: bool = False, arn: bool = False):
+        patterns = [p.lower() if ignore_case else p for p in patterns]
+        self.match_all = "*" in patterns
+        self.exact = {p for p in patterns if "*" not in p and "?" not in p}
+        wild = [p for p in patterns if p not in self.exact]
+        self.regex = re.compile("|".join((_arn_glob if arn else _glob)(p) for p in wild), re.S) if wild else None
+
+    def __call__(self, value: str) -> bool:
+        return self.match_all or value in self.exact or bool(self.regex and self.regex.fullmatch(value))
+
+
+class ActionTrie:
+    """Catalog of known actions (lower-case) for expanding Get*, *Object, s3:* ..."""
+
+    def __init__(self, actions: Iterable[str] = ()):
+        self.root: Dict = {}
+        self.size = 0
+        for a in actions:
+            self.add(a)
+
+    def add(self, action: str):
+        node = self.root
+        for ch in action.lower():
+            node = node.setdefault(ch, {})
+        if "$" not in node:
+            node["$"] = action
+            self.size += 1
+
+    def expand(self, pattern: str) -> Set[str]:
+        pattern, out, seen = pattern.lower(), set(), set()
+        stack = [(self.root, 0)]
+        while stack:
+            node, i = stack.pop()
+            if (id(node), i) in seen:
+                continue
+            seen.add((id(node), i))
+            if i == len(pattern):
+                if "$" in node:
+                    out.add(node["$"])
+                continue
+            ch = pattern[i]
+            if ch == "*":
+                stack.append((node, i + 1))
+                stack.extend((child, i) for k, child in node.items() if k != "$")
+            elif ch == "?":
+                stack.extend((child, i + 1) for k, child in node.items() if k != "$")
+            elif ch in node:
+                stack.append((node[ch], i + 1))
+        return out
+
+
+# ---------- Conditions ----------
+
+def _num(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _compare(op: str, actual: str, expected: str) -> Optional[bool]:
+    """One operator on one value pair; None when the operator is not supported."""
+    if op in ("StringEquals", "ArnEquals"):
+        return actual == expected
+    if op == "StringEqualsIgnoreCase":
+        return actual.lower() == expected.lower()
+    if op in ("StringLike", "ArnLike"):
+        return GlobSet([expected], arn=op == "ArnLike")(actual)
+    if op == "Bool":
+        return actual.lower() == expected.lower()
+    if op.startswith("Numeric"):
+        a, e = _num(actual), _num(expected)
+        if a is None or e is None:
+            return False
+        return {"NumericEquals": a == e, "NumericLessThan": a < e, "NumericLessThanEquals": a <= e,
+                "NumericGreaterThan": a > e, "NumericGreaterThanEquals": a >= e}.get(op)
+    if op == "IpAddress":
+        try:
+            return ipaddress.ip_address(actual) in ipaddress.ip_network(expected, strict=False)
+        except ValueError:
+            return False
+    return None
+
+
+_NEGATED = {"StringNotEquals": "StringEquals", "StringNotEqualsIgnoreCase": "StringEqualsIgnoreCase",
+            "StringNotLike": "StringLike", "ArnNotEquals": "ArnEquals", "ArnNotLike": "ArnLike",
+            "NumericNotEquals": "NumericEquals", "NotIpAddress": "IpAddress"}
+
+
+def normalize_conditions(cond) -> List[Tuple[str, str, List[str]]]:
+    """[(operator, lower-cased key, [values as str])]; Bool/Numeric values are stringified."""
+    out = []
+    for op, block in (cond or {}).items():
+        for key, values in (block or {}).items():
+            out.append((op, key.lower(), [str(v).lower() if isinstance(v, bool) else str(v) for v in to_list(values)]))
+    return out
+
+
+def condition_met(op: str, key: str, expected: List[str], context: Dict[str, List[str]]) -> Optional[bool]:
+    """True/False, or None when the request context cannot decide it."""
+    qualifier, _, base = op.rpartition(":")          # ForAnyValue: / ForAllValues:
+    if_exists = base.endswith("IfExists")
+    base = base[:-len("IfExists")] if if_exists else base
+    actual = context.get(key)
+
+    if base == "Null":
+        if not context:
+            return None
+        return (actual is None) == (expected[0].lower() == "true")
+    if actual is None:
+        if not context:
+            return None
+        # a missing key never matches; negated operators are then true
+        return if_exists or base in _NEGATED or qualifier == "ForAllValues"
+    negated = base in _NEGATED
+    base = _NEGATED.get(base, base)
+
+    def one(value: str) -> Optional[bool]:
+        hits = [_compare(base, value, e) for e in expected]
+        if None in hits:
+            return None
+        return any(hits)
+
+    results = [one(v) for v in actual]
+    if None in results:
+        return None
+    if qualifier == "ForAllValues":
+        ok = all(results)
+    else:
+        ok = any(results)
+    return not ok if negated else ok
+
+
+# ---------- Compiled policies ----------
+
+class Statement:
+    __slots__ = ("sid", "effect", "actions", "not_action", "action_patterns", "resources", "not_resource",
+                 "resource_patterns", "conditions")
+
+    def __init__(self, stmt: Dict, index: int):
+        self.sid = str(stmt.get("Sid") or f"#{index}")
+        self.effect = str(stmt.get("Effect", "Allow")).capitalize()
+        self.not_action = "NotAction" in stmt
+        self.action_patterns = [str(a) for a in to_list(stmt.get("NotAction" if self.not_action else "Action"))]
+        self.actions = GlobSet(self.action_patterns, ignore_case=True)
+        self.not_resource = "NotResource" in stmt
+        self.resource_patterns = [str(r) for r in to_list(stmt.get("NotResource" if self.not_resource else "Resource"))
+                                  ] or ["*"]
+        self.resources = None if any(_VARIABLE.search(p) for p in self.resource_patterns) \
+            else GlobSet(self.resource_patterns, arn=True)
+        self.conditions = normalize_conditions(stmt.get("Condition"))
+
+    def action_matches(self, action: str) -> bool:
+        return self.actions(action.lower()) != self.not_action
+
+    def resource_matches(self, resource: str, context: Dict[str, List[str]]) -> Optional[bool]:
+        matcher = self.resources
+        if matcher is None:  # policy variables: resolve from the context
+            resolved = []
+            for p in self.resource_patterns:
+                try:
+                    resolved.append(_VARIABLE.sub(lambda m: _LITERAL_VARS.get(m.group(1)) or context[m.group(1).lower()][0], p))
+                except KeyError:
+                    return None
+            matcher = GlobSet(resolved, arn=True)
+        return matcher(resource) != self.not_resource
+
+    def applies(self, action: str, resource: str, context: Dict[str, List[str]]) -> Optional[bool]:
+        if not self.action_matches(action):
+            return False
+        res = self.resource_matches(resource, context)
+        if res is False:
+            return False
+        cond = True
+        for op, key, values in self.conditions:
+            met = condition_met(op, key, values, context)
+            if met is False:
+                return False
+            if met is None:
+                cond = None
+        return None if res is None or cond is None else True
+
+    @property
+    def unconditional_all_resources(self) -> bool:
+        return not self.conditions and not self.not_resource and "*" in self.resource_patterns
+
+
+class Policy:
+    __slots__ = ("hash", "statements")
+
+    def __init__(self, doc: Dict):
+        self.hash = doc_hash(doc)
+        stmts = doc.get("Statement", [])
+        self.statements = [Statement(s, i) for i, s in enumerate(to_list(stmts)) if isinstance(s, dict)]
+
+
+class PolicyStore:
+    """principal -> policy hashes; each distinct document compiled once, query results cached per hash."""
+
+    def __init__(self):
+        self.policies: Dict[str, Policy] = {}
+        self.principals: Dict[str, List[str]] = defaultdict(list)
+        self.literal_actions: Set[str] = set()
+        self._results: Dict[Tuple, Tuple] = {}
+        self._effective: Dict[str, Tuple] = {}
+
+    def add(self, principal: str, doc) -> Optional[str]:
+        if isinstance(doc, str):
+            try:
+                doc = json.loads(doc)
+            except ValueError:
+                print(f"[!] {principal}: invalid policy JSON, skipped")
+                return None
+        if not isinstance(doc, dict):
+            return None
+        h = doc_hash(doc)
+        if h not in self.policies:
+            policy = self.policies[h] = Policy(doc)
+            for st in policy.statements:
+                self.literal_actions.update(p for p in st.action_patterns if "*" not in p and "?" not in p)
+        if h not in self.principals[principal]:
+            self.principals[principal].append(h)
+        return h
+
+    # -- authorization queries --
+
+    def _policy_result(self, h: str, action: str, resource: str, context: Dict[str, List[str]], ctx_key) -> Tuple:
+        """(deny sids, conditional deny sids, allow sids, conditional allow sids) for one document."""
+        key = (h, action.lower(), resource, ctx_key)
+        hit = self._results.get(key)
+        if hit is None:
+            buckets = ([], [], [], [])
+            for st in self.policies[h].statements:
+                applies = st.applies(action, resource, context)
+                if applies is False:
+                    continue
+                slot = (0 if st.effect == "Deny" else 2) + (1 if applies is None else 0)
+                buckets[slot].append(st.sid)
+            hit = self._results[key] = tuple(tuple(b) for b in buckets)
+        return hit
+
+    def evaluate(self, principal: str, action: str, resource: str = "*",
+                 context: Optional[Dict[str, List[str]]] = None) -> Tuple[str, List[str]]:
+        """(decision, deciding statements as 'hash8:sid')."""
+        context = context or {}
+        ctx_key = tuple(sorted((k, tuple(v)) for k, v in context.items()))
+        found = ([], [], [], [])
+        for h in self.principals.get(principal, []):
+            for slot, sids in enumerate(self._policy_result(h, action, resource, context, ctx_key)):
+                found[slot].extend(f"{h[:8]}:{s}" for s in sids)
+        deny, cond_deny, allow, cond_allow = found
+        if deny:
+            return "ExplicitDeny", deny
+        if allow and not cond_deny:
+            return "Allow", allow
+        if allow or cond_allow:
+            return "Conditional", cond_deny + allow + cond_allow
+        return "ImplicitDeny", []
+
+    # -- effective actions --
+
+    def _policy_effective(self, h: str, trie: ActionTrie) -> Tuple:
+        """
+        (allowed entry -> (resources, conditional, source), denied actions, deny globs) for one document.
+        Action patterns are kept as written (source "policy"); their expansions
+        over the catalog are added next to them as source "catalog". The
+        catalog is incomplete and botocore operation names only approximate
+        IAM actions, so an expansion never replaces the pattern.
+        """
+        hit = self._effective.get(h)
+        if hit is None:
+            allowed: Dict[str, Tuple[Set[str], bool, str]] = {}
+            denied: Set[str] = set()
+            deny_globs: List[GlobSet] = []
+            for st in self.policies[h].statements:
+                entries: Dict[str, str] = {}
+                if st.not_action:
+                    excluded = {m.lower() for p in st.action_patterns for m in (trie.expand(p) | {p})}
+                    entries["NotAction " + ",".join(st.action_patterns)] = "policy"
+                    for a in trie.expand("*"):
+                        if a.lower() not in excluded:
+                            entries.setdefault(a, "catalog")
+                else:
+                    for p in st.action_patterns:
+                        entries[p] = "policy"
+                    for p in st.action_patterns:
+                        for a in trie.expand(p):
+                            entries.setdefault(a, "catalog")
+                if st.effect == "Deny":
+                    if st.unconditional_all_resources:
+                        denied |= {a.lower() for a, src in entries.items() if src == "catalog" or not st.not_action}
+                        if not st.not_action:
+                            deny_globs.append(st.actions)
+                    continue
+                for a, source in entries.items():
+                    resources, conditional, prev_source = allowed.get(a, (set(), False, source))
+                    resources |= {("!" if st.not_resource else "") + r for r in st.resource_patterns}
+                    allowed[a] = (resources, conditional or bool(st.conditions),
+                                  "policy" if "policy" in (source, prev_source) else "catalog")
+            hit = self._effective[h] = (allowed, denied, deny_globs)
+        return hit
+
+    def effective_actions(self, principal: str, trie: ActionTrie) -> Dict[str, Tuple[Set[str], bool, str]]:
+        """action or pattern -> (resources, conditional, source); source is "policy" or "catalog"."""
+        allowed: Dict[str, Tuple[Set[str], bool, str]] = {}
+        denied: Set[str] = set()
+        deny_globs: List[GlobSet] = []
+        for h in self.principals.get(principal, []):
+            doc_allowed, doc_denied, doc_globs = self._policy_effective(h, trie)
+            denied |= doc_denied
+            deny_globs.extend(doc_globs)
+            for a, (resources, conditional, source) in doc_allowed.items():
+                prev = allowed.get(a)
+                if prev:
+                    allowed[a] = (resources | prev[0], conditional and prev[1],
+                                  "policy" if "policy" in (source, prev[2]) else "catalog")
+                else:
+                    allowed[a] = (set(resources), conditional, source)
+        # a Deny glob also removes allowed patterns it covers entirely (Deny s3:* removes s3:Get*)
+        return {a: v for a, v in allowed.items()
+                if a.lower() not in denied and not any(g(a.lower()) for g in deny_globs)}
+
+
+# ---------- Loading ----------
+
+def _default_version(policy: Dict) -> Optional[Dict]:
+    for v in policy.get("PolicyVersionList", []):
+        if v.get("IsDefaultVersion"):
+            return v.get("Document")
+    return None
+
+
+def load_authorization_details(store: PolicyStore, data: Dict, source: str) -> int:
+    """aws iam get-account-authorization-details: roles and users (with their groups' policies)."""
+    managed = {p["Arn"]: _default_version(p) for p in data.get("Policies", [])}
+    groups = {g["GroupName"]: g for g in data.get("GroupDetailList", [])}
+
+    def attach(principal: str, detail: Dict, inline_key: str):
+        for p in detail.get(inline_key, []):
+            store.add(principal, p.get("PolicyDocument"))
+        for p in detail.get("AttachedManagedPolicies", []):
+            if managed.get(p.get("PolicyArn")) is not None:
+                store.add(principal, managed[p["PolicyArn"]])
+            else:
+                print(f"[!] {principal}: managed policy {p.get('PolicyArn')} not in {source} (AWS managed policies "
+                      f"need --filter LocalManagedPolicy AWSManagedPolicy), skipped")
+
+    n = 0
+    for role in data.get("RoleDetailList", []):
+        attach(role["Arn"], role, "RolePolicyList")
+        n += 1
+    for user in data.get("UserDetailList", []):
+        attach(user["Arn"], user, "UserPolicyList")
+        for g in user.get("GroupList", []):
+            if g in groups:
+                attach(user["Arn"], groups[g], "GroupPolicyList")
+        n += 1
+    return n
+
+
+def load_file(store: PolicyStore, path: str) -> int:
+    """Loads one file into the store; returns the number of principals/policies read."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    with open(path, encoding="utf-8") as fh:
+        if path.endswith(".jsonl"):
+            n = 0
+            for line in fh:
+                line = line.strip()
+                if line:
+                    rec = json.loads(line)
+                    store.add(str(rec.get("principal") or name), rec.get("policy"))
+                    n += 1
+            return n
+        data = json.load(fh)
+    if isinstance(data, dict) and ("RoleDetailList" in data or "UserDetailList" in data):
+        return load_authorization_details(store, data, path)
+    if isinstance(data, dict) and "Statement" in data:
+        store.add(name, data)
+        return 1
+    print(f"[!] {path}: not a policy, .jsonl bundle or authorization details file, skipped")
+    return 0
+
+
+def load_paths(paths: Iterable[str]) -> PolicyStore:
+    store = PolicyStore()
+    started = time.perf_counter()
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(os.path.join(d, f) for d, _, fs in os.walk(path) for f in fs if f.endswith((".json", ".jsonl")))
+        else:
+            files = [path]
+        for f in files:
+            load_file(store, f)
+    print(f"[+] {len(store.principals)} principal(s), {len(store.policies)} distinct policies "
+          f"({time.perf_counter() - started:.2f}s)", file=sys.stderr)
+    return store
+
+
+def load_catalog(store: PolicyStore, catalog_path: Optional[str]) -> ActionTrie:
+    """
+    Known actions for expansion: the literal actions found in the loaded
+    policies, the --catalog file (one service:Action per line) and, when
+    botocore is installed, its API operation names (which approximate IAM
+    action names).
+    """
+    trie = ActionTrie(store.literal_actions)
+    if catalog_path:
+        with open(catalog_path, encoding="utf-8") as fh:
+            for line in fh:
+                if line.strip() and not line.startswith("#"):
+                    trie.add(line.strip())
+    try:
+        import botocore.session
+    except ImportError:
+        return trie
+    loader = botocore.session.get_session().get_component("data_loader")
+    for service in loader.list_available_services("service-2"):
+        model = loader.load_service_model(service, "service-2")
+        prefix = model["metadata"].get("signingName") or model["metadata"].get("endpointPrefix") or service
+        for op in model.get("operations", {}):
+            trie.add(f"{prefix}:{op}")
+    return trie
+
+
+# ---------- Output ----------
+
+def parse_context(pairs: Iterable[str]) -> Dict[str, List[str]]:
+    context: Dict[str, List[str]] = defaultdict(list)
+    for pair in pairs or []:
+        key, _, value = pair.partition("=")
+        context[key.strip().lower()].append(value)
+    return dict(context)
+
+
+def select_principals(store: PolicyStore, wanted: Optional[str]) -> List[str]:
+    if not wanted:
+        return sorted(store.principals)
+    names = [p for p in store.principals if p == wanted or p.endswith("/" + wanted)]
+    if not names:
+        raise SystemExit(f"Principal not found: {wanted}")
+    return names
+
+
+def run_check(store: PolicyStore, args) -> List[List[str]]:
+    context = parse_context(args.context)
+    if args.queries:
+        with open(args.queries, newline="", encoding="utf-8") as fh:
+            queries = [(r.get("principal") or "", r["action"], r.get("resource") or "*") for r in csv.DictReader(fh)]
+    else:
+        if not args.action:
+            raise SystemExit("check needs --action or --queries")
+        queries = [("", a, args.resource) for a in args.action]
+
+    started = time.perf_counter()
+    rows = []
+    for principal, action, resource in queries:
+        for name in select_principals(store, principal or args.principal):
+            decision, sids = store.evaluate(name, action, resource, context)
+            rows.append([name, action, resource, decision, ";".join(sids)])
+    print(f"[+] {len(rows)} evaluation(s) in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+    return rows
+
+
+def run_actions(store: PolicyStore, args) -> List[List[str]]:
+    trie = load_catalog(store, args.catalog)
+    service = (args.service or "").lower()
+    rows = []
+    for name in select_principals(store, args.principal):
+        for action, (resources, conditional, source) in sorted(store.effective_actions(name, trie).items()):
+            if service and not action.lower().startswith(service + ":") and not action.startswith("NotAction "):
+                continue
+            rows.append([name, action, ";".join(sorted(resources)), "yes" if conditional else "", source])
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate IAM identity policies offline (no AWS calls).")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def common(p):
+        p.add_argument("paths", nargs="+", help="Policy files/directories (.json, .jsonl bundles, authorization details)")
+        p.add_argument("--principal", default=None, help="Only this principal (name, ARN or ARN suffix)")
+        p.add_argument("--csv-out", default=None, help="Write the rows to this CSV instead of printing them")
+
+    check = sub.add_parser("check", help="Does each principal get ACTION on RESOURCE?")
+    common(check)
+    check.add_argument("--action", action="append", help="Action, e.g. s3:GetObject (repeatable)")
+    check.add_argument("--resource", default="*", help="Resource ARN (default: *)")
+    check.add_argument("--context", action="append", help="Condition context key=value, e.g. aws:SourceIp=10.0.0.1 (repeatable)")
+    check.add_argument("--queries", default=None, help="CSV with principal,action,resource columns for batch checks")
+
+    actions = sub.add_parser("actions", help="List effective allowed actions per principal")
+    common(actions)
+    actions.add_argument("--service", default=None, help="Only actions of this service prefix, e.g. iam")
+    actions.add_argument("--catalog", default=None, help="Extra known actions, one service:Action per line")
+    args = parser.parse_args(argv)
+
+    store = load_paths(args.paths)
+    if args.command == "check":
+        header, rows = ["principal", "action", "resource", "decision", "statements"], run_check(store, args)
+    else:
+        header, rows = ["principal", "action", "resources", "conditional", "source"], run_actions(store, args)
+
+    if args.csv_out:
+        with open(args.csv_out, "w", newline="", encoding="utf-8") as fh:
+            w = csv.writer(fh)
+            w.writerow(header)
+            w.writerows(rows)
+        print(f"Wrote {len(rows)} row(s) to {args.csv_out}")
+    else:
+        for row in rows:
+            print("  ".join(row))
+
+
+if __name__ == "__main__":
+    main()
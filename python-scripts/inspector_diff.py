@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Diff two Inspector findings snapshots (the --csv-out files written by
+inspector_ec2_report.py, optionally gzipped) joined on findingArn.
+
+Reports per instance and per remediation action:
+  new       finding only in the newer snapshot
+  resolved  finding only in the older snapshot
+  regressed severity went up (e.g. MEDIUM -> HIGH)
+  improved  severity went down
+
+Join strategy:
+- hash join (default while both snapshots together are below --spill-mb):
+  both snapshots are indexed by findingArn and joined in memory.
+- sort-merge (larger snapshots): each file is sorted on disk in chunks of
+  --chunk-rows rows, the chunks are k-way merged and the two sorted streams
+  are merge-joined, so memory stays bounded by one chunk.
+Both strategies resolve duplicate findingArns within one snapshot the same
+way: the last row in the file wins.
+
+Usage examples:
+  python inspector_diff.py yesterday.csv today.csv
+  python inspector_diff.py yesterday.csv.gz today.csv.gz --changes-csv changes.csv --by-instance-csv inst.csv
+"""
+
+import argparse
+import csv
+import gzip
+import heapq
+import os
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+SEVERITY_ORDER = ["CRITICAL", "HIGH", "MEDIUM", "LOW", "INFORMATIONAL", "UNTRIAGED"]
+SEVERITY_RANK = {s: len(SEVERITY_ORDER) - i for i, s in enumerate(SEVERITY_ORDER)}  # higher = worse
+CHANGE_KINDS = ["new", "resolved", "regressed", "improved"]
+
+# (findingArn, severity, resourceId, actionText, title)
+Row = Tuple[str, str, str, str, str]
+Change = Tuple[str, str, Optional[Row], Optional[Row]]  # (kind, findingArn, old, new)
+
+
+def _open_text(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", newline="", encoding="utf-8")
+    return open(path, newline="", encoding="utf-8")
+
+
+def read_snapshot(path: str) -> Iterator[Row]:
+    csv.field_size_limit(sys.maxsize)
+    with _open_text(path) as fh:
+        reader = csv.reader(fh)
+        header = next(reader, [])
+        col = {name: i for i, name in enumerate(header)}
+        if "findingArn" not in col:
+            raise SystemExit(f"{path}: not an Inspector findings CSV (no findingArn column)")
+        idx = [col["findingArn"]] + [col.get(c, -1) for c in ("severity", "resourceId", "actionText", "title")]
+        width = len(header)
+        for rec in reader:
+            if len(rec) < width:
+                rec = rec + [""] * (width - len(rec))
+            arn = rec[idx[0]]
+            if arn:
+                yield (arn, (rec[idx[1]] or "UNTRIAGED") if idx[1] >= 0 else "UNTRIAGED",
+                       rec[idx[2]] if idx[2] >= 0 else "", rec[idx[3]] if idx[3] >= 0 else "",
+                       rec[idx[4]] if idx[4] >= 0 else "")
+
+
+def _classify(old: Optional[Row], new: Optional[Row]) -> Optional[str]:
+    if old is None:
+        return "new"
+    if new is None:
+        return "resolved"
+    before, after = SEVERITY_RANK.get(old[1], 0), SEVERITY_RANK.get(new[1], 0)
+    if after > before:
+        return "regressed"
+    if after < before:
+        return "improved"
+    return None
+
+
+# ---------- Hash join ----------
+
+def diff_hash(old_path: str, new_path: str) -> Iterator[Change]:
+    # dict building keeps the last row of a duplicated ARN
+    old_index: Dict[str, Row] = {r[0]: r for r in read_snapshot(old_path)}
+    new_index: Dict[str, Row] = {r[0]: r for r in read_snapshot(new_path)}
+    for new in new_index.values():
+        old = old_index.pop(new[0], None)
+        kind = _classify(old, new)
+        if kind:
+            yield kind, new[0], old, new
+    for arn, old in old_index.items():
+        yield "resolved", arn, old, None
+
+
+# ---------- External sort-merge join ----------
+
+def _spill_sorted(path: str, chunk_rows: int, tmpdir: str) -> List[str]:
+    """Sorted chunk files of (findingArn, file position, ...) records; the position orders duplicates."""
+    chunks, buf = [], []
+
+    def flush():
+        buf.sort()
+        name = os.path.join(tmpdir, f"chunk{len(os.listdir(tmpdir))}.csv")
+        with open(name, "w", newline="", encoding="utf-8") as fh:
+            csv.writer(fh).writerows(buf)
+        chunks.append(name)
+        buf.clear()
+
+    for n, row in enumerate(read_snapshot(path)):
+        buf.append((row[0], f"{n:012d}") + row[1:])
+        if len(buf) >= chunk_rows:
+            flush()
+    if buf:
+        flush()
+    return chunks
+
+
+def _read_chunk(name: str) -> Iterator[Row]:
+    with open(name, newline="", encoding="utf-8") as fh:
+        for rec in csv.reader(fh):
+            yield tuple(rec)
+
+
+def _sorted_stream(path: str, chunk_rows: int, tmpdir: str) -> Iterator[Row]:
+    chunks = _spill_sorted(path, chunk_rows, tmpdir)
+    pending = None
+    for rec in heapq.merge(*(_read_chunk(c) for c in chunks)):
+        row = (rec[0],) + rec[2:]
+        if pending is not None and pending[0] != row[0]:
+            yield pending
+        pending = row  # duplicate ARNs in one snapshot: the last row in the file wins
+    if pending is not None:
+        yield pending
+
+
+def diff_sorted(old_path: str, new_path: str, chunk_rows: int = 200_000) -> Iterator[Change]:
+    with tempfile.TemporaryDirectory(prefix="inspdiff-old-") as t_old, \
+            tempfile.TemporaryDirectory(prefix="inspdiff-new-") as t_new:
+        olds, news = _sorted_stream(old_path, chunk_rows, t_old), _sorted_stream(new_path, chunk_rows, t_new)
+        old, new = next(olds, None), next(news, None)
+        while old is not None or new is not None:
+            if new is None or (old is not None and old[0] < new[0]):
+                yield "resolved", old[0], old, None
+                old = next(olds, None)
+            elif old is None or new[0] < old[0]:
+                yield "new", new[0], None, new
+                new = next(news, None)
+            else:
+                kind = _classify(old, new)
+                if kind:
+                    yield kind, new[0], old, new
+                old, new = next(olds, None), next(news, None)
+
+
+def diff_snapshots(old_path: str, new_path: str, spill_mb: int = 256, chunk_rows: int = 200_000) -> Iterator[Change]:
+    """Hash join when both snapshots are small enough to index, sort-merge otherwise."""
+    size = sum(os.path.getsize(p) * (5 if p.endswith(".gz") else 1) for p in (old_path, new_path))
+    if size <= spill_mb * 1024 * 1024:
+        return diff_hash(old_path, new_path)
+    return diff_sorted(old_path, new_path, chunk_rows)
+
+
+# ---------- Aggregation / output ----------
+
+def summarize(changes: Iterator[Change], changes_csv: Optional[str] = None):
+    by_instance: Dict[str, Counter] = defaultdict(Counter)
+    by_action: Dict[str, Counter] = defaultdict(Counter)
+    totals: Counter = Counter()
+    writer, fh = None, None
+    if changes_csv:
+        fh = open(changes_csv, "w", newline="", encoding="utf-8")
+        writer = csv.writer(fh)
+        writer.writerow(["change", "findingArn", "resourceId", "oldSeverity", "newSeverity", "actionText", "title"])
+    try:
+        for kind, arn, old, new in changes:
+            ref = new or old
+            totals[kind] += 1
+            by_instance[ref[2]][kind] += 1
+            by_action[ref[3]][kind] += 1
+            if writer:
+                writer.writerow([kind, arn, ref[2], old[1] if old else "", new[1] if new else "", ref[3], ref[4]])
+    finally:
+        if fh:
+            fh.close()
+    return totals, by_instance, by_action
+
+
+def write_breakdown_csv(path: str, key_name: str, breakdown: Dict[str, Counter]):
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow([key_name] + CHANGE_KINDS)
+        for key in sorted(breakdown, key=lambda k: -sum(breakdown[k].values())):
+            w.writerow([key] + [breakdown[key][k] for k in CHANGE_KINDS])
+
+
+def print_breakdown(title: str, breakdown: Dict[str, Counter], top_n: int):
+    print(f"\n== {title} ==")
+    ranked = sorted(breakdown.items(), key=lambda kv: -sum(kv[1].values()))
+    limit = top_n if top_n > 0 else len(ranked)
+    for key, c in ranked[:limit]:
+        print(f"  {key or '(none)'}")
+        print("    " + "  ".join(f"{k}: {c[k]}" for k in CHANGE_KINDS))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diff two Inspector findings CSV snapshots on findingArn.")
+    parser.add_argument("old", help="Older snapshot (--csv-out file, .csv or .csv.gz)")
+    parser.add_argument("new", help="Newer snapshot (--csv-out file, .csv or .csv.gz)")
+    parser.add_argument("--changes-csv", default=None, help="Write one row per new/resolved/changed finding")
+    parser.add_argument("--by-instance-csv", default=None, help="Write change counts per instance")
+    parser.add_argument("--by-action-csv", default=None, help="Write change counts per remediation action")
+    parser.add_argument("--top-n", type=int, default=25, help="Instances/actions to print (0 = all)")
+    parser.add_argument("--spill-mb", type=int, default=256, help="Use on-disk sort-merge above this combined snapshot size")
+    parser.add_argument("--chunk-rows", type=int, default=200_000, help="Rows per sorted chunk in sort-merge mode")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    changes = diff_snapshots(args.old, args.new, spill_mb=args.spill_mb, chunk_rows=args.chunk_rows)
+    totals, by_instance, by_action = summarize(changes, args.changes_csv)
+
+    print(f"Compared {args.old} -> {args.new} in {time.perf_counter() - started:.1f}s")
+    print("  " + "  ".join(f"{k}: {totals[k]}" for k in CHANGE_KINDS))
+    print_breakdown("Changes per instance", by_instance, args.top_n)
+    print_breakdown("Changes per action", by_action, args.top_n)
+    if args.by_instance_csv:
+        write_breakdown_csv(args.by_instance_csv, "resourceId", by_instance)
+    if args.by_action_csv:
+        write_breakdown_csv(args.by_action_csv, "actionText", by_action)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,7 @@ import os
 from collections import Counter, defaultdict
 from typing import Dict, List, Tuple
 
-import boto3
-from botocore.config import Config
+from aws_sessions import get_client
 
 SEVERITY_ORDER = ["CRITICAL", "HIGH", "MEDIUM", "LOW", "INFORMATIONAL", "UNTRIAGED"]
 
@@ -325,7 +324,7 @@ def print_actions_table(buckets: Dict[str, Counter], top_n: int = 25, totals_onl
 
 # ---------- Main ----------
 
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser(description="Generate Inspector v2 remediation actions per EC2 instance.")
     parser.add_argument("instance_id", nargs="?", help="EC2 instance ID. If omitted and --all is set, processes all instances.")
     parser.add_argument("--all", action="store_true", help="Process all EC2 instances with ACTIVE findings visible to this profile")
@@ -337,10 +336,9 @@ def main():
     parser.add_argument("--top-n", type=int, default=25, help="Max actions to display per instance (by impact)")
     parser.add_argument("--include-severity", action="store_true", help="Also show per-severity counts for each action")
     parser.add_argument("-v", "--verbose", action="store_true", help="Print progress while fetching and processing")
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
-    session = boto3.Session(profile_name=args.profile, region_name=args.region)
-    inspector2 = session.client("inspector2", config=Config(retries={"max_attempts": 10, "mode": "standard"}))
+    inspector2 = get_client("inspector2", profile=args.profile, region=args.region)
 
     print(f"Using profile '{args.profile}', region '{args.region}'")
 
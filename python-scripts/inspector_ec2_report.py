@@ -2,11 +2,11 @@
 import argparse
 import csv
 import os
+import sys
 from collections import Counter, defaultdict
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
-import boto3
-from botocore.config import Config
+from aws_sessions import get_client
 
 SEVERITY_ORDER = ["CRITICAL", "HIGH", "MEDIUM", "LOW", "INFORMATIONAL", "UNTRIAGED"]
 
@@ -17,9 +17,12 @@ def _dbg(msg: str, verbose: bool):
         print(msg, flush=True)
 
 
-def list_findings_for_instance(inspector2, instance_id: str, verbose: bool = False) -> List[Dict]:
+def list_findings_for_instance(inspector2, instance_id: str, verbose: bool = False,
+                               parse: Optional[Callable] = None) -> List:
     """
     Retrieves ACTIVE Inspector V2 findings for a specific EC2 instance ID.
+    With parse (e.g. FindingRecord.from_finding) each page is converted as it
+    arrives, so the raw page dicts can be freed.
     """
     findings = []
     next_token = None
@@ -39,7 +42,7 @@ def list_findings_for_instance(inspector2, instance_id: str, verbose: bool = Fal
         _dbg(f"[single] Calling list_findings page {page} ...", verbose)
         resp = inspector2.list_findings(**params)
         got = len(resp.get("findings", []))
-        findings.extend(resp.get("findings", []))
+        findings.extend(map(parse, resp.get("findings", [])) if parse else resp.get("findings", []))
         _dbg(f"[single] Page {page} returned {got}, total so far {len(findings)}", verbose)
         next_token = resp.get("nextToken")
         if not next_token:
@@ -47,26 +50,21 @@ def list_findings_for_instance(inspector2, instance_id: str, verbose: bool = Fal
     _dbg(f"[single] Completed. Total findings: {len(findings)}", verbose)
     return findings
 
-def list_all_active_ec2_findings(inspector2, verbose: bool = False) -> List[Dict]:
+def list_all_active_ec2_findings(inspector2, verbose: bool = False, parse: Optional[Callable] = None) -> List:
     """
     Retrieves all ACTIVE Inspector V2 findings for EC2 instances across the
-    account/organization the configured profile can see.
+    account/organization the configured profile can see (parsed per page
+    when parse is given, see list_findings_for_instance).
     """
-    findings: List[Dict] = []
+    findings: List = []
     next_token = None
     page = 0
     _dbg("[all] Start listing ACTIVE EC2 findings", verbose)
     while True:
         params = {
             "filterCriteria": {
-<<<<<<< HEAD
                 "resourceType": [{"comparison": "EQUALS", "value": "AWS_EC2_INSTANCE"}],
                 "findingStatus": [{"comparison": "EQUALS", "value": "ACTIVE"}],
-=======
-            "resourceId": [{"comparison": "EQUALS", "value": instance_id}],
-            "resourceType": [{"comparison": "EQUALS", "value": "AWS_EC2_INSTANCE"}],
-            "findingStatus": [{"comparison": "EQUALS", "value": "ACTIVE"}],
->>>>>>> 27966facfbcd0e23539eca572008f24eda2f1259
             },
             "maxResults": 100,
         }
@@ -77,7 +75,7 @@ def list_all_active_ec2_findings(inspector2, verbose: bool = False) -> List[Dict
         _dbg(f"[all] Calling list_findings page {page} ...", verbose)
         resp = inspector2.list_findings(**params)
         got = len(resp.get("findings", []))
-        findings.extend(resp.get("findings", []))
+        findings.extend(map(parse, resp.get("findings", [])) if parse else resp.get("findings", []))
         _dbg(f"[all] Page {page} returned {got}, total so far {len(findings)}", verbose)
         next_token = resp.get("nextToken")
         if not next_token:
@@ -85,10 +83,10 @@ def list_all_active_ec2_findings(inspector2, verbose: bool = False) -> List[Dict
     _dbg(f"[all] Completed listing. Total findings: {len(findings)}", verbose)
     return findings
 
-def severity_summary(findings: List[Dict]) -> Counter:
+def severity_summary(records: Iterable["FindingRecord"]) -> Counter:
     counter = Counter()
-    for f in findings:
-        counter[f.get("severity", "UNTRIAGED")] += 1
+    for r in records:
+        counter[r.summary_severity] += 1
     for s in SEVERITY_ORDER:
         counter.setdefault(s, 0)
     return counter
@@ -100,22 +98,15 @@ def print_severity_table(counter: Counter):
     for s in SEVERITY_ORDER:
         print(f"  {s:<13} {counter[s]}")
 
-def fix_available_summary(findings: List[Dict]) -> Counter:
+def fix_available_summary(records: Iterable["FindingRecord"]) -> Counter:
     """
     Prefer packageVulnerabilityDetails.fixAvailable, otherwise infer:
-    if ANY vulnerablePackages[].fixedInVersion exists -> YES, else UNKNOWN.
+    if ANY vulnerablePackages[].fixedInVersion exists -> YES, else UNKNOWN
+    (see infer_fix_available_flag).
     """
     counts = Counter()
-    for f in findings:
-        pvd = f.get("packageVulnerabilityDetails") or {}
-        flag = pvd.get("fixAvailable")
-        if isinstance(flag, str) and flag:
-            counts[flag.upper()] += 1
-            continue
-
-        vp = pvd.get("vulnerablePackages") or []
-        has_fix = any((p or {}).get("fixedInVersion") for p in vp)
-        counts["YES" if has_fix else "UNKNOWN"] += 1
+    for r in records:
+        counts[r.fix_available.upper()] += 1
 
     for k in ["YES", "NO", "PARTIAL", "UNKNOWN"]:
         counts.setdefault(k, 0)
@@ -172,12 +163,10 @@ def get_action_text(f: Dict) -> str:
 
     return "No official remediation available (manual review)"
 
-def action_buckets(findings: List[Dict]) -> Dict[str, Counter]:
+def action_buckets(records: Iterable["FindingRecord"]) -> Dict[str, Counter]:
     buckets: Dict[str, Counter] = defaultdict(Counter)
-    for f in findings:
-        action = normalize_action_text(get_action_text(f))
-        sev = f.get("severity", "UNTRIAGED")
-        buckets[action][sev] += 1
+    for r in records:
+        buckets[r.action][r.summary_severity] += 1
     for action in buckets:
         for s in SEVERITY_ORDER:
             buckets[action].setdefault(s, 0)
@@ -224,54 +213,113 @@ def infer_fix_available_flag(f: Dict) -> str:
     has_fix = any((p or {}).get("fixedInVersion") for p in vp)
     return "YES" if has_fix else "UNKNOWN"
 
-def write_csv(findings: List[Dict], out_path: str):
-    fieldnames = [
-        "findingArn",
-        "title",
-        "severity",
-        "inspectorScore",
-        "fixAvailable",
-        "actionText",
-        "recommendationUrl",
-        "cveId",
-        "packageNames",
-        "installedVersions",
-        "fixedInVersions",
-        "resourceId",
-        "resourceRegion",
-        "firstObservedAt",
-        "lastObservedAt",
-    ]
+# ---------- Finding records ----------
+
+def _intern(value) -> str:
+    return sys.intern(value) if isinstance(value, str) else value
+
+class FindingRecord:
+    """
+    The fields of one finding that the summaries and CSV export read, parsed
+    once from the nested list_findings dict. Values that repeat across
+    findings (severity, account, action, packages, ...) are interned, so
+    200k records share them instead of holding 200k copies. severity is kept
+    as delivered (None when absent) so the CSV writes it unchanged; the
+    summaries use summary_severity.
+    """
+    __slots__ = ("arn", "title", "severity", "score", "fix_available", "action", "action_text", "rec_url",
+                 "cve_ids", "pkg_names", "installed", "fixed", "resource_id", "region", "instance", "account",
+                 "first_seen", "last_seen")
+
+    @property
+    def summary_severity(self) -> str:
+        return self.severity if self.severity is not None else "UNTRIAGED"
+
+    @classmethod
+    def from_finding(cls, f: Dict) -> "FindingRecord":
+        r = cls.__new__(cls)
+        pvd = f.get("packageVulnerabilityDetails") or {}
+        resources = f.get("resources") or []
+        first = resources[0] if resources else {}
+        # instance used for grouping: the EC2 resource, else the first resource
+        ec2 = next((x for x in resources if (x.get("type") or "").upper() in {"EC2_INSTANCE", "AWS_EC2_INSTANCE"}
+                    and x.get("id")), first)
+        action_text = get_action_text(f)
+        cves = pvd.get("cvEs") or []
+        pkg_names, installed, fixed = extract_pkg_summary(f)
+
+        r.arn = f.get("findingArn", "")
+        r.title = _intern(f.get("title", ""))
+        r.severity = _intern(f.get("severity"))
+        r.score = f.get("inspectorScore", "")
+        r.fix_available = _intern(infer_fix_available_flag(f))
+        r.action = _intern(normalize_action_text(action_text))
+        r.action_text = None if action_text == r.action else action_text  # CSV keeps the raw text
+        r.rec_url = _intern(((f.get("remediation") or {}).get("recommendation") or {}).get("url") or "")
+        r.cve_ids = _intern(";".join(sorted({c.get("id") for c in cves if c and c.get("id")})) if cves else "")
+        r.pkg_names, r.installed, r.fixed = _intern(pkg_names), _intern(installed), _intern(fixed)
+        r.resource_id = _intern(first.get("id", ""))
+        r.region = _intern(first.get("region", ""))
+        r.instance = _intern(ec2.get("id")) if ec2.get("id") else None
+        r.account = _intern(f.get("awsAccountId") or first.get("accountId") or "unknown-account")
+        r.first_seen = str(f.get("firstObservedAt", ""))
+        r.last_seen = str(f.get("lastObservedAt", ""))
+        return r
+
+    def csv_row(self) -> Dict:
+        return {
+            "findingArn": self.arn,
+            "title": self.title,
+            "severity": self.severity if self.severity is not None else "",
+            "inspectorScore": self.score,
+            "fixAvailable": self.fix_available,
+            "actionText": self.action_text if self.action_text is not None else self.action,
+            "recommendationUrl": self.rec_url,
+            "cveId": self.cve_ids,
+            "packageNames": self.pkg_names,
+            "installedVersions": self.installed,
+            "fixedInVersions": self.fixed,
+            "resourceId": self.resource_id,
+            "resourceRegion": self.region,
+            "firstObservedAt": self.first_seen,
+            "lastObservedAt": self.last_seen,
+        }
+
+def to_records(findings: Iterable[Dict]) -> List[FindingRecord]:
+    return [FindingRecord.from_finding(f) for f in findings]
+
+CSV_FIELDS = [
+    "findingArn",
+    "title",
+    "severity",
+    "inspectorScore",
+    "fixAvailable",
+    "actionText",
+    "recommendationUrl",
+    "cveId",
+    "packageNames",
+    "installedVersions",
+    "fixedInVersions",
+    "resourceId",
+    "resourceRegion",
+    "firstObservedAt",
+    "lastObservedAt",
+]
+
+def write_csv(records: Iterable[FindingRecord], out_path: str, enrichment: Optional[Dict[str, Dict]] = None,
+              tags: Optional[List[str]] = None):
+    """With enrichment (inspector_enrich.enrich_instances), tag/state columns are appended."""
+    fields = list(CSV_FIELDS)
+    if enrichment is not None:
+        from inspector_enrich import enrich_columns, enrich_values
+        fields += enrich_columns(tags or [])
     with open(out_path, "w", newline="", encoding="utf-8") as fh:
-        w = csv.DictWriter(fh, fieldnames=fieldnames)
+        w = csv.DictWriter(fh, fieldnames=fields)
         w.writeheader()
-        for f in findings:
-            pvd = f.get("packageVulnerabilityDetails") or {}
-            fix_available = infer_fix_available_flag(f)
-            action_text = get_action_text(f)
-            rec_url = (((f.get("remediation") or {}).get("recommendation") or {}).get("url") or "")
-            cves = (pvd.get("cvEs") or [])
-            cve_id = ";".join(sorted({c.get("id") for c in cves if c and c.get("id")})) if cves else ""
-            pkg_names, installed, fixed = extract_pkg_summary(f)
-            res = (f.get("resources") or [{}])[0]
-
-            row = {
-                "findingArn": f.get("findingArn", ""),
-                "title": f.get("title", ""),
-                "severity": f.get("severity", ""),
-                "inspectorScore": f.get("inspectorScore", ""),
-                "fixAvailable": fix_available,
-                "actionText": action_text,
-                "recommendationUrl": rec_url,
-                "cveId": cve_id,
-                "packageNames": pkg_names,
-                "installedVersions": installed,
-                "fixedInVersions": fixed,
-                "resourceId": res.get("id", ""),
-                "resourceRegion": res.get("region", ""),
-                "firstObservedAt": f.get("firstObservedAt", ""),
-                "lastObservedAt": f.get("lastObservedAt", ""),
-            }
+        for r in records:
+            row = r.csv_row()
+            if enrichment is not None:
+                row.update(enrich_values(enrichment.get(r.instance), tags or []))
             w.writerow(row)
 
 def print_severity_table(counter: Counter):
@@ -301,49 +349,81 @@ def print_actions_table(buckets: Dict[str, Counter], top_n: int = 25, totals_onl
             for s in SEVERITY_ORDER:
                 print(f"    {s:<13} {sev_counts[s]}")
 
-def main():
+def enrich_records(records: List[FindingRecord], args) -> Tuple[Optional[Dict[str, Dict]], List[str]]:
+    """(instance_id -> metadata, tag keys) when --enrich is set, else (None, [])."""
+    if not args.enrich:
+        return None, []
+    from inspector_enrich import describable, enrich_instances, parse_tags
+    keys = {k for k in {(r.account, r.region, r.instance) for r in records} if describable(k)}
+    return enrich_instances(keys, profile=args.profile, role_name=args.enrich_role, verbose=args.verbose), \
+        parse_tags(args.enrich_tags)
+
+def instance_label(enrichment: Optional[Dict[str, Dict]], instance_id: str, tags: List[str]) -> str:
+    if enrichment is None:
+        return ""
+    from inspector_enrich import describe_label
+    return describe_label(enrichment.get(instance_id), tags)
+
+def main(argv=None):
     parser = argparse.ArgumentParser(description="Generate Inspector v2 remediation actions per EC2 instance.")
     parser.add_argument("instance_id", nargs="?", help="EC2 instance ID. If omitted and --all is set, processes all instances.")
     parser.add_argument("--all", action="store_true", help="Process all EC2 instances with ACTIVE findings visible to this profile")
     parser.add_argument("--profile", default=os.getenv("AWS_PROFILE", "mwt-security"), help="AWS named profile to use")
     parser.add_argument("--region", default=os.getenv("AWS_REGION", os.getenv("AWS_DEFAULT_REGION", "us-east-1")),
                         help="AWS region for Inspector (must match where the instance is scanned)")
+    parser.add_argument("--from-export", default=None,
+                        help="Read findings from an Inspector bulk findings export (file, directory or s3://bucket/prefix; "
+                             "JSON/JSON Lines/CSV, optionally .gz) instead of paging list_findings")
+    parser.add_argument("--export-workers", type=int, default=4, help="With --from-export: files decompressed in parallel")
     parser.add_argument("--csv-out", default=None, help="Optional path to write a detailed CSV of raw findings")
+    parser.add_argument("--index-db", default=None,
+                        help="Also (re)index the fetched findings into this CVE/package SQLite index (see inspector_index.py)")
+    parser.add_argument("--enrich", action="store_true",
+                        help="Annotate instances with Name/Owner/Environment tags and state (see inspector_enrich.py)")
+    parser.add_argument("--enrich-tags", default="Name,Owner,Environment", help="With --enrich: tag keys to show/add to the CSV")
+    parser.add_argument("--enrich-role", default="OrganizationAccountAccessRole",
+                        help="With --enrich: role assumed in member accounts for describe_instances")
+    parser.add_argument("--plan-csv", default=None,
+                        help="Also compute a minimal package-upgrade plan (see inspector_remediation_plan.py) and write it here")
     parser.add_argument("--top-n", type=int, default=25, help="Max actions to display per instance (by impact)")
     parser.add_argument("--include-severity", action="store_true", help="Also show per-severity counts for each action")
     parser.add_argument("-v", "--verbose", action="store_true", help="Print progress while fetching and processing")
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
-    session = boto3.Session(profile_name=args.profile, region_name=args.region)
-    inspector2 = session.client("inspector2", config=Config(retries={"max_attempts": 10, "mode": "standard"}))
+    if args.from_export:
+        from inspector_export import load_export
+        print(f"Reading Inspector findings export: {args.from_export}")
+    else:
+        inspector2 = get_client("inspector2", profile=args.profile, region=args.region)
+        print(f"Using profile '{args.profile}', region '{args.region}'")
 
-    print(f"Using profile '{args.profile}', region '{args.region}'")
+    # Summaries and the CSV only need FindingRecords; the nested finding dicts are
+    # kept only when the index or the planner (which read raw fields) is requested.
+    keep_raw = bool(args.index_db or args.plan_csv)
+    parse = None if keep_raw else FindingRecord.from_finding
 
     if args.all:
         print("Fetching ACTIVE Inspector findings for ALL EC2 instances ...", flush=True)
-        all_findings = list_all_active_ec2_findings(inspector2, verbose=args.verbose)
+        if args.from_export:
+            exported = load_export(args.from_export, profile=args.profile, region=args.region,
+                                   workers=args.export_workers, verbose=args.verbose)
+            all_findings = list(map(parse, exported) if parse else exported)
+        else:
+            all_findings = list_all_active_ec2_findings(inspector2, verbose=args.verbose, parse=parse)
         if not all_findings:
             print("No ACTIVE EC2 findings found.")
             return
+        raw_findings = all_findings if keep_raw else None
+        records = to_records(all_findings) if keep_raw else all_findings
+        del all_findings
 
         # Group findings by (instance_id, account_id)
-        grouped: Dict[Tuple[str, str], List[Dict]] = defaultdict(list)
-        for f in all_findings:
-            resources = f.get("resources") or []
-            inst_id = None
-            for r in resources:
-                rtype = (r.get("type") or "").upper()
-                if rtype in {"EC2_INSTANCE", "AWS_EC2_INSTANCE"} and r.get("id"):
-                    inst_id = r.get("id")
-                    break
-            if not inst_id:
-                # fallback to first resource id if typing is missing for some reason
-                if resources:
-                    inst_id = resources[0].get("id")
-            if not inst_id:
-                continue
-            account_id = f.get("awsAccountId") or (resources[0].get("accountId") if resources else None) or "unknown-account"
-            grouped[(inst_id, account_id)].append(f)
+        grouped: Dict[Tuple[str, str], List[FindingRecord]] = defaultdict(list)
+        for r in records:
+            if r.instance:
+                grouped[(r.instance, r.account)].append(r)
+
+        enrichment, tags = enrich_records(records, args)
 
         # Print section per instance
         total_instances = len(grouped)
@@ -351,34 +431,62 @@ def main():
         for idx, (inst_id, account_id) in enumerate(sorted(grouped.keys(), key=lambda k: (k[1], k[0])), start=1):
             inst_findings = grouped[(inst_id, account_id)]
             print("\n" + "=" * 80)
-            print(f"[{idx}/{total_instances}] Instance: {inst_id} | Account: {account_id} | Findings: {len(inst_findings)}", flush=True)
+            label = instance_label(enrichment, inst_id, tags)
+            print(f"[{idx}/{total_instances}] Instance: {inst_id} | Account: {account_id} | Findings: {len(inst_findings)}{label}", flush=True)
             buckets = action_buckets(inst_findings)
             # Totals by default; include per-severity if requested
             print_actions_table(buckets, top_n=args.top_n, totals_only=(not args.include_severity))
 
         # Optional CSV of all findings
         if args.csv_out:
-            write_csv(all_findings, args.csv_out)
+            write_csv(records, args.csv_out, enrichment, tags)
             print(f"\nDetailed CSV written to: {args.csv_out}")
 
+        if args.index_db:
+            from inspector_index import finding_instance, write_index
+            # An export spans every region it was generated for; list_findings only args.region
+            regions = {finding_instance(f)[2] for f in raw_findings} if args.from_export else [args.region]
+            n = write_index(args.index_db, raw_findings, regions=regions)
+            print(f"Indexed {n} findings into: {args.index_db}")
+
+        if args.plan_csv:
+            from inspector_remediation_plan import run_plan, scopes_from_findings
+            run_plan(scopes_from_findings(raw_findings), args.plan_csv, max_steps=0, top_n=args.top_n)
+
     else:
         if not args.instance_id:
             parser.error("Provide an instance_id or use --all to process all instances")
         print(f"Fetching ACTIVE Inspector findings for instance: {args.instance_id} ...", flush=True)
-        findings = list_findings_for_instance(inspector2, args.instance_id, verbose=args.verbose)
+        if args.from_export:
+            exported = load_export(args.from_export, profile=args.profile, region=args.region,
+                                   workers=args.export_workers, instance_id=args.instance_id, verbose=args.verbose)
+            findings = list(map(parse, exported) if parse else exported)
+        else:
+            findings = list_findings_for_instance(inspector2, args.instance_id, verbose=args.verbose, parse=parse)
         if not findings:
             print("No ACTIVE findings found for this instance.")
             return
+        records = to_records(findings) if keep_raw else findings
+        enrichment, tags = enrich_records(records, args)
 
         # Group by remediation action and print
-        buckets = action_buckets(findings)
+        buckets = action_buckets(records)
         print("\n" + "=" * 80)
-        print(f"Instance: {args.instance_id} | Account: n/a (single-instance mode)")
+        print(f"Instance: {args.instance_id} | Account: n/a (single-instance mode){instance_label(enrichment, args.instance_id, tags)}")
         print_actions_table(buckets, top_n=args.top_n, totals_only=(not args.include_severity))
 
         if args.csv_out:
-            write_csv(findings, args.csv_out)
+            write_csv(records, args.csv_out, enrichment, tags)
             print(f"\nDetailed CSV written to: {args.csv_out}")
 
+        if args.index_db:
+            from inspector_index import write_index
+            n = write_index(args.index_db, findings)
+            print(f"Indexed {n} findings into: {args.index_db}")
+
+        if args.plan_csv:
+            from inspector_remediation_plan import run_plan, scopes_from_findings
+            run_plan(scopes_from_findings(findings), args.plan_csv, max_steps=0, top_n=args.top_n)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Annotate Inspector v2 EC2 findings with instance metadata (Name/Owner/
+Environment tags, state, type) so action tables can go straight to the
+owning team.
+
+The distinct instance IDs are grouped per (account, region) and resolved
+with describe_instances(InstanceIds=[...]), up to 1000 IDs per call. Groups
+run concurrently. Member accounts are reached through
+aws_sessions.assume_role() (arn:aws:iam::<account>:role/<--role-name>); the
+profile's own account uses the profile directly. Results, including IDs
+that no longer exist, are kept in an on-disk cache for --cache-hours, so
+reruns only describe new instances.
+
+inspector_ec2_report.py --enrich uses this for its per-instance headers and
+CSV; standalone, it annotates an existing --csv-out file:
+
+  python inspector_enrich.py inspector_all.csv --out inspector_all_enriched.csv
+  python inspector_enrich.py inspector_all.csv --tags Name,Owner,CostCenter --role-name SecurityAudit
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from aws_sessions import CACHE_DIR, assume_role, caller_identity, get_client, get_session
+
+DEFAULT_TAGS = ["Name", "Owner", "Environment"]
+DEFAULT_ROLE = "OrganizationAccountAccessRole"
+CACHE_FILE = os.path.join(CACHE_DIR, "ec2-instances.json")
+DESCRIBE_BATCH = 1000
+_ID_RE = re.compile(r"i-[0-9a-f]+")
+
+# (account, region, instance_id)
+InstanceKey = Tuple[str, str, str]
+
+
+# ---------- Cache ----------
+
+class InstanceCache:
+    """
+    account/region/instance -> {"found", "state", "type", "tags", "fetched"},
+    loaded once and written back atomically. Entries older than ttl seconds
+    are treated as missing.
+    """
+
+    def __init__(self, path: str = CACHE_FILE, ttl: float = 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._dirty = False
+        try:
+            with open(path, encoding="utf-8") as fh:
+                self._entries: Dict[str, Dict] = json.load(fh)
+        except (OSError, ValueError):
+            self._entries = {}
+
+    @staticmethod
+    def _key(key: InstanceKey) -> str:
+        return "/".join(key)
+
+    def get(self, key: InstanceKey) -> Optional[Dict]:
+        entry = self._entries.get(self._key(key))
+        if entry and entry.get("fetched", 0) + self.ttl > time.time():
+            return entry
+        return None
+
+    def put_many(self, items: Dict[InstanceKey, Dict]):
+        now = time.time()
+        with self._lock:
+            for key, entry in items.items():
+                self._entries[self._key(key)] = dict(entry, fetched=now)
+            self._dirty = self._dirty or bool(items)
+
+    def save(self):
+        if not self._dirty:
+            return
+        with self._lock:
+            # drop expired entries so the file does not grow forever
+            cutoff = time.time() - self.ttl
+            self._entries = {k: v for k, v in self._entries.items() if v.get("fetched", 0) > cutoff}
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", mode=0o700, exist_ok=True)
+                with open(self.path + ".tmp", "w", encoding="utf-8") as fh:
+                    json.dump(self._entries, fh)
+                os.replace(self.path + ".tmp", self.path)
+                self._dirty = False
+            except OSError as e:
+                print(f"[!] Could not write instance cache {self.path}: {e}")
+
+
+# ---------- Lookups ----------
+
+def describable(key: InstanceKey) -> bool:
+    """Only well-formed instance IDs with a known account and region go to describe_instances:
+    an ID the NotFound/Malformed handling cannot extract would fail its whole account/region group."""
+    account, region, iid = key
+    return bool(account.isdigit() and region and iid and _ID_RE.fullmatch(iid))
+
+
+def instance_entry(inst: Dict) -> Dict:
+    return {
+        "found": True,
+        "state": (inst.get("State") or {}).get("Name", ""),
+        "type": inst.get("InstanceType", ""),
+        "tags": {t["Key"]: t.get("Value", "") for t in inst.get("Tags") or [] if "Key" in t},
+    }
+
+
+def describe_batch(ec2, ids: List[str]) -> Dict[str, Dict]:
+    """
+    describe_instances for up to DESCRIBE_BATCH IDs. One unknown ID fails the
+    whole call (InvalidInstanceID.NotFound), so the IDs named in the error are
+    recorded as missing and the call is retried without them.
+    """
+    from botocore.exceptions import ClientError
+
+    out: Dict[str, Dict] = {}
+    pending = list(ids)
+    while pending:
+        try:
+            for page in ec2.get_paginator("describe_instances").paginate(InstanceIds=pending):
+                for res in page.get("Reservations", []):
+                    for inst in res.get("Instances", []):
+                        out[inst["InstanceId"]] = instance_entry(inst)
+            break
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("InvalidInstanceID.NotFound", "InvalidInstanceID.Malformed"):
+                raise
+            missing = set(_ID_RE.findall(e.response["Error"].get("Message", ""))) & set(pending)
+            if not missing:
+                raise
+            for iid in missing:
+                out[iid] = {"found": False, "state": "not-found", "type": "", "tags": {}}
+            pending = [i for i in pending if i not in missing]
+    return out
+
+
+def session_for(account: str, profile: Optional[str], caller_account: str, role_name: str):
+    if account == caller_account:
+        return get_session(profile)
+    return assume_role(f"arn:aws:iam::{account}:role/{role_name}", "inspector-enrich", profile=profile)
+
+
+def resolve_group(account: str, region: str, ids: List[str], profile: Optional[str], caller_account: str,
+                  role_name: str) -> Tuple[Dict[InstanceKey, Dict], str]:
+    """Describes one (account, region) group in batches. Returns (entries, error)."""
+    found: Dict[InstanceKey, Dict] = {}
+    try:
+        session = session_for(account, profile, caller_account, role_name)
+        ec2 = get_client("ec2", region=region, session=session)
+        for i in range(0, len(ids), DESCRIBE_BATCH):
+            for iid, entry in describe_batch(ec2, ids[i:i + DESCRIBE_BATCH]).items():
+                found[(account, region, iid)] = entry
+    except Exception as e:  # one inaccessible account must not sink the run
+        return found, str(e)
+    return found, ""
+
+
+def enrich_instances(keys: Iterable[InstanceKey], profile: Optional[str] = None, role_name: str = DEFAULT_ROLE,
+                     cache: Optional[InstanceCache] = None, workers: int = 8,
+                     verbose: bool = False) -> Dict[str, Dict]:
+    """
+    Metadata for each distinct (account, region, instance): cached entries are
+    reused, the rest are described concurrently per (account, region).
+    Returns instance_id -> entry; unresolved instances are left out.
+    """
+    cache = cache if cache is not None else InstanceCache()
+    result: Dict[str, Dict] = {}
+    todo: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+    for account, region, iid in set(keys):
+        if not describable((account, region, iid)):
+            continue
+        entry = cache.get((account, region, iid))
+        if entry is not None:
+            result[iid] = entry
+        else:
+            todo[(account, region)].add(iid)
+
+    if todo:
+        started = time.perf_counter()
+        caller_account = caller_identity(profile).get("Account", "")
+        cached, fetched = len(result), 0
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {pool.submit(resolve_group, a, r, sorted(ids), profile, caller_account, role_name): (a, r)
+                       for (a, r), ids in todo.items()}
+            for fut in as_completed(futures):
+                account, region = futures[fut]
+                entries, error = fut.result()
+                cache.put_many(entries)
+                result.update((iid, e) for (_, _, iid), e in entries.items())
+                fetched += len(entries)
+                if error:
+                    print(f"[!] enrich {account}/{region}: {error}")
+                elif verbose:
+                    print(f"[enrich] {account}/{region}: {len(entries)} instance(s)", flush=True)
+        cache.save()
+        print(f"[enrich] {cached} cached, {fetched} described in "
+              f"{len(todo)} account/region group(s) ({time.perf_counter() - started:.1f}s)", flush=True)
+    return result
+
+
+# ---------- Annotation ----------
+
+def enrich_columns(tags: List[str]) -> List[str]:
+    return [f"tag:{t}" for t in tags] + ["instanceState", "instanceType"]
+
+
+def enrich_values(entry: Optional[Dict], tags: List[str]) -> Dict[str, str]:
+    entry = entry or {}
+    values = {f"tag:{t}": (entry.get("tags") or {}).get(t, "") for t in tags}
+    values["instanceState"] = entry.get("state", "")
+    values["instanceType"] = entry.get("type", "")
+    return values
+
+
+def describe_label(entry: Optional[Dict], tags: List[str]) -> str:
+    """' | Name: web-1 | Owner: team-a' for the per-instance headers (empty tags are skipped)."""
+    if not entry:
+        return ""
+    if not entry.get("found", True):
+        return " | (instance not found)"
+    parts = [f"{t}: {entry['tags'][t]}" for t in tags if (entry.get("tags") or {}).get(t)]
+    if entry.get("state") and entry["state"] != "running":
+        parts.append(f"State: {entry['state']}")
+    return "".join(f" | {p}" for p in parts)
+
+
+def arn_account(finding_arn: str) -> str:
+    # arn:aws:inspector2:<region>:<account>:finding/<id>
+    parts = (finding_arn or "").split(":")
+    return parts[4] if len(parts) > 5 else ""
+
+
+def annotate_csv(in_path: str, out_path: str, tags: List[str], **enrich_kwargs) -> int:
+    """Adds the enrich columns to an inspector_ec2_report.py --csv-out file; returns the row count."""
+    with open(in_path, newline="", encoding="utf-8") as fh:
+        keys = {(arn_account(row.get("findingArn", "")), row.get("resourceRegion", ""), row.get("resourceId", ""))
+                for row in csv.DictReader(fh)}
+    keys = {k for k in keys if describable(k)}
+    meta = enrich_instances(keys, **enrich_kwargs)
+
+    rows = 0
+    with open(in_path, newline="", encoding="utf-8") as src, open(out_path, "w", newline="", encoding="utf-8") as dst:
+        reader = csv.DictReader(src)
+        writer = csv.DictWriter(dst, fieldnames=list(reader.fieldnames or []) + enrich_columns(tags))
+        writer.writeheader()
+        for row in reader:
+            row.update(enrich_values(meta.get(row.get("resourceId", "")), tags))
+            writer.writerow(row)
+            rows += 1
+    return rows
+
+
+def parse_tags(value: str) -> List[str]:
+    return [t.strip() for t in value.split(",") if t.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Annotate an Inspector findings CSV with EC2 instance tags/state.")
+    parser.add_argument("csv", help="inspector_ec2_report.py --csv-out file")
+    parser.add_argument("--out", default=None, help="Output CSV (default: <csv>_enriched.csv)")
+    parser.add_argument("--profile", default=os.getenv("AWS_PROFILE"), help="Profile used directly and to assume member roles")
+    parser.add_argument("--role-name", default=DEFAULT_ROLE, help=f"Role assumed in member accounts (default: {DEFAULT_ROLE})")
+    parser.add_argument("--tags", default=",".join(DEFAULT_TAGS), help="Comma-separated tag keys to add as columns")
+    parser.add_argument("--cache-hours", type=float, default=24, help="Instance metadata cache TTL (default: 24)")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent account/region lookups (default: 8)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print per account/region progress")
+    args = parser.parse_args(argv)
+
+    out = args.out or os.path.splitext(args.csv)[0] + "_enriched.csv"
+    tags = parse_tags(args.tags)
+    rows = annotate_csv(args.csv, out, tags, profile=args.profile, role_name=args.role_name,
+                        cache=InstanceCache(ttl=args.cache_hours * 3600), workers=args.workers, verbose=args.verbose)
+    print(f"Wrote {rows} rows → {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Read Inspector v2 bulk findings exports (create_findings_report output)
+instead of paging list_findings 100 at a time.
+
+Sources: a file, a local directory (walked recursively) or s3://bucket/prefix.
+Formats, picked per file from its name / first bytes:
+- JSON: {"findings": [...]}, a top-level array, or JSON Lines. Parsed
+  incrementally with JSONDecoder.raw_decode over a sliding buffer, so one
+  finding at a time is materialised, never the whole file.
+- CSV: the Inspector CSV report columns ("Finding ARN", "Resource ID",
+  "Affected Packages", ...) or this repo's --csv-out columns; rows are
+  rebuilt into the list_findings shape so the report code works unchanged.
+- .gz variants of both. Up to --workers files are decompressed ahead in
+  background threads (zlib releases the GIL) into bounded chunk queues while
+  the main thread parses, so memory stays bounded by workers x queue depth.
+
+Only ACTIVE EC2 instance findings are yielded, matching
+list_all_active_ec2_findings().
+
+Usage examples:
+  python inspector_export.py ./export-dir --csv-out findings.csv
+  python inspector_export.py s3://security-exports/inspector/ --profile mwt-security --workers 8
+  python inspector_ec2_report.py --all --from-export ./export-dir
+"""
+
+import argparse
+import codecs
+import csv
+import gzip
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+CHUNK_BYTES = 1 << 20
+QUEUE_DEPTH = 8
+EC2_TYPES = {"AWS_EC2_INSTANCE", "EC2_INSTANCE"}
+# rows without a resource type (CSV exports lacking the column) count as EC2 only for instance IDs
+_INSTANCE_ID = re.compile(r"^i-[0-9a-f]+$")
+_WRAPPER = re.compile(r'\s*\{\s*"findings"\s*:\s*\[')
+_DONE = object()
+
+
+# ---------- Sources ----------
+
+class Source:
+    """One export file: a name plus a function returning a binary stream."""
+
+    def __init__(self, name: str, opener):
+        self.name = name
+        self.open = opener
+
+    @property
+    def gzipped(self) -> bool:
+        return self.name.endswith(".gz")
+
+    @property
+    def kind(self) -> str:
+        base = self.name[:-3] if self.gzipped else self.name
+        return "csv" if base.lower().endswith(".csv") else "json"
+
+
+def list_sources(location: str, profile: Optional[str] = None, region: Optional[str] = None) -> List[Source]:
+    if location.startswith("s3://"):
+        from aws_sessions import get_client
+        bucket, _, prefix = location[5:].partition("/")
+        s3 = get_client("s3", profile=profile, region=region)
+        sources = []
+        for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                key = obj["Key"]
+                if not key.endswith("/"):
+                    sources.append(Source(f"s3://{bucket}/{key}",
+                                          lambda k=key: s3.get_object(Bucket=bucket, Key=k)["Body"]))
+        return sources
+    if os.path.isdir(location):
+        paths = sorted(os.path.join(root, f) for root, _, files in os.walk(location) for f in files
+                       if not f.startswith("."))
+    else:
+        paths = [location]
+    return [Source(p, lambda p=p: open(p, "rb")) for p in paths]
+
+
+# ---------- Parallel decompression ----------
+
+def _pump(source: Source, q: "queue.Queue"):
+    """Decompress one source into q as byte chunks; _DONE (or an exception) ends the stream."""
+    try:
+        raw = source.open()
+        stream = gzip.GzipFile(fileobj=raw) if source.gzipped else raw
+        try:
+            while True:
+                chunk = stream.read(CHUNK_BYTES)
+                if not chunk:
+                    break
+                q.put(chunk)
+        finally:
+            stream.close()
+            if stream is not raw:
+                raw.close()
+        q.put(_DONE)
+    except Exception as e:
+        q.put(e)
+
+
+def _chunks(q: "queue.Queue") -> Iterator[bytes]:
+    while True:
+        item = q.get()
+        if item is _DONE:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+def decompressed(sources: List[Source], workers: int) -> Iterator[Tuple[Source, Iterator[bytes]]]:
+    """Yield (source, chunk iterator) in order while the next `workers` sources decompress ahead."""
+    pending: List[Tuple[Source, "queue.Queue"]] = []
+    nxt = 0
+
+    def start_more():
+        nonlocal nxt
+        while nxt < len(sources) and len(pending) < max(1, workers):
+            q: "queue.Queue" = queue.Queue(maxsize=QUEUE_DEPTH)
+            threading.Thread(target=_pump, args=(sources[nxt], q), daemon=True).start()
+            pending.append((sources[nxt], q))
+            nxt += 1
+
+    start_more()
+    while pending:
+        source, q = pending.pop(0)
+        start_more()
+        chunks = _chunks(q)
+        yield source, chunks
+        for _ in chunks:  # drain if the consumer stopped early so the pump thread can exit
+            pass
+
+
+# ---------- Parsers ----------
+
+def _text(chunks: Iterator[bytes]) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def _detect(buf: str) -> Tuple[str, int]:
+    wrapper = _WRAPPER.match(buf)
+    if wrapper:
+        return "array", wrapper.end()
+    stripped = buf.lstrip()
+    if stripped.startswith("["):
+        return "array", buf.index("[") + 1
+    return "lines", 0
+
+
+def iter_json(chunks: Iterator[bytes]) -> Iterator[Dict]:
+    """Findings from {"findings": [...]}, a top-level array or JSON Lines, one object at a time."""
+    decoder = json.JSONDecoder()
+    buf, pos, mode = "", 0, None
+
+    def drain():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buf) or buf[pos] in "]}":
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                return  # object continues in the next chunk
+            pos = end
+            yield obj
+
+    for text in _text(chunks):
+        buf, pos = buf[pos:] + text, 0
+        if mode is None:
+            if len(buf.lstrip()) < 32 and not buf.lstrip().startswith("["):
+                continue  # need a few bytes to tell a {"findings": [ wrapper from JSON Lines
+            mode, pos = _detect(buf)
+        yield from drain()
+    if mode is None and buf.strip():
+        mode, pos = _detect(buf)
+        yield from drain()
+    rest = buf[pos:].strip()
+    if rest.strip("]} \t\r\n"):
+        raise ValueError(f"truncated or invalid JSON near: {rest[:80]!r}")
+
+
+def _norm(header: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", header.lower())
+
+
+# normalised CSV header -> field; first match wins (Inspector report names, then --csv-out names)
+CSV_FIELDS = {
+    "findingArn": ("findingarn",),
+    "awsAccountId": ("awsaccountid", "accountid"),
+    "severity": ("severity",),
+    "title": ("title",),
+    "status": ("status",),
+    "fixAvailable": ("fixavailable",),
+    "inspectorScore": ("inspectorscore",),
+    "firstObservedAt": ("firstseen", "firstobservedat"),
+    "lastObservedAt": ("lastseen", "lastobservedat"),
+    "resourceId": ("resourceid",),
+    "resourceType": ("resourcetype",),
+    "region": ("region", "resourceregion"),
+    "remediation": ("remediation", "actiontext"),
+    "recommendationUrl": ("recommendationurl",),
+    "vulnerabilityId": ("vulnerabilityid", "cveid"),
+    "packages": ("affectedpackages", "packagenames"),
+    "installed": ("packageinstalledversion", "installedversions"),
+    "fixed": ("fixedinversion", "fixedinversions"),
+    "packageRemediation": ("packageremediation",),
+}
+
+
+def _split(value: str) -> List[str]:
+    return [v.strip() for v in re.split(r"[;,]", value or "") if v.strip()]
+
+
+def csv_row_to_finding(row: Dict[str, str]) -> Dict:
+    """Rebuild the list_findings shape the report code reads from one CSV row."""
+    get = row.get
+    names, installed, fixed = _split(get("packages")), _split(get("installed")), _split(get("fixed"))
+    packages = []
+    for i, name in enumerate(names):
+        pkg = {"name": name, "version": installed[i] if i < len(installed) else ""}
+        fix = fixed[i] if i < len(fixed) else (fixed[0] if len(fixed) == 1 else "")
+        if fix and fix.lower() != "notavailable":
+            pkg["fixedInVersion"] = fix
+        if get("packageRemediation"):
+            pkg["remediation"] = get("packageRemediation")
+        packages.append(pkg)
+    vuln_ids = _split(get("vulnerabilityId"))
+    rtype = (get("resourceType") or "").upper()
+    if not rtype and _INSTANCE_ID.match(get("resourceId", "")):
+        rtype = "AWS_EC2_INSTANCE"
+    finding = {
+        "findingArn": get("findingArn", ""),
+        "awsAccountId": get("awsAccountId", ""),
+        "severity": (get("severity") or "UNTRIAGED").upper(),
+        "title": get("title", ""),
+        "status": (get("status") or "ACTIVE").upper(),
+        "inspectorScore": get("inspectorScore", ""),
+        "firstObservedAt": get("firstObservedAt", ""),
+        "lastObservedAt": get("lastObservedAt", ""),
+        "resources": [{"type": rtype, "id": get("resourceId", ""), "region": get("region", ""),
+                       "accountId": get("awsAccountId", "")}],
+        "remediation": {"recommendation": {"text": get("remediation", ""), "url": get("recommendationUrl", "")}},
+        "packageVulnerabilityDetails": {
+            "vulnerabilityId": vuln_ids[0] if vuln_ids else "",
+            "cvEs": [{"id": v} for v in vuln_ids],
+            "vulnerablePackages": packages,
+        },
+    }
+    if get("fixAvailable"):
+        finding["packageVulnerabilityDetails"]["fixAvailable"] = get("fixAvailable").upper()
+    return finding
+
+
+def _lines(chunks: Iterator[bytes]) -> Iterator[str]:
+    partial = ""
+    for text in _text(chunks):
+        lines = (partial + text).splitlines(keepends=True)
+        partial = lines.pop() if lines and not lines[-1].endswith(("\n", "\r")) else ""
+        yield from lines
+    if partial:
+        yield partial
+
+
+def iter_csv(chunks: Iterator[bytes]) -> Iterator[Dict]:
+    csv.field_size_limit(sys.maxsize)
+    reader = csv.reader(_lines(chunks))  # csv.reader joins quoted multi-line fields itself
+    header = [_norm(h) for h in next(reader, [])]
+    columns = {field: next((header.index(c) for c in cands if c in header), -1) for field, cands in CSV_FIELDS.items()}
+    for rec in reader:
+        if rec:
+            yield csv_row_to_finding({f: (rec[i] if 0 <= i < len(rec) else "") for f, i in columns.items()})
+
+
+# ---------- Entry points ----------
+
+def is_active_ec2(f: Dict) -> bool:
+    if (f.get("status") or "ACTIVE").upper() != "ACTIVE":
+        return False
+    resources = f.get("resources") or []
+    return any((r.get("type") or "").upper() in EC2_TYPES
+               or (not r.get("type") and _INSTANCE_ID.match(r.get("id") or "")) for r in resources)
+
+
+def load_export(location: str, profile: Optional[str] = None, region: Optional[str] = None,
+                workers: int = 4, instance_id: Optional[str] = None, verbose: bool = False) -> Iterator[Dict]:
+    """Stream ACTIVE EC2 findings (optionally for one instance) from a bulk export location."""
+    sources = list_sources(location, profile=profile, region=region)
+    if not sources:
+        raise SystemExit(f"No export files found at {location}")
+    for source, chunks in decompressed(sources, workers):
+        started, n = time.perf_counter(), 0
+        parse = iter_csv if source.kind == "csv" else iter_json
+        for f in parse(chunks):
+            if not is_active_ec2(f):
+                continue
+            if instance_id and not any(r.get("id") == instance_id for r in f.get("resources") or []):
+                continue
+            n += 1
+            yield f
+        if verbose:
+            print(f"[export] {source.name}: {n} findings in {time.perf_counter() - started:.1f}s", flush=True)
+
+
+def main(argv=None):
+    from inspector_ec2_report import (FindingRecord, action_buckets, fix_available_summary, print_actions_table,
+                                      print_fix_available_table, print_severity_table, severity_summary, write_csv)
+
+    parser = argparse.ArgumentParser(description="Summarize an Inspector v2 bulk findings export (local or s3://).")
+    parser.add_argument("location", help="Export file, directory or s3://bucket/prefix (JSON, JSON Lines, CSV, optionally .gz)")
+    parser.add_argument("--profile", default=os.getenv("AWS_PROFILE"), help="AWS profile for s3:// locations")
+    parser.add_argument("--region", default=None, help="AWS region for s3:// locations")
+    parser.add_argument("--workers", type=int, default=4, help="Files decompressed ahead in parallel (default: 4)")
+    parser.add_argument("--csv-out", default=None, help="Write the findings in the inspector_ec2_report.py CSV format")
+    parser.add_argument("--top-n", type=int, default=25, help="Actions to print (0 = all)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print per-file progress")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    findings = list(map(FindingRecord.from_finding,
+                        load_export(args.location, profile=args.profile, region=args.region,
+                                    workers=args.workers, verbose=args.verbose)))
+    print(f"Loaded {len(findings)} ACTIVE EC2 findings from {args.location} in {time.perf_counter() - started:.1f}s")
+    print_severity_table(severity_summary(findings))
+    print_fix_available_table(fix_available_summary(findings))
+    print_actions_table(action_buckets(findings), top_n=args.top_n, totals_only=True)
+    if args.csv_out:
+        write_csv(findings, args.csv_out)
+        print(f"\nDetailed CSV written to: {args.csv_out}")
+
+
+if __name__ == "__main__":
+    main()
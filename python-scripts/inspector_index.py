@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+CVE- and package-centric inverted index over Inspector v2 EC2 findings.
+
+The index is a single SQLite file with three tables:
+  findings   findingArn -> account, region, instance, severity, title
+  cves       cveId      -> findingArn
+  packages   package    -> findingArn, instance, installed and fixed version
+
+`build` fetches ACTIVE EC2 findings (one or more regions, from an aggregated
+security account this covers the whole org) and replaces those regions in
+the index; inspector_ec2_report.py --index-db does the same with the findings
+it already fetched. `query` answers lookups from the index only:
+
+  python inspector_index.py build --regions us-east-1,eu-west-1
+  python inspector_index.py query --cve CVE-2024-6387
+  python inspector_index.py query --package openssl --below 3.0.14
+  python inspector_index.py query --package openssl --below 3.0.14 --account 123456789012 --csv-out hits.csv
+"""
+
+import argparse
+import csv
+import functools
+import os
+import re
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_DB = os.path.join("outputs", "inspector_index.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS findings (
+    arn TEXT PRIMARY KEY, account TEXT, region TEXT, instance TEXT,
+    severity TEXT, title TEXT, fix_available TEXT, last_observed TEXT
+);
+CREATE TABLE IF NOT EXISTS cves (cve TEXT, arn TEXT);
+CREATE TABLE IF NOT EXISTS packages (
+    package TEXT, arn TEXT, instance TEXT, account TEXT, region TEXT,
+    installed TEXT, fixed TEXT, manager TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE INDEX IF NOT EXISTS ix_cves_cve ON cves (cve);
+CREATE INDEX IF NOT EXISTS ix_cves_arn ON cves (arn);
+CREATE INDEX IF NOT EXISTS ix_packages_package ON packages (package);
+CREATE INDEX IF NOT EXISTS ix_packages_arn ON packages (arn);
+CREATE INDEX IF NOT EXISTS ix_findings_region ON findings (region);
+"""
+
+RESULT_FIELDS = ["account", "region", "instance", "cve", "package", "installed", "fixed",
+                 "severity", "title", "findingArn"]
+
+
+# ---------- Version ordering ----------
+
+_VERSION_TOKEN = re.compile(r"~|\d+|[A-Za-z]+")
+
+
+@functools.lru_cache(maxsize=65536)
+def version_key(version: str) -> Tuple:
+    """
+    Sort key for package versions as Inspector reports them
+    ("1:3.0.7-27.el9", "2.35-0ubuntu3.8", "1.2.3~rc1"): an optional numeric
+    epoch, then numeric segments compared as numbers, letters before numbers
+    and "~" before anything (pre-releases), rpm/dpkg style.
+    """
+    version = (version or "").strip()
+    epoch = 0
+    head, sep, rest = version.partition(":")
+    if sep and head.isdigit():
+        epoch, version = int(head), rest
+    key = []
+    for tok in _VERSION_TOKEN.findall(version):
+        if tok == "~":
+            key.append((-2, 0, ""))
+        elif tok.isdigit():
+            key.append((1, int(tok), ""))
+        else:
+            key.append((0, 0, tok))
+    key.append((-1, 0, ""))  # end of version: after "~", before any further segment
+    return (epoch, tuple(key))
+
+
+def has_epoch(version: str) -> bool:
+    head, sep, _ = (version or "").strip().partition(":")
+    return bool(sep) and head.isdigit()
+
+
+def version_below(installed: str, below: str) -> bool:
+    """
+    installed < below. When below has no epoch ("3.0.14") the installed
+    epoch is ignored too, so RHEL/Amazon Linux "1:3.0.8-1.amzn2" still
+    matches; "1:3.0.14" compares epochs as well.
+    """
+    if has_epoch(below):
+        return version_key(installed) < version_key(below)
+    return version_key(installed)[1] < version_key(below)[1]
+
+
+def installed_version(pkg: Dict) -> str:
+    """Installed version in the same epoch:version-release form as fixedInVersion."""
+    version = pkg.get("version") or ""
+    if pkg.get("release"):
+        version = f"{version}-{pkg['release']}"
+    if pkg.get("epoch"):
+        version = f"{pkg['epoch']}:{version}"
+    return version
+
+
+# ---------- Building ----------
+
+def finding_instance(f: Dict) -> Tuple[Optional[str], str, str]:
+    """(instance_id, account_id, region) of an EC2 finding."""
+    resources = f.get("resources") or []
+    res = next((r for r in resources if (r.get("type") or "").upper() in {"EC2_INSTANCE", "AWS_EC2_INSTANCE"}
+                and r.get("id")), resources[0] if resources else {})
+    account = f.get("awsAccountId") or res.get("accountId") or "unknown-account"
+    return res.get("id"), account, res.get("region", "")
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    if os.path.dirname(db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def index_findings(conn: sqlite3.Connection, findings: Iterable[Dict], replace_regions: Iterable[str] = ()) -> int:
+    """Insert findings, first dropping everything previously indexed for replace_regions."""
+    f_rows, c_rows, p_rows = [], [], []
+    for f in findings:
+        arn = f.get("findingArn")
+        instance, account, region = finding_instance(f)
+        if not arn or not instance:
+            continue
+        pvd = f.get("packageVulnerabilityDetails") or {}
+        f_rows.append((arn, account, region, instance, f.get("severity", "UNTRIAGED"), f.get("title", ""),
+                       pvd.get("fixAvailable") or f.get("fixAvailable") or "", str(f.get("lastObservedAt", ""))))
+        cve_ids = {c.get("id") for c in (pvd.get("cvEs") or []) if c and c.get("id")}
+        if pvd.get("vulnerabilityId"):
+            cve_ids.add(pvd["vulnerabilityId"])
+        c_rows.extend((cve, arn) for cve in cve_ids)
+        for p in pvd.get("vulnerablePackages") or []:
+            if p and p.get("name"):
+                p_rows.append((p["name"], arn, instance, account, region, installed_version(p),
+                               p.get("fixedInVersion") or "", p.get("packageManager") or ""))
+
+    with conn:
+        for region in set(replace_regions):
+            stale = "SELECT arn FROM findings WHERE region = ?"
+            conn.execute(f"DELETE FROM cves WHERE arn IN ({stale})", (region,))
+            conn.execute("DELETE FROM packages WHERE region = ?", (region,))
+            conn.execute("DELETE FROM findings WHERE region = ?", (region,))
+        # re-indexed findings replace their previous cve/package rows
+        conn.executemany("DELETE FROM cves WHERE arn = ?", ((r[0],) for r in f_rows))
+        conn.executemany("DELETE FROM packages WHERE arn = ?", ((r[0],) for r in f_rows))
+        conn.executemany("INSERT OR REPLACE INTO findings VALUES (?, ?, ?, ?, ?, ?, ?, ?)", f_rows)
+        conn.executemany("INSERT INTO cves VALUES (?, ?)", c_rows)
+        conn.executemany("INSERT INTO packages VALUES (?, ?, ?, ?, ?, ?, ?, ?)", p_rows)
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('built_at', ?)", (time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),))
+    return len(f_rows)
+
+
+def write_index(db_path: str, findings: List[Dict], regions: Iterable[str] = ()) -> int:
+    conn = connect(db_path)
+    try:
+        return index_findings(conn, findings, replace_regions=regions)
+    finally:
+        conn.close()
+
+
+# ---------- Queries ----------
+
+def query_cve(conn: sqlite3.Connection, cve: str, account: Optional[str] = None) -> List[Dict]:
+    sql = """
+        SELECT f.account, f.region, f.instance, c.cve, p.package, p.installed, p.fixed, f.severity, f.title, f.arn
+        FROM cves c JOIN findings f ON f.arn = c.arn
+        LEFT JOIN packages p ON p.arn = c.arn
+        WHERE c.cve = ?"""
+    params = [cve.upper()]
+    if account:
+        sql += " AND f.account = ?"
+        params.append(account)
+    return [dict(zip(RESULT_FIELDS, r)) for r in conn.execute(sql, params)]
+
+
+def query_package(conn: sqlite3.Connection, package: str, below: Optional[str] = None,
+                  account: Optional[str] = None) -> List[Dict]:
+    """Findings for a package, optionally only where the installed version is < below."""
+    sql = """
+        SELECT p.account, p.region, p.instance, GROUP_CONCAT(c.cve, ';'), p.package, p.installed, p.fixed,
+               f.severity, f.title, f.arn
+        FROM packages p JOIN findings f ON f.arn = p.arn
+        LEFT JOIN cves c ON c.arn = p.arn
+        WHERE p.package = ?"""
+    params = [package]
+    if account:
+        sql += " AND p.account = ?"
+        params.append(account)
+    sql += " GROUP BY p.rowid"
+    rows = [dict(zip(RESULT_FIELDS, r)) for r in conn.execute(sql, params)]
+    if below:
+        rows = [r for r in rows if version_below(r["installed"], below)]
+    return rows
+
+
+def print_results(rows: List[Dict], top_n: int):
+    instances = {(r["account"], r["instance"]) for r in rows}
+    accounts = {r["account"] for r in rows}
+    print(f"{len(rows)} finding row(s) on {len(instances)} instance(s) in {len(accounts)} account(s)")
+    rows = sorted(rows, key=lambda r: (r["account"], r["region"], r["instance"]))
+    limit = top_n if top_n > 0 else len(rows)
+    for r in rows[:limit]:
+        print(f"  {r['account']}  {r['region']:<14} {r['instance']:<20} {r['severity']:<9} "
+              f"{r['package'] or '-'} {r['installed'] or '-'} -> {r['fixed'] or '(no fix)'}  {r['cve'] or ''}")
+    if len(rows) > limit:
+        print(f"  ... {len(rows) - limit} more (use --top-n 0 or --csv-out)")
+
+
+def write_results_csv(rows: List[Dict], path: str):
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        w = csv.DictWriter(fh, fieldnames=RESULT_FIELDS)
+        w.writeheader()
+        w.writerows(rows)
+
+
+# ---------- CLI ----------
+
+def cmd_build(args):
+    from aws_sessions import get_client
+    from inspector_ec2_report import list_all_active_ec2_findings
+
+    regions = [r.strip() for r in args.regions.split(",") if r.strip()]
+    conn = connect(args.index_db)
+    try:
+        for region in regions:
+            started = time.perf_counter()
+            print(f"[*] {region}: fetching ACTIVE EC2 findings with profile '{args.profile}' ...", flush=True)
+            findings = list_all_active_ec2_findings(get_client("inspector2", profile=args.profile, region=region),
+                                                    verbose=args.verbose)
+            for f in findings:  # findings list the resource region; fall back to the queried one
+                for r in f.get("resources") or []:
+                    r.setdefault("region", region)
+            n = index_findings(conn, findings, replace_regions=[region])
+            print(f"[+] {region}: indexed {n} findings in {time.perf_counter() - started:.1f}s")
+    finally:
+        conn.close()
+    print(f"[+] Index written to {args.index_db}")
+
+
+def cmd_query(args):
+    if not os.path.exists(args.index_db):
+        raise SystemExit(f"No index at {args.index_db}; run `inspector_index.py build` first")
+    if not args.cve and not args.package:
+        raise SystemExit("query needs --cve or --package")
+    conn = connect(args.index_db)
+    try:
+        started = time.perf_counter()
+        if args.cve:
+            rows = query_cve(conn, args.cve, args.account)
+        else:
+            rows = query_package(conn, args.package, args.below, args.account)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        built = conn.execute("SELECT value FROM meta WHERE key = 'built_at'").fetchone()
+    finally:
+        conn.close()
+    print(f"Index {args.index_db} (built {built[0] if built else 'unknown'}), query took {elapsed_ms:.1f} ms")
+    print_results(rows, args.top_n)
+    if args.csv_out:
+        write_results_csv(rows, args.csv_out)
+        print(f"Results written to: {args.csv_out}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CVE/package inverted index over Inspector v2 EC2 findings.")
+    parser.add_argument("--index-db", default=DEFAULT_DB, help=f"SQLite index path (default: {DEFAULT_DB})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    b = sub.add_parser("build", help="Fetch ACTIVE EC2 findings and (re)index the given regions")
+    b.add_argument("--profile", default=os.getenv("AWS_PROFILE", "mwt-security"), help="AWS named profile to use")
+    b.add_argument("--regions", default=os.getenv("AWS_REGION", os.getenv("AWS_DEFAULT_REGION", "us-east-1")),
+                   help="Comma-separated Inspector regions (default: us-east-1)")
+    b.add_argument("-v", "--verbose", action="store_true", help="Print pagination progress")
+    b.set_defaults(func=cmd_build)
+
+    q = sub.add_parser("query", help="Look up instances by CVE or by package/version")
+    q.add_argument("--cve", default=None, help="CVE ID, e.g. CVE-2024-6387")
+    q.add_argument("--package", default=None, help="Package name as reported by Inspector, e.g. openssl")
+    q.add_argument("--below", default=None, help="With --package: only installed versions lower than this "
+                   "(without an epoch, e.g. 3.0.14, installed epochs are ignored; 1:3.0.14 compares them)")
+    q.add_argument("--account", default=None, help="Restrict to one AWS account ID")
+    q.add_argument("--top-n", type=int, default=50, help="Rows to print (0 = all)")
+    q.add_argument("--csv-out", default=None, help="Write all matching rows to this CSV")
+    q.set_defaults(func=cmd_query)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
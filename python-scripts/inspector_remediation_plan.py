@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Minimal package-upgrade plan from Inspector v2 EC2 findings.
+
+action_buckets() in inspector_ec2_report.py groups findings by remediation
+text, so "Upgrade openssl to 3.0.8" and "Upgrade openssl to 3.0.13" show up
+as two actions although the second one clears both. This planner works on
+vulnerablePackages instead:
+
+- a finding is cleared once every vulnerable package it lists is upgraded to
+  at least its fixedInVersion (findings with a package that has no fixed
+  version are reported as unfixable);
+- per scope (one instance, or the whole fleet) each package gets a single
+  candidate upgrade: the highest fixedInVersion required in that scope
+  (compared with inspector_index.version_key);
+- a greedy weighted set cover picks upgrades in the order that clears the
+  most CRITICAL/HIGH-weighted findings; a finding needing several packages
+  credits each of its still-missing upgrades a share of its weight, so
+  multi-package fixes are not starved.
+
+To scale to millions of findings every scope is reduced to distinct
+(severity, package set) elements with a count before planning, and in
+--index-db mode findings are streamed from the SQLite index one instance at
+a time, so only the fleet-wide element table stays in memory.
+
+Usage examples:
+  python inspector_remediation_plan.py --index-db outputs/inspector_index.sqlite --plan-csv plan.csv
+  python inspector_remediation_plan.py --profile mwt-security --region us-east-1 --top-n 10
+"""
+
+import argparse
+import csv
+import heapq
+import os
+import sqlite3
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from inspector_index import DEFAULT_DB, finding_instance, version_key
+
+SEVERITY_ORDER = ["CRITICAL", "HIGH", "MEDIUM", "LOW", "INFORMATIONAL", "UNTRIAGED"]
+SEVERITY_WEIGHT = {"CRITICAL": 1000.0, "HIGH": 100.0, "MEDIUM": 1.0, "LOW": 0.1, "INFORMATIONAL": 0.01, "UNTRIAGED": 0.01}
+
+PLAN_FIELDS = ["scope", "account", "instance", "step", "package", "targetVersion",
+               "clearsCritical", "clearsHigh", "clearsTotal", "cumulativeCleared", "fixableFindings"]
+
+# (severity, ((package, fixedInVersion), ...)) — an empty tuple means unfixable
+Reduced = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+# ---------- Reduction ----------
+
+def reduce_finding(f: Dict) -> Reduced:
+    pvd = f.get("packageVulnerabilityDetails") or {}
+    reqs = []
+    for p in pvd.get("vulnerablePackages") or []:
+        if not p or not p.get("name"):
+            continue
+        if not p.get("fixedInVersion"):
+            return f.get("severity", "UNTRIAGED"), ()
+        reqs.append((p["name"], p["fixedInVersion"]))
+    return f.get("severity", "UNTRIAGED"), tuple(reqs)
+
+
+class Scope:
+    """Distinct (severity, package set) elements of one scope plus the target version per package."""
+
+    def __init__(self):
+        self.elements: Counter = Counter()
+        self.target: Dict[str, str] = {}
+        self._target_key: Dict[str, Tuple] = {}
+        self.unfixable: Counter = Counter()
+
+    def add(self, severity: str, reqs: Tuple[Tuple[str, str], ...], count: int = 1):
+        if not reqs:
+            self.unfixable[severity] += count
+            return
+        for pkg, fixed in reqs:
+            self._raise_target(pkg, fixed)
+        self.elements[(severity, frozenset(sys.intern(p) for p, _ in reqs))] += count
+
+    def _raise_target(self, pkg: str, fixed: str, key: Optional[Tuple] = None):
+        key = version_key(fixed) if key is None else key
+        if pkg not in self.target or key > self._target_key[pkg]:
+            self.target[pkg], self._target_key[pkg] = fixed, key
+
+    def merge(self, other: "Scope"):
+        self.elements.update(other.elements)
+        self.unfixable.update(other.unfixable)
+        for pkg, fixed in other.target.items():
+            self._raise_target(pkg, fixed, other._target_key[pkg])
+
+    def fixable(self) -> int:
+        return sum(self.elements.values())
+
+
+# ---------- Greedy set cover ----------
+
+def greedy_plan(scope: Scope, max_steps: int = 0) -> List[Dict]:
+    """Ordered upgrade steps: [{package, targetVersion, cleared: Counter(severity)}]."""
+    elements = list(scope.elements.items())
+    missing = [len(pkgs) for (_, pkgs), _ in elements]
+    weight = [SEVERITY_WEIGHT.get(sev, 0.01) * cnt for (sev, _), cnt in elements]
+    by_pkg: Dict[str, List[int]] = defaultdict(list)
+    for i, ((_, pkgs), _) in enumerate(elements):
+        for p in pkgs:
+            by_pkg[p].append(i)
+
+    score: Dict[str, float] = defaultdict(float)
+    for i, ((_, pkgs), _) in enumerate(elements):
+        for p in pkgs:
+            score[p] += weight[i] / missing[i]
+
+    heap = [(-sc, p) for p, sc in score.items()]
+    heapq.heapify(heap)
+    chosen, steps = set(), []
+    while heap and (max_steps <= 0 or len(steps) < max_steps):
+        neg, pkg = heapq.heappop(heap)
+        if pkg in chosen or -neg != score[pkg]:
+            continue  # stale heap entry
+        if -neg <= 1e-9:  # nothing left to clear (allowing for float drift)
+            break
+        chosen.add(pkg)
+        cleared, touched = Counter(), set()
+        for i in by_pkg[pkg]:
+            if not missing[i]:
+                continue
+            (sev, pkgs), cnt = elements[i]
+            before = weight[i] / missing[i]
+            missing[i] -= 1
+            after = weight[i] / missing[i] if missing[i] else 0.0
+            if not missing[i]:
+                cleared[sev] += cnt
+            for p in pkgs:  # the remaining upgrades of this element now get a bigger share
+                if p not in chosen:
+                    score[p] += after - before
+                    touched.add(p)
+        for p in touched:
+            heapq.heappush(heap, (-score[p], p))
+        steps.append({"package": pkg, "targetVersion": scope.target[pkg], "cleared": cleared})
+    return steps
+
+
+# ---------- Sources ----------
+
+def scopes_from_findings(findings: Iterable[Dict]) -> Iterator[Tuple[Tuple[str, str], Scope]]:
+    per_instance: Dict[Tuple[str, str], Scope] = defaultdict(Scope)
+    for f in findings:
+        instance, account, _ = finding_instance(f)
+        if instance:
+            per_instance[(account, instance)].add(*reduce_finding(f))
+    yield from per_instance.items()
+
+
+def scopes_from_index(db_path: str) -> Iterator[Tuple[Tuple[str, str], Scope]]:
+    """Stream per-instance scopes from the inspector_index.py SQLite index, one instance at a time."""
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("""
+            SELECT f.account, f.instance, f.arn, f.severity, p.package, p.fixed
+            FROM findings f LEFT JOIN packages p ON p.arn = f.arn
+            ORDER BY f.account, f.instance, f.arn""")
+        key, scope, arn, severity, reqs, unfixable = None, None, None, None, [], False
+
+        def flush_finding():
+            if arn is not None:
+                scope.add(severity, () if unfixable else tuple(reqs))
+
+        for account, instance, f_arn, f_sev, pkg, fixed in rows:
+            if f_arn != arn:
+                flush_finding()
+                if (account, instance) != key:
+                    if scope is not None:
+                        yield key, scope
+                    key, scope = (account, instance), Scope()
+                arn, severity, reqs, unfixable = f_arn, f_sev, [], pkg is None
+            if pkg is not None:
+                if fixed:
+                    reqs.append((pkg, fixed))
+                else:
+                    unfixable = True
+        flush_finding()
+        if scope is not None:
+            yield key, scope
+    finally:
+        conn.close()
+
+
+# ---------- Planning / output ----------
+
+def plan_rows(scope_name: str, account: str, instance: str, scope: Scope, steps: List[Dict]) -> List[Dict]:
+    rows, cumulative, fixable = [], 0, scope.fixable()
+    for n, s in enumerate(steps, 1):
+        total = sum(s["cleared"].values())
+        cumulative += total
+        rows.append({
+            "scope": scope_name, "account": account, "instance": instance, "step": n,
+            "package": s["package"], "targetVersion": s["targetVersion"],
+            "clearsCritical": s["cleared"]["CRITICAL"], "clearsHigh": s["cleared"]["HIGH"],
+            "clearsTotal": total, "cumulativeCleared": cumulative, "fixableFindings": fixable,
+        })
+    return rows
+
+
+def build_plans(scopes: Iterable[Tuple[Tuple[str, str], Scope]], max_steps: int = 0,
+                writer: Optional[csv.DictWriter] = None) -> Tuple[Scope, List[Dict], List[Tuple]]:
+    """
+    Plan every instance scope (rows go to writer as they are produced) and
+    fold the scopes into a fleet scope. Returns (fleet scope, fleet plan rows,
+    per-instance (account, instance, crit_high_fixable, steps_needed, first_rows)).
+    """
+    fleet = Scope()
+    summaries = []
+    for (account, instance), scope in scopes:
+        fleet.merge(scope)
+        rows = plan_rows("instance", account, instance, scope, greedy_plan(scope, max_steps))
+        if writer:
+            writer.writerows(rows)
+        crit_high = sum(cnt for (sev, _), cnt in scope.elements.items() if sev in ("CRITICAL", "HIGH"))
+        summaries.append((account, instance, crit_high, len(rows), rows[:3]))
+
+    fleet_rows = plan_rows("fleet", "", "", fleet, greedy_plan(fleet, max_steps))
+    if writer:
+        writer.writerows(fleet_rows)
+    return fleet, fleet_rows, summaries
+
+
+def print_plans(fleet: Scope, fleet_rows: List[Dict], summaries: List[Tuple], top_n: int):
+    fixable, unfixable = fleet.fixable(), sum(fleet.unfixable.values())
+    print(f"\n== Fleet-wide upgrade plan ({len(summaries)} instance(s), {fixable} fixable / {unfixable} unfixable findings) ==")
+    limit = top_n if top_n > 0 else len(fleet_rows)
+    for r in fleet_rows[:limit]:
+        print(f"  {r['step']:>3}. {r['package']} >= {r['targetVersion']}  clears CRITICAL {r['clearsCritical']}, "
+              f"HIGH {r['clearsHigh']}, total {r['clearsTotal']} (cumulative {r['cumulativeCleared']}/{fixable})")
+    if len(fleet_rows) > limit:
+        print(f"  ... {len(fleet_rows) - limit} more upgrade(s)")
+
+    ranked = sorted(summaries, key=lambda s: (-s[2], s[0], s[1]))
+    limit = top_n if top_n > 0 else len(ranked)
+    print(f"\n== Per-instance plans (top {min(limit, len(ranked))} by CRITICAL+HIGH fixable findings) ==")
+    for account, instance, crit_high, n_steps, first in ranked[:limit]:
+        print(f"  {instance} | Account: {account} | CRITICAL+HIGH fixable: {crit_high} | upgrades: {n_steps}")
+        for r in first:
+            print(f"      {r['step']}. {r['package']} >= {r['targetVersion']} (clears {r['clearsTotal']})")
+
+
+def run_plan(scopes, plan_csv: Optional[str], max_steps: int, top_n: int):
+    started = time.perf_counter()
+    fh = open(plan_csv, "w", newline="", encoding="utf-8") if plan_csv else None
+    try:
+        writer = csv.DictWriter(fh, fieldnames=PLAN_FIELDS) if fh else None
+        if writer:
+            writer.writeheader()
+        fleet, fleet_rows, summaries = build_plans(scopes, max_steps, writer)
+    finally:
+        if fh:
+            fh.close()
+    print_plans(fleet, fleet_rows, summaries, top_n)
+    print(f"\nPlanned in {time.perf_counter() - started:.1f}s")
+    if plan_csv:
+        print(f"Plan CSV written to: {plan_csv}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Minimal package-upgrade plan per EC2 instance and fleet-wide from Inspector v2 findings.")
+    parser.add_argument("--index-db", default=None,
+                        help=f"Plan from an inspector_index.py SQLite index (e.g. {DEFAULT_DB}) instead of calling Inspector")
+    parser.add_argument("--profile", default=os.getenv("AWS_PROFILE", "mwt-security"), help="AWS named profile to use")
+    parser.add_argument("--region", default=os.getenv("AWS_REGION", os.getenv("AWS_DEFAULT_REGION", "us-east-1")),
+                        help="AWS region for Inspector")
+    parser.add_argument("--plan-csv", default=None, help="Write every instance and fleet step to this CSV")
+    parser.add_argument("--max-steps", type=int, default=0, help="Stop each plan after N upgrades (0 = until all fixable findings are cleared)")
+    parser.add_argument("--top-n", type=int, default=25, help="Fleet steps and instances to print (0 = all)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print pagination progress")
+    args = parser.parse_args(argv)
+
+    if args.index_db:
+        if not os.path.exists(args.index_db):
+            raise SystemExit(f"No index at {args.index_db}; run `inspector_index.py build` first")
+        scopes = scopes_from_index(args.index_db)
+    else:
+        from aws_sessions import get_client
+        from inspector_ec2_report import list_all_active_ec2_findings
+        print(f"Fetching ACTIVE EC2 findings with profile '{args.profile}', region '{args.region}' ...", flush=True)
+        inspector2 = get_client("inspector2", profile=args.profile, region=args.region)
+        scopes = scopes_from_findings(list_all_active_ec2_findings(inspector2, verbose=args.verbose))
+    run_plan(scopes, args.plan_csv, args.max_steps, args.top_n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Long-running, incremental version of `inspector_ec2_report.py --all`.
+
+Consumes Inspector2 finding events (EventBridge "Inspector2 Finding" events,
+or bare findings) and keeps per-instance counters and action buckets up to
+date, so summaries are available at any moment without refetching.
+
+Sources:
+  --tail FILE        JSON Lines file, followed like `tail -F` (truncation and
+                     rotation are detected; the offset is persisted)
+  --queue-dir DIR    local queue stand-in: every *.json / *.jsonl file dropped
+                     in DIR is applied, then moved to DIR/processed/ once the
+                     state holding its events has been saved. Files modified
+                     within the last --poll-seconds are left for the next pass;
+                     producers should write under another name and rename in.
+
+Events are state-based, keyed by findingArn: ACTIVE (created/updated)
+replaces whatever was counted for that finding, CLOSED/SUPPRESSED removes it,
+and events older than what is already applied are ignored. Closed findings
+keep a tombstone (findingArn -> close time) for --tombstone-days, so an older
+ACTIVE event delivered after the close does not bring the finding back.
+Applying the same event twice is therefore harmless, which keeps restarts
+after a crash safe.
+
+State (findings map + tail offset) is saved to --state and summary CSVs plus
+a top-N text table are rewritten to --summary-dir every --flush-seconds when
+something changed, always with write-to-temp + rename.
+
+Usage examples:
+  python inspector_watch.py watch --tail /var/log/inspector-events.jsonl
+  python inspector_watch.py watch --queue-dir ./inspector-queue --flush-seconds 10
+  python inspector_watch.py summary --top-n 10
+"""
+
+import argparse
+import csv
+import glob
+import gzip
+import json
+import os
+import shutil
+import signal
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from inspector_ec2_report import SEVERITY_ORDER, get_action_text, normalize_action_text, print_actions_table
+
+DEFAULT_STATE = os.path.join("outputs", "inspector_watch_state.json.gz")
+DEFAULT_SUMMARY_DIR = os.path.join("outputs", "inspector_watch")
+ACTIVE = "ACTIVE"
+TOMBSTONE_DAYS = 14
+
+# findingArn -> (account, instance, severity, action, updated_epoch)
+Entry = Tuple[str, str, str, str, float]
+
+
+def _epoch(value) -> float:
+    """Best-effort timestamp: epoch numbers, ISO 8601, or the 'Jan 25, 2023, 10:50:52 PM' form events use."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not value:
+        return 0.0
+    text = str(value).strip()
+    try:
+        return datetime.fromisoformat(text.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        pass
+    try:
+        return datetime.strptime(text, "%b %d, %Y, %I:%M:%S %p").timestamp()
+    except ValueError:
+        return 0.0
+
+
+def _atomic_write(path: str, write):
+    tmp = f"{path}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+# ---------- State ----------
+
+class WatchState:
+    def __init__(self, tombstone_days: float = TOMBSTONE_DAYS):
+        self.findings: Dict[str, Entry] = {}
+        self.closed: Dict[str, float] = {}  # findingArn -> updated epoch of the closing event
+        self.tombstone_seconds = tombstone_days * 86400
+        self.buckets: Dict[Tuple[str, str], Dict[str, Counter]] = defaultdict(lambda: defaultdict(Counter))
+        self.offsets: Dict[str, Dict] = {}
+        self.stats: Counter = Counter()
+        self.dirty = False
+
+    # -- counters --
+    def _count(self, entry: Entry, delta: int):
+        account, instance, severity, action, _ = entry
+        actions = self.buckets[(account, instance)]
+        actions[action][severity] += delta
+        if actions[action][severity] <= 0:
+            del actions[action][severity]
+            if not actions[action]:
+                del actions[action]
+                if not actions:
+                    del self.buckets[(account, instance)]
+
+    def apply(self, event: Dict) -> str:
+        """Apply one event (EventBridge envelope or bare finding); returns what happened."""
+        f = event.get("detail", event) if isinstance(event, dict) else None
+        arn = (f or {}).get("findingArn")
+        if not arn:
+            self.stats["ignored"] += 1
+            return "ignored"
+        updated = _epoch(f.get("updatedAt") or f.get("lastObservedAt") or event.get("time"))
+        old = self.findings.get(arn)
+        closed_at = self.closed.get(arn, 0.0)
+        if updated and ((old and old[4] and updated < old[4]) or (not old and updated < closed_at)):
+            self.stats["stale"] += 1
+            return "stale"
+
+        status = (f.get("status") or ACTIVE).upper()
+        resources = f.get("resources") or []
+        res = next((r for r in resources if (r.get("type") or "").upper() in {"AWS_EC2_INSTANCE", "EC2_INSTANCE"}), None)
+        if old:
+            self._count(old, -1)
+            del self.findings[arn]
+        self.dirty = True
+        if status != ACTIVE or res is None or not res.get("id"):
+            if status != ACTIVE and updated:
+                self.closed[arn] = max(updated, closed_at)
+            kind = "closed" if old else "ignored"
+            self.stats[kind] += 1
+            return kind
+
+        account = f.get("awsAccountId") or res.get("accountId") or "unknown-account"
+        entry = (sys.intern(account), sys.intern(res["id"]), sys.intern(f.get("severity", "UNTRIAGED")),
+                 sys.intern(normalize_action_text(get_action_text(f))), updated)
+        self.findings[arn] = entry
+        self.closed.pop(arn, None)
+        self._count(entry, +1)
+        kind = "updated" if old else "created"
+        self.stats[kind] += 1
+        return kind
+
+    def apply_many(self, events: Iterable[Dict]) -> int:
+        n = 0
+        for e in events:
+            self.apply(e)
+            n += 1
+        return n
+
+    # -- persistence --
+    def save(self, path: str):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        cutoff = time.time() - self.tombstone_seconds
+        self.closed = {arn: t for arn, t in self.closed.items() if t >= cutoff}
+        doc = {"version": 1, "offsets": self.offsets, "findings": self.findings, "closed": self.closed}
+
+        def write(tmp):
+            with gzip.open(tmp, "wt", encoding="utf-8") as fh:
+                json.dump(doc, fh, separators=(",", ":"))
+        _atomic_write(path, write)
+
+    @classmethod
+    def load(cls, path: str, tombstone_days: float = TOMBSTONE_DAYS) -> "WatchState":
+        state = cls(tombstone_days)
+        if not os.path.exists(path):
+            return state
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            doc = json.load(fh)
+        state.offsets = doc.get("offsets", {})
+        state.closed = {arn: float(t) for arn, t in doc.get("closed", {}).items()}
+        for arn, e in doc.get("findings", {}).items():
+            entry = (sys.intern(e[0]), sys.intern(e[1]), sys.intern(e[2]), sys.intern(e[3]), float(e[4]))
+            state.findings[arn] = entry
+            state._count(entry, +1)
+        return state
+
+    # -- views --
+    def fleet_buckets(self) -> Dict[str, Counter]:
+        out: Dict[str, Counter] = defaultdict(Counter)
+        for actions in self.buckets.values():
+            for action, sev in actions.items():
+                out[action].update(sev)
+        for sev in out.values():
+            for s in SEVERITY_ORDER:
+                sev.setdefault(s, 0)
+        return out
+
+    def instance_totals(self) -> List[Tuple[str, str, Counter]]:
+        rows = []
+        for (account, instance), actions in self.buckets.items():
+            total = Counter()
+            for sev in actions.values():
+                total.update(sev)
+            rows.append((account, instance, total))
+        return rows
+
+    def write_summaries(self, out_dir: str, top_n: int):
+        os.makedirs(out_dir, exist_ok=True)
+
+        def instances(tmp):
+            with open(tmp, "w", newline="", encoding="utf-8") as fh:
+                w = csv.writer(fh)
+                w.writerow(["account", "instance", "total"] + SEVERITY_ORDER)
+                for account, instance, total in sorted(self.instance_totals(), key=lambda r: (r[0], r[1])):
+                    w.writerow([account, instance, sum(total.values())] + [total[s] for s in SEVERITY_ORDER])
+
+        def actions(tmp):
+            with open(tmp, "w", newline="", encoding="utf-8") as fh:
+                w = csv.writer(fh)
+                w.writerow(["account", "instance", "action", "total"] + SEVERITY_ORDER)
+                for (account, instance), acts in sorted(self.buckets.items()):
+                    for action, sev in sorted(acts.items(), key=lambda kv: -sum(kv[1].values())):
+                        w.writerow([account, instance, action, sum(sev.values())] + [sev[s] for s in SEVERITY_ORDER])
+
+        def top(tmp):
+            with open(tmp, "w", encoding="utf-8") as fh:
+                ranked = sorted(self.fleet_buckets().items(), key=lambda kv: -sum(kv[1].values()))
+                fh.write(f"# {len(self.findings)} ACTIVE findings on {len(self.buckets)} instances, "
+                         f"updated {datetime.now().isoformat(timespec='seconds')}\n")
+                for i, (action, sev) in enumerate(ranked[:top_n] if top_n > 0 else ranked, 1):
+                    counts = " ".join(f"{s}={sev[s]}" for s in SEVERITY_ORDER if sev[s])
+                    fh.write(f"{i:>3}. [{sum(sev.values())}] {action}  ({counts})\n")
+
+        _atomic_write(os.path.join(out_dir, "instances.csv"), instances)
+        _atomic_write(os.path.join(out_dir, "actions.csv"), actions)
+        _atomic_write(os.path.join(out_dir, "top_actions.txt"), top)
+
+
+# ---------- Sources ----------
+
+def _parse_lines(lines: Iterable[str], stats: Counter) -> Iterator[Dict]:
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            stats["bad_lines"] += 1
+
+
+def tail_batches(path: str, state: WatchState, batch_bytes: int = 4 << 20) -> Iterator[List[Dict]]:
+    """Complete lines appended to path since the saved offset, in batches; yields [] when idle."""
+    pos = state.offsets.get(path, {})
+    offset, inode, fh = pos.get("offset", 0), pos.get("inode"), None
+    while True:
+        if fh is None:
+            if not os.path.exists(path):
+                yield []
+                continue
+            fh = open(path, "rb")
+            st = os.fstat(fh.fileno())
+            if inode != st.st_ino or st.st_size < offset:  # rotated or truncated
+                offset, inode = 0, st.st_ino
+            fh.seek(offset)
+        data = fh.read(batch_bytes)
+        cut = data.rfind(b"\n") + 1
+        if cut:
+            offset += cut
+            fh.seek(offset)
+            state.offsets[path] = {"offset": offset, "inode": inode}
+            yield list(_parse_lines(data[:cut].decode("utf-8", "replace").splitlines(), state.stats))
+            continue
+        fh.seek(offset)
+        try:
+            st = os.stat(path)
+            if st.st_ino != inode or st.st_size < offset:
+                fh.close()
+                fh = None
+        except FileNotFoundError:
+            fh.close()
+            fh = None
+        yield []
+
+
+def queue_batches(queue_dir: str, state: WatchState, applied: List[str],
+                  settle_seconds: float = 0.0) -> Iterator[List[Dict]]:
+    """
+    Events from each *.json / *.jsonl file in queue_dir (oldest first). After
+    a file's batch is yielded its path is appended to applied; the caller
+    moves it (move_processed) only once the state has been saved. Files
+    modified within settle_seconds may still be being written and are skipped.
+    """
+    os.makedirs(os.path.join(queue_dir, "processed"), exist_ok=True)
+    while True:
+        settled = time.time() - settle_seconds
+        files = []
+        for path in glob.glob(os.path.join(queue_dir, "*.json")) + glob.glob(os.path.join(queue_dir, "*.jsonl")):
+            try:
+                mtime = os.path.getmtime(path)
+            except FileNotFoundError:
+                continue
+            if path not in applied and mtime <= settled:
+                files.append((mtime, path))
+        if not files:
+            yield []
+            continue
+        for _, path in sorted(files):
+            with open(path, encoding="utf-8") as fh:
+                text = fh.read()
+            try:
+                doc = json.loads(text)
+                events = doc if isinstance(doc, list) else [doc]
+            except json.JSONDecodeError:
+                events = list(_parse_lines(text.splitlines(), state.stats))
+            yield events
+            applied.append(path)
+
+
+def move_processed(queue_dir: str, applied: List[str]):
+    done_dir = os.path.join(queue_dir, "processed")
+    for path in applied:
+        shutil.move(path, os.path.join(done_dir, os.path.basename(path)))
+    applied.clear()
+
+
+# ---------- Commands ----------
+
+def cmd_watch(args):
+    state = WatchState.load(args.state, args.tombstone_days)
+    print(f"[*] Loaded {len(state.findings)} ACTIVE findings on {len(state.buckets)} instances from {args.state}")
+    applied: List[str] = []  # queue files whose events are applied but not yet saved
+    if args.tail:
+        batches = tail_batches(args.tail, state)
+    else:
+        batches = queue_batches(args.queue_dir, state, applied, settle_seconds=args.poll_seconds)
+
+    stop = {"now": False}
+
+    def request_stop(signum, frame):
+        stop["now"] = True
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    last_flush, applied_since, started = time.monotonic(), 0, time.monotonic()
+
+    def flush():
+        nonlocal last_flush, applied_since, started
+        state.save(args.state)
+        if applied:
+            move_processed(args.queue_dir, applied)
+        state.write_summaries(args.summary_dir, args.top_n)
+        elapsed = max(time.monotonic() - started, 1e-9)
+        s = state.stats
+        print(f"[+] {len(state.findings)} ACTIVE findings / {len(state.buckets)} instances | "
+              f"+{applied_since} events ({applied_since / elapsed:.0f}/s) | created {s['created']} updated {s['updated']} "
+              f"closed {s['closed']} stale {s['stale']} ignored {s['ignored']}", flush=True)
+        state.dirty, last_flush, applied_since, started = False, time.monotonic(), 0, time.monotonic()
+
+    for batch in batches:
+        if batch:
+            applied_since += state.apply_many(batch)
+        elif args.once:
+            break
+        else:
+            time.sleep(args.poll_seconds)
+        if stop["now"]:
+            break
+        if (state.dirty or applied) and time.monotonic() - last_flush >= args.flush_seconds:
+            flush()
+    if state.dirty or applied or args.once:
+        flush()
+    print(f"[*] State saved to {args.state}; summaries in {args.summary_dir}")
+
+
+def cmd_summary(args):
+    state = WatchState.load(args.state)
+    print(f"{len(state.findings)} ACTIVE findings on {len(state.buckets)} instances (from {args.state})")
+    if args.instance:
+        for (account, instance), actions in state.buckets.items():
+            if instance == args.instance:
+                print("\n" + "=" * 80)
+                print(f"Instance: {instance} | Account: {account} | Findings: {sum(sum(c.values()) for c in actions.values())}")
+                full = {a: Counter({s: c[s] for s in SEVERITY_ORDER}) for a, c in actions.items()}
+                print_actions_table(full, top_n=args.top_n, totals_only=not args.include_severity)
+        return
+    print_actions_table(state.fleet_buckets(), top_n=args.top_n, totals_only=not args.include_severity)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incrementally aggregate Inspector v2 finding events.")
+    parser.add_argument("--state", default=DEFAULT_STATE, help=f"Persistent state file (default: {DEFAULT_STATE})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    w = sub.add_parser("watch", help="Consume events from a file tail or a queue directory")
+    src = w.add_mutually_exclusive_group(required=True)
+    src.add_argument("--tail", default=None, help="JSON Lines file to follow")
+    src.add_argument("--queue-dir", default=None, help="Directory of *.json / *.jsonl event files")
+    w.add_argument("--summary-dir", default=DEFAULT_SUMMARY_DIR, help=f"Where summary CSVs go (default: {DEFAULT_SUMMARY_DIR})")
+    w.add_argument("--flush-seconds", type=float, default=5.0, help="Save state/summaries at most this often (default: 5)")
+    w.add_argument("--poll-seconds", type=float, default=0.5, help="Sleep when no new events (default: 0.5)")
+    w.add_argument("--top-n", type=int, default=25, help="Actions in top_actions.txt (0 = all)")
+    w.add_argument("--once", action="store_true", help="Apply what is available now, save and exit")
+    w.add_argument("--tombstone-days", type=float, default=TOMBSTONE_DAYS,
+                   help=f"Keep closed findings this long to reject late, older ACTIVE events (default: {TOMBSTONE_DAYS})")
+    w.set_defaults(func=cmd_watch)
+
+    s = sub.add_parser("summary", help="Print action tables from the saved state (no AWS calls)")
+    s.add_argument("--top-n", type=int, default=25, help="Actions to print (0 = all)")
+    s.add_argument("--instance", default=None, help="Only this instance ID")
+    s.add_argument("--include-severity", action="store_true", help="Also show per-severity counts for each action")
+    s.set_defaults(func=cmd_summary)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,14 @@
 #!/usr/bin/env python3
-import boto3
-import botocore
+import argparse
 import csv
+import json
 import os
 import sys
 import configparser
 from datetime import datetime
-from botocore.config import Config
+
+from aws_sessions import caller_identity, get_client, get_session
+from reachability import ReachabilityIndex, eni_summary, format_ports
 
 OUTDIR = "outputs"
 OUTFILE = f"public_ec2_instances_{datetime.today().strftime('%Y-%m-%d')}.csv"
@@ -28,10 +30,10 @@ def list_profiles():
     return sorted(p for p in profiles if p)
 
 def valid_session(profile):
+    import botocore.exceptions
     try:
-        session = boto3.Session(profile_name=profile)
-        sts = session.client("sts")
-        ident = sts.get_caller_identity()
+        session = get_session(profile)
+        ident = caller_identity(profile, fresh=True)  # never validate against a cached identity
         return session, ident.get("Account"), ident.get("Arn")
     except botocore.exceptions.PartialCredentialsError:
         print(f"[!] Incomplete credentials for profile: {profile}")
@@ -68,9 +70,41 @@ def rtb_has_public_default_route(rtb):
             return True
     return False
 
-def gather_public_instances_for_region(ec2, region):
+def instance_row(inst, region, public_ips, open_ports=""):
+    name = ""
+    for t in inst.get("Tags", []) or []:
+        if t.get("Key") == "Name":
+            name = t.get("Value", "")
+            break
+
+    return {
+        "Region": region,
+        "InstanceId": inst["InstanceId"],
+        "Name": name,
+        "State": (inst.get("State") or {}).get("Name") or "",
+        "VPC": inst.get("VpcId", ""),
+        "Subnet": inst.get("SubnetId", ""),
+        "PrivateIp": inst.get("PrivateIpAddress", ""),
+        "PublicIp": inst.get("PublicIpAddress") or (public_ips[0] if public_ips else ""),
+        "PublicIps": ",".join(public_ips),
+        "OpenPorts": open_ports,
+        "PublicDns": inst.get("PublicDnsName", ""),
+        "SecurityGroups": ",".join([sg.get("GroupName","") for sg in inst.get("SecurityGroups", [])]),
+        "IamInstanceProfile": (inst.get("IamInstanceProfile") or {}).get("Arn", "")
+    }
+
+def gather_public_instances_for_region(ec2, region, include_unreachable=False, rtb_maps=None):
+    """
+    An instance is reported when one of its ENIs (primary or secondary) has a
+    public IPv4 (auto-assigned or Elastic IP) or IPv6 address, that ENI's subnet
+    routes 0.0.0.0/0 or ::/0 to an IGW, and its security groups + subnet NACL
+    leave at least one port open to the internet (OpenPorts). With
+    include_unreachable, instances with no open port are reported too.
+    rtb_maps can pass a build_rtb_maps() result shared with other collectors.
+    """
     rows = []
-    subnet_to_rtb, vpc_to_main_rtb = build_rtb_maps(ec2)
+    subnet_to_rtb, vpc_to_main_rtb = rtb_maps or build_rtb_maps(ec2)
+    index = ReachabilityIndex.build(ec2)
 
     paginator = ec2.get_paginator("describe_instances")
     for page in paginator.paginate():
@@ -80,40 +114,107 @@ def gather_public_instances_for_region(ec2, region):
                 if state in ("shutting-down", "terminated"):
                     continue
 
-                public_ip = inst.get("PublicIpAddress")
-                if not public_ip:
+                enis = index.public_enis(inst["InstanceId"])
+                if not enis and inst.get("PublicIpAddress"):
+                    # ENI listing raced with a launch: fall back to the instance view
+                    enis = [{"subnet": inst.get("SubnetId", ""), "vpc": inst.get("VpcId", ""),
+                             "groups": [g.get("GroupId") for g in inst.get("SecurityGroups", [])],
+                             "public_ips": [inst["PublicIpAddress"]], "ipv6": []}]
+                routed = [e for e in enis
+                          if rtb_has_public_default_route(subnet_to_rtb.get(e["subnet"]) or vpc_to_main_rtb.get(e["vpc"]))]
+                if not routed:
                     continue
 
-                vpc_id = inst.get("VpcId", "")
-                subnet_id = inst.get("SubnetId", "")
-                rtb = subnet_to_rtb.get(subnet_id) or vpc_to_main_rtb.get(vpc_id)
-
-                if not rtb_has_public_default_route(rtb):
+                ports = index.open_ports(inst["InstanceId"], routed)
+                if not ports and not include_unreachable:
                     continue
 
-                name = ""
-                for t in inst.get("Tags", []) or []:
-                    if t.get("Key") == "Name":
-                        name = t.get("Value", "")
-                        break
-
-                rows.append({
-                    "Region": region,
-                    "InstanceId": inst["InstanceId"],
-                    "Name": name,
-                    "State": state or "",
-                    "VPC": vpc_id,
-                    "Subnet": subnet_id,
-                    "PrivateIp": inst.get("PrivateIpAddress", ""),
-                    "PublicIp": public_ip,
-                    "PublicDns": inst.get("PublicDnsName", ""),
-                    "SecurityGroups": ",".join([sg.get("GroupName","") for sg in inst.get("SecurityGroups", [])]),
-                    "IamInstanceProfile": (inst.get("IamInstanceProfile") or {}).get("Arn", "")
-                })
+                public_ips = [ip for e in routed for ip in e["public_ips"]] + [ip for e in routed for ip in e["ipv6"]]
+                rows.append(instance_row(inst, region, public_ips, format_ports(ports)))
+    return rows
+
+# ---------- AWS Config aggregator ----------
+AGGREGATOR_QUERIES = {
+    "instances": "SELECT accountId, awsRegion, resourceId, configuration WHERE resourceType = 'AWS::EC2::Instance'",
+    "subnets": "SELECT accountId, awsRegion, resourceId, configuration.vpcId WHERE resourceType = 'AWS::EC2::Subnet'",
+    "route_tables": "SELECT accountId, awsRegion, resourceId, configuration WHERE resourceType = 'AWS::EC2::RouteTable'",
+}
+
+def to_describe_shape(obj):
+    """Config stores EC2 items in camelCase (routes[].gatewayId); describe_* uses PascalCase (Routes[].GatewayId)."""
+    if isinstance(obj, dict):
+        return {(k[:1].upper() + k[1:]): to_describe_shape(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [to_describe_shape(v) for v in obj]
+    return obj
+
+def select_aggregate(config, aggregator, expression):
+    next_token = None
+    while True:
+        params = {"Expression": expression, "ConfigurationAggregatorName": aggregator, "Limit": 100}
+        if next_token:
+            params["NextToken"] = next_token
+        resp = config.select_aggregate_resource_config(**params)
+        for item in resp.get("Results", []):
+            yield json.loads(item)
+        next_token = resp.get("NextToken")
+        if not next_token:
+            break
+
+def gather_public_instances_from_aggregator(config, aggregator):
+    """
+    Org-wide variant of gather_public_instances_for_region(): three paginated
+    Config queries (instances, subnets, route tables) for every account and
+    region in the aggregator, evaluated with the same route-table logic. An
+    instance is reported when an ENI with a public address sits in a subnet
+    that routes to an IGW. Security groups/NACLs are not evaluated here, so
+    OpenPorts is left empty.
+    """
+    subnet_vpc = {r["resourceId"]: (r.get("configuration") or {}).get("vpcId", "")
+                  for r in select_aggregate(config, aggregator, AGGREGATOR_QUERIES["subnets"])}
+    subnet_to_rtb, vpc_to_main_rtb = {}, {}
+    for r in select_aggregate(config, aggregator, AGGREGATOR_QUERIES["route_tables"]):
+        rtb = to_describe_shape(r.get("configuration") or {})
+        for assoc in rtb.get("Associations", []):
+            if assoc.get("Main"):
+                vpc_to_main_rtb[rtb.get("VpcId", "")] = rtb
+            if assoc.get("SubnetId"):
+                subnet_to_rtb[assoc["SubnetId"]] = rtb
+
+    rows = []
+    for r in select_aggregate(config, aggregator, AGGREGATOR_QUERIES["instances"]):
+        inst = to_describe_shape(r.get("configuration") or {})
+        if not inst.get("InstanceId") or (inst.get("State") or {}).get("Name") in ("shutting-down", "terminated"):
+            continue
+        enis = [eni_summary(e) for e in inst.get("NetworkInterfaces", [])]
+        enis = [e for e in enis if e["public_ips"] or e["ipv6"]]
+        if not enis and inst.get("PublicIpAddress"):
+            enis = [{"subnet": inst.get("SubnetId", ""), "vpc": inst.get("VpcId", ""),
+                     "public_ips": [inst["PublicIpAddress"]], "ipv6": []}]
+        routed = [e for e in enis
+                  if rtb_has_public_default_route(subnet_to_rtb.get(e["subnet"])
+                                                  or vpc_to_main_rtb.get(e["vpc"] or subnet_vpc.get(e["subnet"], "")))]
+        if not routed:
+            continue
+        public_ips = [ip for e in routed for ip in e["public_ips"]] + [ip for e in routed for ip in e["ipv6"]]
+        row = instance_row(inst, r.get("awsRegion", ""), public_ips)
+        row["AccountId"] = r.get("accountId", "")
+        rows.append(row)
+    return rows
+
+def scan_aggregator(aggregator, profile, region):
+    print(f"[*] Querying AWS Config aggregator '{aggregator}' ({profile}, {region}) for the whole organization...")
+    config = get_client("config", profile=profile, region=region)
+    rows = gather_public_instances_from_aggregator(config, aggregator)
+    for r in rows:
+        r["Profile"] = f"aggregator:{aggregator}"
+    accounts = {r["AccountId"] for r in rows}
+    print(f"[+] {len(rows)} public instance(s) in {len(accounts)} account(s)")
     return rows
 
 # ---------- Orchestration ----------
-def scan_profile(profile):
+def scan_profile(profile, include_unreachable=False):
+    import botocore.exceptions
     print(f"\n[*] Profile: {profile}")
     session, account_id, arn = valid_session(profile)
     if not session:
@@ -127,8 +228,8 @@ def scan_profile(profile):
 
     for region in regions:
         try:
-            ec2 = session.client("ec2", region_name=region, config=Config(retries={"max_attempts": 10, "mode": "standard"}))
-            rows = gather_public_instances_for_region(ec2, region)
+            ec2 = get_client("ec2", profile=profile, region=region)
+            rows = gather_public_instances_for_region(ec2, region, include_unreachable=include_unreachable)
             for r in rows:
                 r["Profile"] = profile
                 r["AccountId"] = account_id
@@ -147,7 +248,7 @@ def write_csv(rows):
     path = os.path.join(OUTDIR, OUTFILE)
     fields = [
         "Profile","AccountId","Region","InstanceId","Name","State",
-        "VPC","Subnet","PrivateIp","PublicIp","PublicDns","SecurityGroups","IamInstanceProfile"
+        "VPC","Subnet","PrivateIp","PublicIp","PublicIps","OpenPorts","PublicDns","SecurityGroups","IamInstanceProfile"
     ]
     with open(path, "w", newline="") as f:
         w = csv.DictWriter(f, fieldnames=fields)
@@ -156,7 +257,26 @@ def write_csv(rows):
             w.writerow({k: r.get(k, "") for k in fields})
     print(f"\n[+] Wrote {len(rows)} rows → {path}")
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scan all local AWS profiles for public EC2 instances in us-east-1.")
+    parser.add_argument("--include-unreachable", action="store_true",
+                        help="Also report instances with a public address and IGW route but no port open to the internet")
+    parser.add_argument("--aggregator", default=None,
+                        help="AWS Config aggregator name: query the whole organization at once instead of each local profile")
+    parser.add_argument("--profile", default=os.getenv("AWS_PROFILE", "default"),
+                        help="With --aggregator: profile of the account that owns the aggregator")
+    parser.add_argument("--region", default=os.getenv("AWS_REGION", os.getenv("AWS_DEFAULT_REGION", "us-east-1")),
+                        help="With --aggregator: region of the aggregator")
+    args = parser.parse_args(argv)
+
+    if args.aggregator:
+        rows = scan_aggregator(args.aggregator, args.profile, args.region)
+        if rows:
+            write_csv(rows)
+        else:
+            print("[+] No public EC2 instances found in the aggregator.")
+        return
+
     print("[*] Scanning all local AWS profiles for PUBLIC EC2 instances in us-east-1...")
     profiles = list_profiles()
     if not profiles:
@@ -165,7 +285,7 @@ def main():
 
     all_rows = []
     for profile in profiles:
-        all_rows.extend(scan_profile(profile))
+        all_rows.extend(scan_profile(profile, include_unreachable=args.include_unreachable))
 
     if all_rows:
         write_csv(all_rows)
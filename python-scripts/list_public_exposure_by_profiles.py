@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Scan all local AWS profiles for internet-exposed resources: EC2 instances,
+internet-facing ALB/NLB/classic ELBs, publicly accessible RDS and Redshift,
+public OpenSearch domains (see exposure_collectors.py).
+
+For each profile/region the subnet/route-table index is built once, then
+every selected collector runs concurrently. Results go to one CSV and each
+collector's timing is printed.
+
+Usage examples:
+  python list_public_exposure_by_profiles.py
+  python list_public_exposure_by_profiles.py --collectors ec2,elbv2,rds --regions us-east-1,us-west-2
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from exposure_collectors import COLLECTORS, RegionContext
+from list_public_ec2_by_profiles import OUTDIR, list_profiles, valid_session
+
+OUTFILE = f"public_exposure_{datetime.today().strftime('%Y-%m-%d')}.csv"
+FIELDS = ["Profile", "AccountId", "Region", "ResourceType", "ResourceId", "Name", "Endpoint", "Ports", "Detail"]
+
+
+def run_collector(name, ctx, profile, account_id):
+    started = time.perf_counter()
+    try:
+        rows = COLLECTORS[name](ctx)
+        error = ""
+    except Exception as e:  # one failing service must not sink the scan
+        rows, error = [], str(e)
+    for r in rows:
+        r.update({"Profile": profile, "AccountId": account_id, "Region": ctx.region})
+    return name, ctx.region, profile, rows, time.perf_counter() - started, error
+
+
+def scan(profiles, regions, collectors, max_workers):
+    accounts = {}
+    for profile in profiles:
+        session, account_id, arn = valid_session(profile)
+        if not session:
+            print(f"[!] Skipping profile {profile}")
+            continue
+        print(f"[+] {profile}: authenticated as {arn} (Account {account_id})")
+        accounts[profile] = account_id
+
+    rows, timings = [], []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # Phase 1: one shared route-table/subnet index per profile/region
+        index_futures = {pool.submit(RegionContext(p, r).build_index): (p, r) for p in accounts for r in regions}
+        contexts = []
+        for fut in as_completed(index_futures):
+            profile, region = index_futures[fut]
+            try:
+                contexts.append(fut.result())
+            except Exception as e:
+                print(f"    [!] {profile}/{region}: failed to build network index: {e}")
+
+        # Phase 2: every collector for every region, concurrently
+        futures = [pool.submit(run_collector, name, ctx, ctx.profile, accounts[ctx.profile])
+                   for ctx in contexts for name in collectors]
+        for fut in as_completed(futures):
+            name, region, profile, found, elapsed, error = fut.result()
+            rows.extend(found)
+            timings.append((name, elapsed, len(found), error))
+            if error:
+                print(f"    [!] {profile}/{region} {name}: {error}")
+            elif found:
+                print(f"    [+] {profile}/{region} {name}: {len(found)} exposed resource(s)")
+    return rows, timings
+
+
+def print_timings(timings):
+    agg = defaultdict(lambda: [0, 0.0, 0.0, 0, 0])  # runs, total s, max s, resources, errors
+    for name, elapsed, found, error in timings:
+        a = agg[name]
+        a[0] += 1
+        a[1] += elapsed
+        a[2] = max(a[2], elapsed)
+        a[3] += found
+        a[4] += 1 if error else 0
+    print("\n== Collector timings ==")
+    print(f"  {'collector':<12} {'runs':>5} {'total s':>9} {'max s':>7} {'found':>6} {'errors':>6}")
+    for name in sorted(agg):
+        runs, total, worst, found, errors = agg[name]
+        print(f"  {name:<12} {runs:>5} {total:>9.2f} {worst:>7.2f} {found:>6} {errors:>6}")
+
+
+def write_csv(rows):
+    os.makedirs(OUTDIR, exist_ok=True)
+    path = os.path.join(OUTDIR, OUTFILE)
+    with open(path, "w", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=FIELDS)
+        w.writeheader()
+        for r in sorted(rows, key=lambda r: (r["AccountId"] or "", r["Region"], r["ResourceType"], r["ResourceId"])):
+            w.writerow({k: r.get(k, "") for k in FIELDS})
+    print(f"\n[+] Wrote {len(rows)} rows → {path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scan all local AWS profiles for internet-exposed resources.")
+    parser.add_argument("--collectors", default=",".join(COLLECTORS),
+                        help=f"Comma-separated collectors (default: all of {','.join(COLLECTORS)})")
+    parser.add_argument("--regions", default="us-east-1", help="Comma-separated regions (default: us-east-1)")
+    parser.add_argument("--profiles", default=None, help="Comma-separated profiles (default: all in ~/.aws/config)")
+    parser.add_argument("--max-workers", type=int, default=16, help="Concurrent region/collector tasks (default: 16)")
+    args = parser.parse_args(argv)
+
+    collectors = [c.strip() for c in args.collectors.split(",") if c.strip()]
+    unknown = [c for c in collectors if c not in COLLECTORS]
+    if unknown:
+        parser.error(f"unknown collector(s): {', '.join(unknown)}")
+    regions = [r.strip() for r in args.regions.split(",") if r.strip()]
+    profiles = [p.strip() for p in args.profiles.split(",")] if args.profiles else list_profiles()
+    if not profiles:
+        print("[!] No profiles found in ~/.aws/config")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    print(f"[*] Scanning {len(profiles)} profile(s) in {', '.join(regions)} with: {', '.join(collectors)}")
+    rows, timings = scan(profiles, regions, collectors, args.max_workers)
+    print_timings(timings)
+    if rows:
+        write_csv(rows)
+    else:
+        print("[+] No internet-exposed resources found across scanned profiles.")
+    print(f"[*] Done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
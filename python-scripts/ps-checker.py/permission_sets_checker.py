@@ -3,23 +3,32 @@
 Scan AWS Identity Center (SSO) permission sets' inline policies and report any
 statements that contain actions 's3:*' or 'iam:*'.
 
+Every Identity Center instance found in the candidate regions is scanned
+(regions are probed concurrently) and merged into one report.
+
 Outputs CSV rows:
-permission_set, action, effect, resources
+permission_set, action, effect, resources, region, instance_arn
 
 Usage examples:
   python scan_ic_permission_sets.py \
     --profile mwt-master \
     --region us-east-1 \
     --out permission_set_wildcards.csv
+
+  # No --region: probe every region and scan all instances found
+  python scan_ic_permission_sets.py --profile mwt-master
 """
 
 import argparse
 import csv
 import json
-from typing import Iterable, List, Tuple, Union
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
-import boto3
-from botocore.exceptions import ClientError
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from aws_sessions import get_client, get_session  # noqa: E402
 
 
 def to_list(x: Union[str, List[str], None]) -> List[str]:
@@ -63,24 +72,46 @@ def matching_actions(stmt_actions: Iterable[str]) -> List[str]:
     return sorted(found)
 
 
-def scan_permission_sets(profile: str, region: str) -> List[Tuple[str, str, str, List[str]]]:
+def discover_instances(clients: Dict[str, object], max_workers: int = 8) -> List[Tuple[str, str]]:
     """
-    Returns a list of rows: (permission_set_name, matched_action, effect, resources)
+    Probe the candidate regions (region -> sso-admin client) concurrently and
+    return every Identity Center instance found as (region, instance_arn).
+    Regions where the call fails (opt-in regions, SCP denies, endpoint missing)
+    are skipped with a warning.
     """
-    session = boto3.Session(profile_name=profile, region_name=region)
-    sso_admin = session.client("sso-admin")
-
-    # Get Identity Center instance ARN
-    try:
-        instances = sso_admin.list_instances()["Instances"]
-    except ClientError as e:
-        raise SystemExit(f"Failed to list Identity Center instances in {region}: {e}")
-
-    if not instances:
-        raise SystemExit(f"No Identity Center instances found in region {region}. "
-                         f"Double-check the region where your Identity Center is deployed.")
-
-    instance_arn = instances[0]["InstanceArn"]
+    from botocore.exceptions import ClientError, EndpointConnectionError
+
+    def probe(region: str) -> List[Tuple[str, str]]:
+        found = []
+        kwargs = {}
+        while True:
+            resp = clients[region].list_instances(**kwargs)
+            found.extend((region, i["InstanceArn"]) for i in resp.get("Instances", []))
+            if not resp.get("NextToken"):
+                return found
+            kwargs["NextToken"] = resp["NextToken"]
+
+    instances: List[Tuple[str, str]] = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(clients)))) as pool:
+        futures = {pool.submit(probe, r): r for r in clients}
+        for fut in as_completed(futures):
+            region = futures[fut]
+            try:
+                instances.extend(fut.result())
+            except (ClientError, EndpointConnectionError) as e:
+                print(f"Warning: failed to list Identity Center instances in {region}: {e}")
+    return sorted(instances)
+
+
+def scan_instance(sso_admin, instance_arn: str,
+                  policies: Optional[List[dict]] = None) -> List[Tuple[str, str, str, List[str]]]:
+    """
+    Returns a list of rows for one Identity Center instance:
+    (permission_set_name, matched_action, effect, resources)
+    When `policies` is given, every parsed inline policy is appended to it as
+    {"principal", "instance_arn", "policy"} (see --policies-out).
+    """
+    from botocore.exceptions import ClientError
 
     # Paginate permission sets
     psets: List[str] = []
@@ -128,6 +159,8 @@ def scan_permission_sets(profile: str, region: str) -> List[Tuple[str, str, str,
         except json.JSONDecodeError as e:
             print(f"Warning: {ps_name} has invalid inline policy JSON: {e}")
             continue
+        if policies is not None:
+            policies.append({"principal": ps_name, "instance_arn": instance_arn, "policy": policy_doc})
 
         statements = normalize_statements(policy_doc)
         for stmt in statements:
@@ -152,24 +185,76 @@ def scan_permission_sets(profile: str, region: str) -> List[Tuple[str, str, str,
     return rows
 
 
-def main():
+def scan_permission_sets(profile: str, regions: Iterable[str], max_workers: int = 8,
+                         policies: Optional[List[dict]] = None) -> List[Tuple[str, str, str, str, str, List[str]]]:
+    """
+    Discover every Identity Center instance in the candidate regions and scan
+    them in parallel into one merged list of rows:
+    (region, instance_arn, permission_set_name, matched_action, effect, resources)
+    """
+    regions = list(regions)
+    # Clients are created (serialized and cached) up front and shared by the workers.
+    clients = {r: get_client("sso-admin", profile=profile, region=r) for r in regions}
+
+    instances = discover_instances(clients, max_workers=max_workers)
+    if not instances:
+        raise SystemExit(f"No Identity Center instances found in region(s): {', '.join(regions)}. "
+                         f"Double-check the region where your Identity Center is deployed.")
+    for region, instance_arn in instances:
+        print(f"Found Identity Center instance {instance_arn} in {region}")
+
+    def scan(region: str, instance_arn: str):
+        return [(region, instance_arn) + row for row in scan_instance(clients[region], instance_arn, policies)]
+
+    rows: List[Tuple[str, str, str, str, str, List[str]]] = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(instances)))) as pool:
+        futures = [pool.submit(scan, region, arn) for region, arn in instances]
+        for fut in futures:
+            rows.extend(fut.result())
+    return rows
+
+
+def candidate_regions(profile: str, region_arg: Optional[str]) -> List[str]:
+    """
+    Regions to probe: the explicit --region list if given, otherwise every
+    region where the sso-admin endpoint exists (no API call needed).
+    """
+    if region_arg:
+        return [r.strip() for r in region_arg.split(",") if r.strip()]
+    return get_session(profile).get_available_regions("sso-admin")
+
+
+def main(argv=None):
     parser = argparse.ArgumentParser(description="Report s3:* and iam:* in Identity Center permission set inline policies.")
     parser.add_argument("--profile", default="mwt-master", help="AWS profile to use (default: mwt-master)")
-    parser.add_argument("--region", required=True, help="Region where AWS Identity Center is set up (e.g., us-east-1)")
+    parser.add_argument("--region", default=None,
+                        help="Region(s) where AWS Identity Center may be set up, comma-separated "
+                             "(e.g., us-east-1). Default: probe every sso-admin region")
+    parser.add_argument("--max-workers", type=int, default=8, help="Concurrent region probes / instance scans (default: 8)")
     parser.add_argument("--out", default="permission_set_wildcards.csv", help="Output CSV file path")
-    args = parser.parse_args()
+    parser.add_argument("--policies-out", default=None,
+                        help="Also save every inline policy as JSON Lines for offline evaluation (iam_policy_eval.py)")
+    args = parser.parse_args(argv)
 
-    rows = scan_permission_sets(profile=args.profile, region=args.region)
+    regions = candidate_regions(args.profile, args.region)
+    policies: Optional[List[dict]] = [] if args.policies_out else None
+    rows = scan_permission_sets(profile=args.profile, regions=regions, max_workers=args.max_workers,
+                                policies=policies)
 
     # Write CSV
     with open(args.out, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
-        writer.writerow(["permission_set", "action", "effect", "resources"])
-        for ps_name, action, effect, resources in rows:
-            writer.writerow([ps_name, action, effect, ";".join(resources)])
+        writer.writerow(["permission_set", "action", "effect", "resources", "region", "instance_arn"])
+        for region, instance_arn, ps_name, action, effect, resources in rows:
+            writer.writerow([ps_name, action, effect, ";".join(resources), region, instance_arn])
 
     print(f"Wrote {len(rows)} row(s) to {args.out}")
 
+    if policies is not None:
+        with open(args.policies_out, "w", encoding="utf-8") as f:
+            for rec in sorted(policies, key=lambda r: (r["principal"], r["instance_arn"])):
+                f.write(json.dumps(rec) + "\n")
+        print(f"Wrote {len(policies)} inline policies to {args.policies_out}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Per-region network reachability index for the public EC2 scanner.
+
+Built from three bulk paginated calls (describe_security_groups,
+describe_network_acls, describe_network_interfaces), after which every
+lookup is a dict access:
+
+- sg_open[sg_id]          (IPv4, IPv6) ports a security group opens to
+                          0.0.0.0/0 and to ::/0
+- subnet_nacl[subnet_id]  (IPv4, IPv6) ports the subnet's network ACL lets in
+                          from 0.0.0.0/0 and from ::/0 (rules evaluated in
+                          RuleNumber order, first match wins, separately for
+                          IPv4 and IPv6 entries)
+- enis[instance_id]       every ENI of the instance (secondary ENIs included)
+                          with its public IPv4s (auto-assigned and Elastic IPs),
+                          IPv6s, subnet and security groups
+
+open_ports() intersects, per ENI that has a public address and per address
+family, the union of its security groups' open ports with its subnet's NACL
+allowance: IPv4 only when the ENI has a public IPv4, IPv6 only when it has an
+IPv6 address. The families are unioned last. Only rules whose
+source is the whole internet (/0) are considered; NACL egress (return traffic)
+is not evaluated.
+
+Port sets are {protocol: [(from, to), ...]} with merged, sorted intervals.
+ICMP and other non-port protocols use the single interval (0, 65535).
+Protocol -1 ("all") means tcp, udp and icmp for IPv4 sources, and tcp, udp
+and icmpv6 for IPv6 sources.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+FULL = (0, 65535)
+PORT_PROTOCOLS = ("tcp", "udp")
+ALL_PROTOCOLS = ("tcp", "udp", "icmp")
+ALL_PROTOCOLS_V6 = ("tcp", "udp", "icmpv6")
+PROTO_NAMES = {"-1": "all", "6": "tcp", "17": "udp", "1": "icmp", "58": "icmpv6"}
+INTERNET_V4 = "0.0.0.0/0"
+INTERNET_V6 = "::/0"
+
+Intervals = List[Tuple[int, int]]
+PortSet = Dict[str, Intervals]
+FamilyPorts = Tuple[PortSet, PortSet]  # (IPv4, IPv6)
+
+
+# ---------- Interval helpers ----------
+
+def _merge(intervals: Intervals) -> Intervals:
+    out: Intervals = []
+    for lo, hi in sorted(intervals):
+        if out and lo <= out[-1][1] + 1:
+            out[-1] = (out[-1][0], max(out[-1][1], hi))
+        else:
+            out.append((lo, hi))
+    return out
+
+
+def _intersect(a: Intervals, b: Intervals) -> Intervals:
+    out, i, j = [], 0, 0
+    while i < len(a) and j < len(b):
+        lo, hi = max(a[i][0], b[j][0]), min(a[i][1], b[j][1])
+        if lo <= hi:
+            out.append((lo, hi))
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return out
+
+
+def _subtract(a: Intervals, lo: int, hi: int) -> Intervals:
+    out = []
+    for x, y in a:
+        if y < lo or x > hi:
+            out.append((x, y))
+            continue
+        if x < lo:
+            out.append((x, lo - 1))
+        if y > hi:
+            out.append((hi + 1, y))
+    return out
+
+
+def _proto(value) -> str:
+    value = str(value).lower()
+    return PROTO_NAMES.get(value, value)
+
+
+def _protocols(proto: str, ipv6: bool = False) -> Tuple[str, ...]:
+    if proto == "all":
+        return ALL_PROTOCOLS_V6 if ipv6 else ALL_PROTOCOLS
+    return (proto,)
+
+
+def _port_range(proto: str, lo, hi) -> Tuple[int, int]:
+    if proto not in PORT_PROTOCOLS or lo is None or hi is None or lo < 0:
+        return FULL
+    return int(lo), int(hi)
+
+
+def union(sets: List[PortSet]) -> PortSet:
+    merged: Dict[str, Intervals] = {}
+    for ps in sets:
+        for proto, ivs in ps.items():
+            merged.setdefault(proto, []).extend(ivs)
+    return {p: _merge(ivs) for p, ivs in merged.items()}
+
+
+def intersect(a: PortSet, b: PortSet) -> PortSet:
+    out = {}
+    for proto in a.keys() & b.keys():
+        ivs = _intersect(a[proto], b[proto])
+        if ivs:
+            out[proto] = ivs
+    return out
+
+
+def format_ports(ps: PortSet) -> str:
+    if all(ps.get(p) == [FULL] for p in ALL_PROTOCOLS):
+        return "all"
+    parts = []
+    for proto in sorted(ps):
+        for lo, hi in ps[proto]:
+            if proto not in PORT_PROTOCOLS or (lo, hi) == FULL:
+                parts.append(f"{proto}:all" if proto in PORT_PROTOCOLS else proto)
+            else:
+                parts.append(f"{proto}:{lo}" if lo == hi else f"{proto}:{lo}-{hi}")
+    return ",".join(parts)
+
+
+# ---------- Index builders ----------
+
+def sg_internet_ports(sg: Dict) -> FamilyPorts:
+    """Ports a security group opens to the whole internet, as (IPv4, IPv6)."""
+    opened: Tuple[Dict[str, Intervals], Dict[str, Intervals]] = ({}, {})
+    for perm in sg.get("IpPermissions", []):
+        families = []
+        if any(r.get("CidrIp") == INTERNET_V4 for r in perm.get("IpRanges", [])):
+            families.append(False)
+        if any(r.get("CidrIpv6") == INTERNET_V6 for r in perm.get("Ipv6Ranges", [])):
+            families.append(True)
+        proto = _proto(perm.get("IpProtocol", "-1"))
+        for ipv6 in families:
+            for p in _protocols(proto, ipv6):
+                rng = FULL if proto == "all" else _port_range(p, perm.get("FromPort"), perm.get("ToPort"))
+                opened[ipv6].setdefault(p, []).append(rng)
+    return tuple({p: _merge(ivs) for p, ivs in fam.items()} for fam in opened)
+
+
+def _nacl_family_ports(entries: List[Dict], ipv6: bool) -> PortSet:
+    """First-match evaluation of one address family's /0 entries (entries sorted by RuleNumber)."""
+    undecided: Dict[str, Intervals] = {p: [FULL] for p in _protocols("all", ipv6)}
+    allowed: Dict[str, Intervals] = {p: [] for p in undecided}
+    for e in entries:
+        if (e.get("Ipv6CidrBlock") if ipv6 else e.get("CidrBlock")) != (INTERNET_V6 if ipv6 else INTERNET_V4):
+            continue
+        proto = _proto(e.get("Protocol", "-1"))
+        pr = e.get("PortRange") or {}
+        for p in _protocols(proto, ipv6):
+            if p not in undecided:
+                undecided[p], allowed[p] = [FULL], []
+            lo, hi = FULL if proto == "all" else _port_range(p, pr.get("From"), pr.get("To"))
+            if e.get("RuleAction") == "allow":
+                allowed[p].extend(_intersect(undecided[p], [(lo, hi)]))
+            undecided[p] = _subtract(undecided[p], lo, hi)
+    return {p: ivs for p, ivs in allowed.items() if ivs}
+
+
+def nacl_internet_ports(nacl: Dict) -> FamilyPorts:
+    """
+    Ports a network ACL admits from the whole internet, as (IPv4, IPv6). The
+    two families are separate rule lists (a ::/0 deny never hides a 0.0.0.0/0
+    allow), each first-match in RuleNumber order.
+    """
+    entries = sorted((e for e in nacl.get("Entries", []) if not e.get("Egress")), key=lambda e: e.get("RuleNumber", 0))
+    return _nacl_family_ports(entries, False), _nacl_family_ports(entries, True)
+
+
+def eni_summary(eni: Dict) -> Dict:
+    public_ips = []
+    assoc = eni.get("Association") or {}
+    if assoc.get("PublicIp"):
+        public_ips.append(assoc["PublicIp"])
+    for addr in eni.get("PrivateIpAddresses", []):
+        ip = (addr.get("Association") or {}).get("PublicIp")
+        if ip and ip not in public_ips:
+            public_ips.append(ip)
+    return {
+        "id": eni.get("NetworkInterfaceId", ""),
+        "subnet": eni.get("SubnetId", ""),
+        "vpc": eni.get("VpcId", ""),
+        "groups": [g["GroupId"] for g in eni.get("Groups", []) if g.get("GroupId")],
+        "public_ips": public_ips,
+        "ipv6": [a["Ipv6Address"] for a in eni.get("Ipv6Addresses", []) if a.get("Ipv6Address")],
+    }
+
+
+class ReachabilityIndex:
+    def __init__(self):
+        self.sg_open: Dict[str, FamilyPorts] = {}
+        self.subnet_nacl: Dict[str, FamilyPorts] = {}
+        self.enis: Dict[str, List[Dict]] = {}
+        self._open_cache: Dict[Tuple, PortSet] = {}
+
+    @classmethod
+    def build(cls, ec2) -> "ReachabilityIndex":
+        idx = cls()
+        for page in ec2.get_paginator("describe_security_groups").paginate():
+            for sg in page.get("SecurityGroups", []):
+                idx.sg_open[sg["GroupId"]] = sg_internet_ports(sg)
+        for page in ec2.get_paginator("describe_network_acls").paginate():
+            for nacl in page.get("NetworkAcls", []):
+                ports = nacl_internet_ports(nacl)
+                for assoc in nacl.get("Associations", []):
+                    if assoc.get("SubnetId"):
+                        idx.subnet_nacl[assoc["SubnetId"]] = ports
+        for page in ec2.get_paginator("describe_network_interfaces").paginate():
+            for eni in page.get("NetworkInterfaces", []):
+                instance_id = (eni.get("Attachment") or {}).get("InstanceId")
+                if instance_id:
+                    idx.enis.setdefault(instance_id, []).append(eni_summary(eni))
+        return idx
+
+    def public_enis(self, instance_id: str) -> List[Dict]:
+        return [e for e in self.enis.get(instance_id, []) if e["public_ips"] or e["ipv6"]]
+
+    def public_ips(self, instance_id: str) -> List[str]:
+        return [ip for e in self.enis.get(instance_id, []) for ip in e["public_ips"]]
+
+    def eni_open_ports(self, eni: Dict) -> PortSet:
+        families = (bool(eni["public_ips"]), bool(eni["ipv6"]))
+        key = (eni["subnet"], tuple(sorted(eni["groups"])), families)
+        hit = self._open_cache.get(key)
+        if hit is None:
+            nacl = self.subnet_nacl.get(eni["subnet"], ({}, {}))
+            per_family = []
+            for fam, present in enumerate(families):
+                if present:
+                    sg_ports = union([self.sg_open.get(g, ({}, {}))[fam] for g in eni["groups"]])
+                    per_family.append(intersect(sg_ports, nacl[fam]))
+            hit = union(per_family)
+            self._open_cache[key] = hit
+        return hit
+
+    def open_ports(self, instance_id: str, enis: Optional[List[Dict]] = None) -> PortSet:
+        """Ports reachable from the internet across the given (default: all public) ENIs."""
+        enis = self.public_enis(instance_id) if enis is None else enis
+        return union([self.eni_open_ports(e) for e in enis])
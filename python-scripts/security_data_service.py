@@ -0,0 +1,521 @@
+#!/usr/bin/env python3
+"""
+Local HTTP/JSON query service over the toolkit's outputs, so ad-hoc questions
+don't need a rerun against AWS.
+
+Loaded datasets (newest file per glob; .csv.gz accepted):
+  inspector        inspector_ec2_report.py --csv-out  (default outputs/inspector*.csv*)
+  public-ec2       list_public_ec2_by_profiles.py     (default outputs/public_ec2_instances_*.csv)
+  permission-sets  permission_sets_checker.py --out   (default permission_set_wildcards.csv, outputs/permission_set*.csv)
+
+Each dataset is indexed on load: findings by instance, account and CVE,
+with (action, severity) counts precomputed fleet-wide, per account and per
+instance. Every --refresh-seconds the globs are re-checked. Only a dataset
+whose newest file changed (path, size or mtime) is reloaded, and the new
+index is swapped in atomically. Responses are kept in an LRU cache that is
+cleared on every swap.
+
+Endpoints (GET, JSON):
+  /summary                                             datasets, row counts, load times
+  /top-actions?account=&instance=&severity=&limit=     actions by findings resolved
+  /instances?account=&severity=&limit=                 instances ranked by CRITICAL, HIGH, total
+  /findings?instance=&account=&cve=&severity=&limit=   finding rows
+  /exposed?account=&port=&limit=                       public instances with their finding counts
+  /permission-sets?action=&name=&limit=                permission sets with s3:* / iam:* (Allow)
+  /metrics                                             per-endpoint count, p50/p99 ms, cache hit rate
+  /refresh                                             re-check the input files now
+
+Usage:
+  python security_data_service.py --port 8765
+  curl 'localhost:8765/top-actions?account=123456789012&severity=CRITICAL,HIGH&limit=10'
+"""
+
+import argparse
+import csv
+import glob
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from inspector_ec2_report import SEVERITY_ORDER, normalize_action_text
+from inspector_enrich import arn_account
+
+DEFAULT_GLOBS = {
+    "inspector": [os.path.join("outputs", "inspector*.csv*")],
+    "public-ec2": [os.path.join("outputs", "public_ec2_instances_*.csv")],
+    "permission-sets": ["permission_set_wildcards.csv", os.path.join("outputs", "permission_set*.csv")],
+}
+RISKY_ACTIONS = {"s3:*", "iam:*"}
+MAX_LIMIT = 1000
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _open_text(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", newline="", encoding="utf-8")
+    return open(path, newline="", encoding="utf-8")
+
+
+def _read_csv(path: str) -> List[Dict[str, str]]:
+    csv.field_size_limit(sys.maxsize)
+    with _open_text(path) as fh:
+        return list(csv.DictReader(fh))
+
+
+# ---------- Indexes ----------
+
+class InspectorIndex:
+    """Findings from one or more --csv-out files, indexed and pre-aggregated."""
+
+    COLUMNS = ("arn", "account", "instance", "region", "severity", "action", "title", "cves", "packages", "fix")
+
+    def __init__(self, rows: List[Dict[str, str]]):
+        intern = sys.intern
+        self.rows: List[Tuple] = []
+        self.by_instance: Dict[str, List[int]] = defaultdict(list)
+        self.by_account: Dict[str, List[int]] = defaultdict(list)
+        self.by_cve: Dict[str, List[int]] = defaultdict(list)
+        # scope -> Counter[(action, severity)]; scope is "" (fleet), "a:<account>" or "i:<instance>"
+        self.action_counts: Dict[str, Counter] = defaultdict(Counter)
+        self.instance_severity: Dict[str, Counter] = defaultdict(Counter)
+        self.instance_account: Dict[str, str] = {}
+
+        seen = set()
+        for r in rows:
+            arn = r.get("findingArn", "")
+            if not arn or arn in seen:
+                continue
+            seen.add(arn)
+            account = intern(arn_account(arn) or "unknown-account")
+            instance = intern(r.get("resourceId", ""))
+            severity = intern(r.get("severity") or "UNTRIAGED")
+            action = intern(normalize_action_text(r.get("actionText", "")))
+            cves = r.get("cveId", "")
+            row = (arn, account, instance, intern(r.get("resourceRegion", "")), severity, action,
+                   r.get("title", ""), cves, intern(r.get("packageNames", "")), intern(r.get("fixAvailable", "")))
+            i = len(self.rows)
+            self.rows.append(row)
+            self.by_instance[instance].append(i)
+            self.by_account[account].append(i)
+            for cve in filter(None, cves.split(";")):
+                self.by_cve[cve].append(i)
+            key = (action, severity)
+            self.action_counts[""][key] += 1
+            self.action_counts["a:" + account][key] += 1
+            self.action_counts["i:" + instance][key] += 1
+            self.instance_severity[instance][severity] += 1
+            self.instance_account[instance] = account
+
+    def row_dict(self, i: int) -> Dict[str, str]:
+        return dict(zip(self.COLUMNS, self.rows[i]))
+
+
+class PublicEc2Index:
+    def __init__(self, rows: List[Dict[str, str]]):
+        self.rows = rows
+        self.by_instance = {r.get("InstanceId", ""): r for r in rows}
+
+
+class PermissionSetIndex:
+    """Allow rows per permission set; the checker only emits s3:* / iam:* rows."""
+
+    def __init__(self, rows: List[Dict[str, str]]):
+        self.rows = rows
+        sets: Dict[str, Dict] = {}
+        for r in rows:
+            name = r.get("permission_set", "")
+            entry = sets.setdefault(name, {"permission_set": name, "actions": set(), "deny": set(),
+                                           "resources": set(), "regions": set()})
+            action = (r.get("action") or "").lower()
+            if (r.get("effect") or "Allow").lower() == "deny":
+                entry["deny"].add(action)
+                continue
+            entry["actions"].add(action)
+            entry["resources"].update(filter(None, (r.get("resources") or "").split(";")))
+            entry["regions"].add(r.get("region", ""))
+        self.sets = sets
+
+
+BUILDERS: Dict[str, Callable[[List[Dict[str, str]]], object]] = {
+    "inspector": InspectorIndex,
+    "public-ec2": PublicEc2Index,
+    "permission-sets": PermissionSetIndex,
+}
+
+
+# ---------- Store ----------
+
+class Dataset:
+    def __init__(self, kind: str, patterns: List[str]):
+        self.kind = kind
+        self.patterns = patterns
+        self.signature: Tuple = ()
+        self.files: List[str] = []
+        self.index = BUILDERS[kind]([])
+        self.rows = 0
+        self.loaded_at = 0.0
+        self.load_ms = 0
+
+    def current_files(self) -> Tuple[List[str], Tuple]:
+        files = []
+        for pattern in self.patterns:
+            matches = [p for p in glob.glob(pattern) if os.path.isfile(p)]
+            if matches:
+                files.append(max(matches, key=os.path.getmtime))
+        files = sorted(set(files))
+        sig = []
+        for f in files:
+            st = os.stat(f)
+            sig.append((f, st.st_size, st.st_mtime_ns))
+        return files, tuple(sig)
+
+    def refresh(self) -> bool:
+        """Reload when the newest input file(s) changed; True when a new index was swapped in."""
+        files, sig = self.current_files()
+        if sig == self.signature:
+            return False
+        started = time.perf_counter()
+        rows: List[Dict[str, str]] = []
+        for f in files:
+            rows.extend(_read_csv(f))
+        self.index = BUILDERS[self.kind](rows)
+        self.files, self.signature, self.rows = files, sig, len(rows)
+        self.loaded_at = time.time()
+        self.load_ms = int((time.perf_counter() - started) * 1000)
+        print(f"[store] {self.kind}: {len(rows)} rows from {', '.join(files) or '(no files)'} in {self.load_ms} ms",
+              flush=True)
+        return True
+
+
+class Store:
+    def __init__(self, globs: Dict[str, List[str]], cache_size: int = 2048):
+        self.datasets = {kind: Dataset(kind, patterns) for kind, patterns in globs.items()}
+        self.generation = 0
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def refresh(self) -> List[str]:
+        with self._refresh_lock:
+            changed = [kind for kind, ds in self.datasets.items() if ds.refresh()]
+            if changed:
+                with self._lock:
+                    self.generation += 1
+                    self._cache.clear()
+            return changed
+
+    def cached(self, key: Tuple, compute: Callable[[], object]) -> bytes:
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return hit
+            self.cache_misses += 1
+            generation = self.generation
+        body = json.dumps(compute(), default=sorted).encode()
+        with self._lock:
+            if generation == self.generation:  # don't cache results computed from a replaced index
+                self._cache[key] = body
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return body
+
+    def index(self, kind: str):
+        return self.datasets[kind].index
+
+
+# ---------- Queries ----------
+
+def _limit(params: Dict[str, str], default: int = 25) -> int:
+    try:
+        value = int(params.get("limit", default))
+    except ValueError:
+        raise BadRequest("limit must be an integer")
+    return max(1, min(value, MAX_LIMIT))
+
+
+def _severities(params: Dict[str, str]) -> Optional[set]:
+    raw = params.get("severity")
+    if not raw:
+        return None
+    values = {s.strip().upper() for s in raw.split(",") if s.strip()}
+    unknown = values - set(SEVERITY_ORDER)
+    if unknown:
+        raise BadRequest(f"unknown severity: {', '.join(sorted(unknown))}")
+    return values
+
+
+def _instance_summary(idx: InspectorIndex, instance: str) -> Dict:
+    sev = idx.instance_severity.get(instance, Counter())
+    return {"instance": instance, "account": idx.instance_account.get(instance, ""), "findings": sum(sev.values()),
+            **{s.lower(): sev[s] for s in SEVERITY_ORDER if sev[s]}}
+
+
+def q_summary(store: Store, params: Dict[str, str]):
+    return {"generation": store.generation, "datasets": {
+        kind: {"files": ds.files, "rows": ds.rows, "loadMs": ds.load_ms,
+               "loadedAt": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(ds.loaded_at)) if ds.loaded_at else None}
+        for kind, ds in store.datasets.items()}}
+
+
+def q_top_actions(store: Store, params: Dict[str, str]):
+    idx: InspectorIndex = store.index("inspector")
+    if params.get("instance"):
+        scope = "i:" + params["instance"]
+    elif params.get("account"):
+        scope = "a:" + params["account"]
+    else:
+        scope = ""
+    severities = _severities(params)
+    totals: Dict[str, Counter] = defaultdict(Counter)
+    for (action, severity), n in idx.action_counts.get(scope, Counter()).items():
+        if severities is None or severity in severities:
+            totals[action][severity] += n
+    ranked = sorted(totals.items(), key=lambda kv: (-sum(kv[1].values()), kv[0]))[:_limit(params)]
+    return [{"action": action, "total": sum(c.values()), "bySeverity": {s: c[s] for s in SEVERITY_ORDER if c[s]}}
+            for action, c in ranked]
+
+
+def q_instances(store: Store, params: Dict[str, str]):
+    idx: InspectorIndex = store.index("inspector")
+    severities = _severities(params)
+    account = params.get("account")
+    rows = []
+    for instance, sev in idx.instance_severity.items():
+        if account and idx.instance_account.get(instance) != account:
+            continue
+        if severities is not None and not any(sev[s] for s in severities):
+            continue
+        rows.append((-sev["CRITICAL"], -sev["HIGH"], -sum(sev.values()), instance))
+    rows.sort()
+    return [_instance_summary(idx, r[3]) for r in rows[:_limit(params)]]
+
+
+def q_findings(store: Store, params: Dict[str, str]):
+    idx: InspectorIndex = store.index("inspector")
+    candidates = None
+    for key, index in (("instance", idx.by_instance), ("cve", idx.by_cve), ("account", idx.by_account)):
+        if params.get(key):
+            ids = index.get(params[key], [])
+            candidates = ids if candidates is None else sorted(set(candidates) & set(ids))
+    if candidates is None:
+        raise BadRequest("findings needs at least one of instance, cve, account")
+    severities = _severities(params)
+    limit = _limit(params, 100)
+    out = []
+    for i in candidates:
+        if severities is None or idx.rows[i][4] in severities:
+            out.append(idx.row_dict(i))
+            if len(out) == limit:
+                break
+    return out
+
+
+def port_open(open_ports: str, port: str) -> bool:
+    """True when reachability.format_ports() output ("tcp:22,tcp:8000-8080", "all") covers port ("443" or "udp:53")."""
+    proto, _, number = port.rpartition(":")
+    try:
+        n = int(number)
+    except ValueError:
+        raise BadRequest("port must be a number, optionally prefixed with a protocol (tcp:443)")
+    for part in filter(None, (open_ports or "").replace(" ", "").split(",")):
+        if part == "all":
+            return True
+        p, _, rng = part.partition(":")
+        if proto and p != proto:
+            continue
+        if rng == "all":
+            return True
+        if rng:
+            lo, _, hi = rng.partition("-")
+            if int(lo) <= n <= int(hi or lo):
+                return True
+    return False
+
+
+def q_exposed(store: Store, params: Dict[str, str]):
+    public: PublicEc2Index = store.index("public-ec2")
+    idx: InspectorIndex = store.index("inspector")
+    account, port = params.get("account"), params.get("port")
+    rows = []
+    for r in public.rows:
+        if account and r.get("AccountId") != account:
+            continue
+        if port and not port_open(r.get("OpenPorts", ""), port):
+            continue
+        summary = _instance_summary(idx, r.get("InstanceId", ""))
+        rows.append(dict({k: r.get(k, "") for k in ("Profile", "AccountId", "Region", "InstanceId", "Name", "PublicIp",
+                                                      "OpenPorts", "SecurityGroups")},
+                         findings={k: v for k, v in summary.items() if k not in ("instance", "account")}))
+    rows.sort(key=lambda r: (-r["findings"].get("critical", 0), -r["findings"].get("high", 0),
+                             -r["findings"]["findings"], r["InstanceId"]))
+    return rows[:_limit(params, 100)]
+
+
+def q_permission_sets(store: Store, params: Dict[str, str]):
+    ps: PermissionSetIndex = store.index("permission-sets")
+    action = (params.get("action") or "").lower()
+    name = (params.get("name") or "").lower()
+    out = []
+    for entry in ps.sets.values():
+        allowed = entry["actions"] - entry["deny"]
+        if not allowed & RISKY_ACTIONS or (action and action not in allowed):
+            continue
+        if name and name not in entry["permission_set"].lower():
+            continue
+        out.append({"permission_set": entry["permission_set"], "actions": sorted(allowed),
+                    "allResources": "*" in entry["resources"], "resources": sorted(entry["resources"]),
+                    "regions": sorted(entry["regions"])})
+    out.sort(key=lambda e: (-len(e["actions"]), not e["allResources"], e["permission_set"]))
+    return out[:_limit(params, 100)]
+
+
+QUERIES = {
+    "/summary": q_summary,
+    "/top-actions": q_top_actions,
+    "/instances": q_instances,
+    "/findings": q_findings,
+    "/exposed": q_exposed,
+    "/permission-sets": q_permission_sets,
+}
+
+
+# ---------- Metrics ----------
+
+class Metrics:
+    """Per-endpoint request counts and the last `window` latencies for percentiles."""
+
+    def __init__(self, window: int = 10000):
+        self._lock = threading.Lock()
+        self.counts: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.latency: Dict[str, deque] = defaultdict(lambda: deque(maxlen=window))
+
+    def observe(self, endpoint: str, seconds: float, ok: bool):
+        with self._lock:
+            self.counts[endpoint] += 1
+            if not ok:
+                self.errors[endpoint] += 1
+            self.latency[endpoint].append(seconds)
+
+    def snapshot(self, store: Store) -> Dict:
+        def pct(values: List[float], p: float) -> float:
+            return round(values[min(len(values) - 1, int(p * len(values)))] * 1000, 3) if values else 0.0
+
+        with self._lock:
+            endpoints = {}
+            for ep, lat in self.latency.items():
+                values = sorted(lat)
+                endpoints[ep] = {"count": self.counts[ep], "errors": self.errors[ep],
+                                 "p50Ms": pct(values, 0.50), "p99Ms": pct(values, 0.99), "maxMs": pct(values, 1.0)}
+        lookups = store.cache_hits + store.cache_misses
+        return {"endpoints": endpoints, "cache": {"entries": len(store._cache), "hits": store.cache_hits,
+                                                  "misses": store.cache_misses,
+                                                  "hitRate": round(store.cache_hits / lookups, 3) if lookups else 0.0}}
+
+
+# ---------- HTTP ----------
+
+def make_handler(store: Store, metrics: Metrics, verbose: bool = False):
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "security-data-service/1"
+
+        def _send(self, status: int, body: bytes):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            started = time.perf_counter()
+            url = urlparse(self.path)
+            endpoint = url.path.rstrip("/") or "/"
+            status = 200
+            try:
+                params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                if endpoint == "/metrics":
+                    body = json.dumps(metrics.snapshot(store)).encode()
+                elif endpoint == "/refresh":
+                    body = json.dumps({"changed": store.refresh(), "generation": store.generation}).encode()
+                elif endpoint in QUERIES:
+                    key = (endpoint, tuple(sorted(params.items())))
+                    body = store.cached(key, lambda: QUERIES[endpoint](store, params))
+                else:
+                    status, body = 404, json.dumps({"error": f"unknown endpoint {endpoint}",
+                                                    "endpoints": sorted(QUERIES) + ["/metrics", "/refresh"]}).encode()
+            except BadRequest as e:
+                status, body = 400, json.dumps({"error": str(e)}).encode()
+            except Exception as e:  # keep serving; report the failure to the caller
+                status, body = 500, json.dumps({"error": f"{type(e).__name__}: {e}"}).encode()
+            self._send(status, body)
+            metrics.observe(endpoint if status != 404 else "(unknown)", time.perf_counter() - started, status < 400)
+
+        def log_message(self, fmt, *args):
+            if verbose:
+                super().log_message(fmt, *args)
+
+    return Handler
+
+
+def refresh_loop(store: Store, interval: float, stop: threading.Event):
+    while not stop.wait(interval):
+        try:
+            store.refresh()
+        except Exception as e:  # a half-written file: retry on the next tick
+            print(f"[!] refresh failed: {e}", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve Inspector / public EC2 / permission set outputs as a local JSON API.")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port (default: 8765)")
+    parser.add_argument("--inspector", default=None, help="Comma-separated globs for Inspector --csv-out files")
+    parser.add_argument("--public-ec2", default=None, help="Comma-separated globs for public EC2 CSVs")
+    parser.add_argument("--permission-sets", default=None, help="Comma-separated globs for permission set CSVs")
+    parser.add_argument("--refresh-seconds", type=float, default=10, help="Input re-check interval (default: 10)")
+    parser.add_argument("--cache-size", type=int, default=2048, help="LRU result cache entries (default: 2048)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args(argv)
+
+    globs = dict(DEFAULT_GLOBS)
+    for kind, value in (("inspector", args.inspector), ("public-ec2", args.public_ec2),
+                        ("permission-sets", args.permission_sets)):
+        if value:
+            globs[kind] = [g.strip() for g in value.split(",") if g.strip()]
+
+    store = Store(globs, cache_size=args.cache_size)
+    store.refresh()
+    metrics = Metrics()
+    stop = threading.Event()
+    threading.Thread(target=refresh_loop, args=(store, args.refresh_seconds, stop), daemon=True).start()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(store, metrics, args.verbose))
+    server.daemon_threads = True
+    print(f"[+] Serving on http://{args.host}:{server.server_address[1]} (endpoints: {', '.join(sorted(QUERIES))}, "
+          f"/metrics, /refresh)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import csv
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inspector_diff import diff_hash, diff_sorted  # noqa: E402
+
+HEADER = ["findingArn", "title", "severity", "actionText", "resourceId"]
+
+
+def write_snapshot(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(HEADER)
+        for arn, severity, instance in rows:
+            w.writerow([arn, f"title {arn}", severity, "yum update x", instance])
+
+
+class DuplicateArnTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old = os.path.join(self.tmp.name, "old.csv")
+        self.new = os.path.join(self.tmp.name, "new.csv")
+        write_snapshot(self.old, [
+            ("arn:a", "LOW", "i-1"),
+            ("arn:b", "HIGH", "i-1"),
+            ("arn:a", "HIGH", "i-1"),      # duplicate: this row wins
+            ("arn:c", "MEDIUM", "i-2"),
+            ("arn:d", "LOW", "i-2"),
+        ])
+        write_snapshot(self.new, [
+            ("arn:b", "CRITICAL", "i-1"),
+            ("arn:a", "LOW", "i-1"),
+            ("arn:b", "LOW", "i-1"),       # duplicate: this row wins
+            ("arn:e", "HIGH", "i-3"),
+            ("arn:c", "MEDIUM", "i-2"),
+            ("arn:e", "LOW", "i-3"),
+        ])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_strategies_agree(self):
+        expected = {
+            ("improved", "arn:a", "HIGH", "LOW"),
+            ("improved", "arn:b", "HIGH", "LOW"),
+            ("new", "arn:e", "", "LOW"),
+            ("resolved", "arn:d", "LOW", ""),
+        }
+        for name, changes in (("hash", diff_hash(self.old, self.new)),
+                              ("sorted", diff_sorted(self.old, self.new, chunk_rows=2))):
+            got = {(kind, arn, old[1] if old else "", new[1] if new else "") for kind, arn, old, new in changes}
+            self.assertEqual(got, expected, name)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the python-scripts toolkit.
+
+  python -m toolkit <command> [args...]        (from python-scripts/)
+  python -m toolkit --timings <command> ...    (print cold-start / total time)
+
+Commands are dispatched to each script's main(argv). Nothing heavy is
+imported up front: a script module is imported only when its command runs,
+and boto3/botocore are only imported once a command actually creates a
+client, so `--help` (top level or per command) never loads them.
+"""
+
+import os
+import sys
+import time
+
+_T0 = time.perf_counter()
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# command -> (directory relative to python-scripts/, module, one-line help)
+COMMANDS = {
+    "public-ec2": (".", "list_public_ec2_by_profiles", "Public EC2 instances across local profiles"),
+    "public-exposure": (".", "list_public_exposure_by_profiles", "Internet-exposed EC2/ELB/RDS/... across local profiles"),
+    "ebs-encryption": (".", "ebs_encryption_audit", "EBS encryption-by-default and unencrypted volumes/snapshots"),
+    "inspector-report": (".", "inspector_ec2_report", "Inspector v2 remediation actions per EC2 instance"),
+    "inspector-export": (".", "inspector_export", "Summarize an Inspector bulk findings export (local or s3://)"),
+    "inspector-watch": (".", "inspector_watch", "Incremental Inspector aggregation from finding events (watch, summary)"),
+    "inspector-diff": (".", "inspector_diff", "Diff two Inspector findings snapshots"),
+    "inspector-index": (".", "inspector_index", "CVE/package index over Inspector findings (build, query)"),
+    "inspector-plan": (".", "inspector_remediation_plan", "Minimal package-upgrade plan per instance and fleet-wide"),
+    "inspector-enrich": (".", "inspector_enrich", "Add EC2 instance tags/state to an Inspector findings CSV"),
+    "aws-replay": (".", "aws_replay", "Inspect recorded AWS API cassettes (AWS_REPLAY_MODE=record|replay)"),
+    "iam-eval": (".", "iam_policy_eval", "Offline IAM policy evaluation (check, actions)"),
+    "data-service": (".", "security_data_service", "Local JSON API over Inspector / public EC2 / permission set outputs"),
+    "ps-check": ("ps-checker.py", "permission_sets_checker", "s3:*/iam:* in Identity Center permission sets"),
+    "retention": ("../script-retention-logs", "apply_log_retention", "Set CloudWatch Logs retention where missing"),
+    "retention-org": ("../script-retention-logs", "org_retention_sweep", "Organization-wide retention sweep"),
+}
+
+
+def _process_uptime() -> float:
+    """Seconds since the interpreter process started (Linux), else since this module loaded."""
+    try:
+        with open("/proc/self/stat") as fh:
+            start_ticks = int(fh.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as fh:
+            uptime = float(fh.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return time.perf_counter() - _T0
+
+
+def _usage() -> str:
+    width = max(len(c) for c in COMMANDS)
+    lines = ["usage: python -m toolkit [--timings] <command> [args...]", "", "commands:"]
+    lines += [f"  {c:<{width}}  {h}" for c, (_, _, h) in COMMANDS.items()]
+    lines += ["", "Run `python -m toolkit <command> --help` for command options."]
+    return "\n".join(lines)
+
+
+def _report_timings(command: str):
+    heavy = [m for m in ("boto3", "botocore") if m in sys.modules]
+    print(f"[timings] {command}: {_process_uptime() * 1000:.0f} ms since process start "
+          f"(heavy modules loaded: {', '.join(heavy) or 'none'})", file=sys.stderr)
+
+
+def main(argv=None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    timings = "--timings" in argv[:1]
+    if timings:
+        argv = argv[1:]
+
+    if not argv or argv[0] in ("-h", "--help"):
+        print(_usage())
+        if timings:
+            _report_timings("--help")
+        return 0
+
+    command, rest = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f"unknown command: {command}\n\n{_usage()}", file=sys.stderr)
+        return 2
+
+    directory, module_name, _ = COMMANDS[command]
+    path = os.path.normpath(os.path.join(HERE, directory))
+    for p in (HERE, path):
+        if p not in sys.path:
+            sys.path.insert(0, p)
+
+    import importlib
+    module = importlib.import_module(module_name)
+    sys.argv[0] = f"toolkit {command}"  # argparse prog name
+    try:
+        module.main(rest)
+    except SystemExit:
+        if timings:
+            _report_timings(command)
+        raise
+    if timings:
+        _report_timings(command)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Set a retention policy on every CloudWatch log group that has none.
+
+Python replacement for script.sh: log groups are listed with one paginated
+describe_log_groups pass and retention is applied through a single pooled
+client with bounded concurrency and throttle-aware retries. The CSV report
+keeps the script.sh format:
+
+  account,region,action,logGroupName,details
+
+Usage examples:
+  export AWS_PROFILE=mwt-hoopla
+  python apply_log_retention.py              # 90 days
+  python apply_log_retention.py 120          # custom retention
+  python apply_log_retention.py --dry-run    # report only, change nothing
+"""
+
+import argparse
+import csv
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Iterator, List, Tuple
+
+REPORT_FIELDS = ["account", "region", "action", "logGroupName", "details"]
+THROTTLE_CODES = {"ThrottlingException", "Throttling", "TooManyRequestsException", "RequestLimitExceeded"}
+MAX_RETRIES = 8
+
+
+def logs_client(session, region: str, concurrency: int):
+    from botocore.config import Config
+    # One client shared by all workers; the pool is sized to the concurrency limit.
+    return session.client("logs", region_name=region,
+                          config=Config(retries={"max_attempts": 10, "mode": "adaptive"},
+                                        max_pool_connections=concurrency))
+
+
+def missing_retention(logs) -> Iterator[str]:
+    """Yield the names of log groups without retention (retentionInDays unset)."""
+    paginator = logs.get_paginator("describe_log_groups")
+    for page in paginator.paginate():
+        for g in page.get("logGroups", []):
+            if g.get("retentionInDays") is None:
+                yield g["logGroupName"]
+
+
+def put_retention(logs, name: str, days: int) -> Tuple[str, str]:
+    """Apply retention to one group, backing off on throttles. Returns (action, details)."""
+    from botocore.exceptions import ClientError
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            logs.put_retention_policy(logGroupName=name, retentionInDays=days)
+            return "set", f"retention={days}"
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code", "")
+            if code == "ResourceNotFoundException":
+                return "skipped", "deleted"
+            if code not in THROTTLE_CODES or attempt == MAX_RETRIES:
+                return "error", f"{code}: {e.response.get('Error', {}).get('Message', '')}"
+        time.sleep(min(20.0, 0.25 * 2 ** attempt) * random.uniform(0.5, 1.0))
+    return "error", "retries exhausted"
+
+
+def sweep_region(session, region: str, days: int, label: str, dry_run: bool = False,
+                 concurrency: int = 8) -> List[dict]:
+    """Find and fix groups without retention in one region; returns report rows."""
+    return sweep_logs(logs_client(session, region, concurrency), region, days, label,
+                      dry_run=dry_run, concurrency=concurrency)
+
+
+def sweep_logs(logs, region: str, days: int, label: str, dry_run: bool = False,
+               concurrency: int = 8) -> List[dict]:
+    """Same as sweep_region() for an existing logs client (clients are thread-safe, sessions are not)."""
+    names = list(missing_retention(logs))
+    if not names:
+        return [{"account": label, "region": region, "action": "noop", "logGroupName": "", "details": "none_missing"}]
+
+    if dry_run:
+        return [{"account": label, "region": region, "action": "dry-run", "logGroupName": n,
+                 "details": f"retention={days}"} for n in names]
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda n: put_retention(logs, n, days), names))
+    return [{"account": label, "region": region, "action": action, "logGroupName": n, "details": details}
+            for n, (action, details) in zip(names, results)]
+
+
+def write_report(rows: List[dict], path: str):
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        w = csv.DictWriter(fh, fieldnames=REPORT_FIELDS)
+        w.writeheader()
+        for r in rows:
+            w.writerow(r)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Set retention on CloudWatch log groups that have none.")
+    parser.add_argument("retention_days", nargs="?", type=int, default=90, help="Retention in days (default: 90)")
+    parser.add_argument("--profile", default=os.getenv("AWS_PROFILE"), help="AWS named profile (default: $AWS_PROFILE or env creds)")
+    parser.add_argument("--region", default="us-east-1", help="Region to sweep (default: us-east-1)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent put_retention_policy calls (default: 8)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report the groups that would be changed")
+    parser.add_argument("--report", default=None, help="CSV report path (default: retention_report_<profile>_<timestamp>.csv)")
+    args = parser.parse_args(argv)
+
+    if not args.profile and not os.getenv("AWS_ACCESS_KEY_ID"):
+        print("ERROR: Please export AWS_PROFILE or AWS_ACCESS_KEY_ID/AWS_SECRET_ACCESS_KEY before running.")
+        sys.exit(1)
+
+    label = args.profile or "env"
+    print(f"==> Using AWS_PROFILE: {args.profile or '<env-creds>'}")
+    print(f"==> Region:            {args.region}")
+    print(f"==> Retention:         {args.retention_days} days{' (dry run)' if args.dry_run else ''}")
+
+    import boto3
+
+    started = time.monotonic()
+    session = boto3.Session(profile_name=args.profile)
+    rows = sweep_region(session, args.region, args.retention_days, label,
+                        dry_run=args.dry_run, concurrency=args.concurrency)
+
+    report = args.report or f"retention_report_{label}_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.csv"
+    write_report(rows, report)
+
+    changed = sum(1 for r in rows if r["action"] in ("set", "dry-run"))
+    errors = sum(1 for r in rows if r["action"] == "error")
+    print(f"==> {changed} group(s) {'would be ' if args.dry_run else ''}updated, {errors} error(s) "
+          f"in {time.monotonic() - started:.1f}s")
+    print(f"==> Done. Report written to {report}")
+    if errors:
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
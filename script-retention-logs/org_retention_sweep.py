@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Organization-wide CloudWatch Logs retention sweep.
+
+Lists the organization's ACTIVE accounts, assumes a role in each one and
+sweeps every enabled region concurrently with the same logic as
+apply_log_retention.py. Concurrency is bounded per account (regions in
+flight) and globally (region sweeps in flight across all accounts). One
+consolidated CSV report is written in the script.sh format, with the
+account ID in the "account" column:
+
+  account,region,action,logGroupName,details
+
+Usage examples:
+  python org_retention_sweep.py --profile mwt-master --dry-run
+  python org_retention_sweep.py 120 --profile mwt-master --role-name OrganizationAccountAccessRole
+  python org_retention_sweep.py --profile mwt-master --regions us-east-1,us-west-2 --accounts 111111111111
+"""
+
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from apply_log_retention import logs_client, sweep_logs, write_report
+
+
+def list_active_accounts(session) -> List[Dict]:
+    org = session.client("organizations")
+    accounts = []
+    for page in org.get_paginator("list_accounts").paginate():
+        accounts.extend(a for a in page.get("Accounts", []) if a.get("Status") == "ACTIVE")
+    return accounts
+
+
+def account_session(base, sts, caller_account: str, account_id: str, role_name: str):
+    """The base session for the caller's own account, an assumed-role session otherwise."""
+    import boto3
+
+    if account_id == caller_account:
+        return base
+    creds = sts.assume_role(
+        RoleArn=f"arn:aws:iam::{account_id}:role/{role_name}",
+        RoleSessionName="org-retention-sweep",
+    )["Credentials"]
+    return boto3.Session(
+        aws_access_key_id=creds["AccessKeyId"],
+        aws_secret_access_key=creds["SecretAccessKey"],
+        aws_session_token=creds["SessionToken"],
+    )
+
+
+def enabled_regions(session) -> List[str]:
+    ec2 = session.client("ec2", region_name="us-east-1")
+    return sorted(r["RegionName"] for r in ec2.describe_regions(AllRegions=False)["Regions"])
+
+
+def sweep_account(base, sts, caller_account: str, account: Dict, role_name: str, regions: Optional[List[str]],
+                  days: int, dry_run: bool, per_account: int, concurrency: int,
+                  global_slots: threading.BoundedSemaphore) -> List[dict]:
+    from botocore.exceptions import BotoCoreError, ClientError
+
+    account_id = account["Id"]
+    started = time.monotonic()
+    try:
+        session = account_session(base, sts, caller_account, account_id, role_name)
+        account_regions = regions or enabled_regions(session)
+        # Sessions are not thread-safe: build every client here, then fan out.
+        clients = {r: logs_client(session, r, concurrency) for r in account_regions}
+    except (ClientError, BotoCoreError) as e:
+        print(f"[!] {account_id} ({account.get('Name', '')}): {e}")
+        return [{"account": account_id, "region": "", "action": "error", "logGroupName": "", "details": str(e)}]
+
+    def run(region: str) -> List[dict]:
+        with global_slots:
+            try:
+                return sweep_logs(clients[region], region, days, account_id, dry_run=dry_run, concurrency=concurrency)
+            except (ClientError, BotoCoreError) as e:
+                return [{"account": account_id, "region": region, "action": "error", "logGroupName": "", "details": str(e)}]
+
+    rows: List[dict] = []
+    with ThreadPoolExecutor(max_workers=max(1, per_account)) as pool:
+        for region_rows in pool.map(run, account_regions):
+            rows.extend(region_rows)
+    changed = sum(1 for r in rows if r["action"] in ("set", "dry-run"))
+    print(f"[+] {account_id} ({account.get('Name', '')}): {len(account_regions)} region(s), "
+          f"{changed} group(s) {'to update' if dry_run else 'updated'} in {time.monotonic() - started:.1f}s")
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Set retention on log groups without one, across the whole organization.")
+    parser.add_argument("retention_days", nargs="?", type=int, default=90, help="Retention in days (default: 90)")
+    parser.add_argument("--profile", default=None, help="Profile in the management (or delegated admin) account")
+    parser.add_argument("--role-name", default="OrganizationAccountAccessRole", help="Role to assume in each member account")
+    parser.add_argument("--regions", default=None, help="Comma-separated regions (default: every enabled region per account)")
+    parser.add_argument("--accounts", default=None, help="Comma-separated account IDs to limit the sweep to")
+    parser.add_argument("--max-accounts", type=int, default=8, help="Accounts processed concurrently (default: 8)")
+    parser.add_argument("--per-account", type=int, default=4, help="Regions in flight per account (default: 4)")
+    parser.add_argument("--max-workers", type=int, default=16, help="Region sweeps in flight across all accounts (default: 16)")
+    parser.add_argument("--concurrency", type=int, default=4, help="put_retention_policy calls in flight per region (default: 4)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report the groups that would be changed")
+    parser.add_argument("--report", default=None, help="CSV report path (default: retention_report_org_<timestamp>.csv)")
+    args = parser.parse_args(argv)
+
+    import boto3
+
+    started = time.monotonic()
+    base = boto3.Session(profile_name=args.profile)
+    sts = base.client("sts")  # shared by the account workers; clients are thread-safe
+    caller_account = sts.get_caller_identity()["Account"]
+    accounts = list_active_accounts(base)
+    if args.accounts:
+        wanted = {a.strip() for a in args.accounts.split(",") if a.strip()}
+        accounts = [a for a in accounts if a["Id"] in wanted]
+    if not accounts:
+        print("[!] No ACTIVE accounts to sweep")
+        sys.exit(1)
+    regions = [r.strip() for r in args.regions.split(",") if r.strip()] if args.regions else None
+
+    print(f"==> Sweeping {len(accounts)} account(s), retention {args.retention_days} days"
+          f"{' (dry run)' if args.dry_run else ''}")
+    global_slots = threading.BoundedSemaphore(max(1, args.max_workers))
+    rows: List[dict] = []
+    with ThreadPoolExecutor(max_workers=max(1, args.max_accounts)) as pool:
+        futures = [pool.submit(sweep_account, base, sts, caller_account, a, args.role_name, regions,
+                               args.retention_days, args.dry_run, args.per_account, args.concurrency,
+                               global_slots) for a in accounts]
+        for fut in as_completed(futures):
+            rows.extend(fut.result())
+
+    rows.sort(key=lambda r: (r["account"], r["region"], r["logGroupName"]))
+    report = args.report or f"retention_report_org_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.csv"
+    write_report(rows, report)
+
+    changed = sum(1 for r in rows if r["action"] in ("set", "dry-run"))
+    errors = sum(1 for r in rows if r["action"] == "error")
+    print(f"==> {changed} group(s) {'would be ' if args.dry_run else ''}updated, {errors} error(s) "
+          f"across {len(accounts)} account(s) in {time.monotonic() - started:.1f}s")
+    print(f"==> Done. Report written to {report}")
+    if errors:
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()